@@ -0,0 +1,128 @@
+# agent/adaptive.py
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sampler import Sampler
+
+logger = logging.getLogger(__name__)
+
+# Boost CPU on high or fast-moving usage, memory when nearly full, disks when busy
+DEFAULT_RULES = (
+    "cpu.overall_usage>80,cpu.overall_usage~25,"
+    "memory.percent_used>90,memory.percent_used~10,"
+    "diskio.devices.*.busy_percent>80"
+)
+
+_RULE = re.compile(r"^(?P<path>[\w*.]+)\s*(?P<op>[>~])\s*(?P<threshold>[\d.]+)$")
+
+
+def resolve(value: Any, path: List[str]) -> Optional[float]:
+    """
+    Numeric value at a dotted path. ``*`` matches every item of a dict or
+    list; the largest match is returned. None if nothing numeric matches.
+    """
+    if not path:
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    key, rest = path[0], path[1:]
+    if key == "*":
+        items = value.values() if isinstance(value, dict) else value if isinstance(value, list) else []
+        found = [v for v in (resolve(item, rest) for item in items) if v is not None]
+        return max(found, default=None)
+    if isinstance(value, dict) and key in value:
+        return resolve(value[key], rest)
+    return None
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A trigger for high-resolution sampling of ``collector``.
+
+    ``>`` fires while the value at ``path`` is above ``threshold``; ``~``
+    fires when it moved by at least ``threshold`` since the previous sample.
+    """
+    collector: str
+    path: Tuple[str, ...]
+    op: str
+    threshold: float
+
+    def fires(self, previous: Any, current: Any) -> bool:
+        value = resolve(current, list(self.path))
+        if value is None:
+            return False
+        if self.op == ">":
+            return value > self.threshold
+        before = None if previous is None else resolve(previous, list(self.path))
+        return before is not None and abs(value - before) >= self.threshold
+
+
+def parse_rules(text: str) -> List[Rule]:
+    """
+    Parse ``cpu.overall_usage>80,memory.percent_used~10`` into rules; the
+    first path component names the collector.
+    """
+    rules = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        match = _RULE.match(item)
+        if match is None or "." not in match["path"]:
+            raise ValueError(f"Invalid adaptive sampling rule: {item!r} (expected collector.field>N or collector.field~N)")
+        collector, *path = match["path"].split(".")
+        rules.append(Rule(collector, tuple(path), match["op"], float(match["threshold"])))
+    return rules
+
+
+class AdaptiveSampling:
+    """
+    Raise a collector's sampling rate while its data is interesting.
+
+    Used as a sampler listener. When any rule for a collector fires, the
+    collector is boosted to ``fast_interval`` and rescheduled immediately.
+    Once no rule has fired for ``hold`` seconds, the interval decays by
+    ``decay`` per sample until it is back at the configured (base) interval.
+    Every sample flows into the history buffer, stream and version log as
+    usual, so they carry the variable-resolution series.
+    """
+
+    def __init__(self, sampler: Sampler, rules: List[Rule], fast_interval: float = 1.0,
+                 hold: float = 30.0, decay: float = 2.0):
+        self.sampler = sampler
+        self.fast_interval = fast_interval
+        self.hold = hold
+        self.decay = decay
+        self.rules: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.collector, []).append(rule)
+        self._previous: Dict[str, Any] = {}
+        self._hot_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        for name in self.rules:
+            if name in sampler.collectors:
+                sampler.collectors.get(name).fast_interval = fast_interval
+
+    def record(self, name: str, timestamp: float, value: Any):
+        rules = self.rules.get(name)
+        if not rules or name not in self.sampler.collectors:
+            return
+        collector = self.sampler.collectors.get(name)
+        with self._lock:
+            previous = self._previous.get(name)
+            self._previous[name] = value
+            fired = [rule for rule in rules if rule.fires(previous, value)]
+
+            if fired:
+                self._hot_until[name] = timestamp + self.hold
+                if collector.boost_interval != self.fast_interval and self.fast_interval < collector.interval:
+                    logger.info(f"Sampling {name} every {self.fast_interval}s "
+                                f"({', '.join('.'.join(r.path) + r.op + str(r.threshold) for r in fired)})")
+                    collector.boost(self.fast_interval)
+                    self.sampler.reschedule(name)
+            elif collector.boost_interval is not None and timestamp >= self._hot_until.get(name, 0.0):
+                collector.boost(collector.boost_interval * self.decay)
+                if collector.boost_interval is None:
+                    logger.info(f"Sampling {name} every {collector.interval}s again")
@@ -0,0 +1,57 @@
+# agent/benchmark.py
+"""
+Compare the psutil and /proc process table scanners.
+
+    python -m agent.benchmark --spawn 3000 --rounds 20
+
+``--spawn`` starts that many idle child processes first, to measure the
+scan on a machine with thousands of processes.
+"""
+import argparse
+import statistics
+import subprocess
+import time
+
+from .processes import ProcessTable
+from .procfs import ProcfsProcessTable, procfs_available
+
+
+def time_refresh(table, rounds: int):
+    # The first refresh builds every entry; steady state is what the agent pays
+    table.refresh()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        rows = table.refresh()
+        timings.append(time.perf_counter() - started)
+    return len(rows), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--spawn", type=int, default=0, help="idle child processes to start first")
+    parser.add_argument("--rounds", type=int, default=20, help="timed refreshes per scanner")
+    args = parser.parse_args()
+
+    if not procfs_available():
+        parser.error("/proc scanner is not available on this platform")
+
+    children = []
+    try:
+        for _ in range(args.spawn):
+            children.append(subprocess.Popen(["sleep", "3600"]))
+
+        for name, table in (("psutil", ProcessTable()), ("procfs", ProcfsProcessTable())):
+            count, timings = time_refresh(table, args.rounds)
+            print(f"{name:>7}: {count} processes, median {statistics.median(timings) * 1000:.1f} ms, "
+                  f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms "
+                  f"({statistics.median(timings) / count * 1e6:.1f} us/process)")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# agent/cgroups.py
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .rates import RateTracker
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def cgroup_v2_available(root: str = CGROUP_ROOT) -> bool:
+    """
+    Whether ``root`` is a cgroup v2 (unified) hierarchy.
+    """
+    return os.path.exists(os.path.join(root, "cgroup.controllers"))
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        # Controller not enabled for this cgroup, or the cgroup just went away
+        return None
+
+
+def _read_int(path: str) -> Optional[int]:
+    value = _read(path)
+    if value is None or value.strip() == "max":
+        return None
+    return int(value)
+
+
+def parse_flat_keyed(text: str) -> Dict[str, int]:
+    """
+    Parse a flat keyed file such as cpu.stat (``key value`` per line).
+    """
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(" ")
+        if value:
+            values[key] = int(value)
+    return values
+
+
+def parse_io_stat(text: str) -> Dict[str, int]:
+    """
+    Sum io.stat (``MAJ:MIN rbytes=.. wbytes=.. rios=.. wios=..`` per device)
+    over every device.
+    """
+    totals = {"rbytes": 0, "wbytes": 0, "rios": 0, "wios": 0}
+    for line in text.splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition("=")
+            if key in totals:
+                totals[key] += int(value)
+    return totals
+
+
+def parse_pressure(text: str) -> Dict[str, float]:
+    """
+    Parse a PSI file into the 10-second averages: {"some": 1.5, "full": 0.2}.
+    """
+    pressure = {}
+    for line in text.splitlines():
+        kind, *fields = line.split()
+        for field in fields:
+            key, _, value = field.partition("=")
+            if key == "avg10":
+                pressure[kind] = float(value)
+    return pressure
+
+
+class CgroupTable:
+    """
+    Per-cgroup resource usage read from a cgroup v2 hierarchy.
+
+    Walks the tree down to ``max_depth`` levels below the root and reports,
+    per cgroup: CPU usage as a percentage of one core, current and peak
+    memory, I/O byte rates and the 10-second PSI averages. Rates come from
+    the cumulative counters of the previous sample, so a cgroup's first
+    sample only establishes its baseline.
+    """
+
+    def __init__(self, root: str = CGROUP_ROOT, max_depth: int = 4):
+        self.root = root
+        self.max_depth = max_depth
+        self._rates = RateTracker()
+        self._lock = threading.Lock()
+
+    def _walk(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield ``(cgroup path, directory)`` for every cgroup below the root.
+        """
+        pending = [(self.root, 0)]
+        while pending:
+            directory, depth = pending.pop()
+            if depth >= self.max_depth:
+                continue
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, depth + 1))
+                    yield "/" + os.path.relpath(entry.path, self.root), entry.path
+
+    def _sample(self, directory: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        counters = {}
+        cpu_stat = _read(os.path.join(directory, "cpu.stat"))
+        if cpu_stat is not None:
+            counters["usage_usec"] = parse_flat_keyed(cpu_stat).get("usage_usec", 0)
+        io_stat = _read(os.path.join(directory, "io.stat"))
+        if io_stat is not None:
+            counters.update(parse_io_stat(io_stat))
+
+        row = {
+            "memory_current": _read_int(os.path.join(directory, "memory.current")),
+            "memory_peak": _read_int(os.path.join(directory, "memory.peak")),
+            "pids": _read_int(os.path.join(directory, "pids.current")),
+            "pressure": {},
+        }
+        for resource in ("cpu", "memory", "io"):
+            text = _read(os.path.join(directory, f"{resource}.pressure"))
+            if text is not None:
+                row["pressure"][resource] = parse_pressure(text)
+        return row, counters
+
+    def refresh(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Sample every cgroup, returning ``{cgroup path: usage}``.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            groups = {}
+            counters = {}
+            for path, directory in self._walk():
+                groups[path], counters[path] = self._sample(directory)
+
+            rates = self._rates.update(counters, now)
+            for path, row in groups.items():
+                rate = rates.get(path, {})
+                # usage_usec per second / 1e6 * 100 = percent of one core
+                row["cpu_percent"] = round(rate["usage_usec"] / 1e4, 2) if "usage_usec" in rate else None
+                row["io_read_bytes_per_sec"] = rate.get("rbytes")
+                row["io_write_bytes_per_sec"] = rate.get("wbytes")
+            return groups
+
+
+# Sort keys for select_cgroups; every key ranks highest first
+CGROUP_SORT_KEYS = {
+    "cpu": lambda row: row.get("cpu_percent") or 0,
+    "memory": lambda row: row.get("memory_current") or 0,
+    "io": lambda row: (row.get("io_read_bytes_per_sec") or 0) + (row.get("io_write_bytes_per_sec") or 0),
+}
+
+
+def select_cgroups(groups: Dict[str, Dict[str, Any]], sort: str = "cpu",
+                   limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Order cgroups by ``sort`` and keep the first ``limit`` of them.
+    """
+    key = CGROUP_SORT_KEYS[sort]
+    items = groups.items()
+    if limit is None:
+        ordered = sorted(items, key=lambda item: key(item[1]), reverse=True)
+    else:
+        ordered = heapq.nlargest(limit, items, key=lambda item: key(item[1]))
+    return dict(ordered)
@@ -0,0 +1,136 @@
+# agent/collectors.py
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Collector:
+    """
+    A named metrics collector and its sampling policy.
+
+    interval: seconds between background samples.
+    timeout: seconds a single collection may take before it is abandoned.
+    budget: fraction of ``interval`` a collection may spend running. A
+        collector that overruns its budget is sampled less often
+        (``effective_interval``) so it cannot dominate the agent's CPU.
+    history: whether samples are kept in the agent's history buffer.
+    fast_interval: shortest interval adaptive sampling may boost the
+        collector to (None if it is never boosted). ``boost_interval`` is the
+        boosted interval currently in force, if any.
+    """
+    name: str
+    func: Callable[[], Any]
+    interval: float = 1.0
+    timeout: float = 5.0
+    budget: float = 0.2
+    history: bool = True
+    fast_interval: Optional[float] = None
+    last_duration: Optional[float] = field(default=None, compare=False)
+    effective_interval: float = field(default=0.0, compare=False)
+    boost_interval: Optional[float] = field(default=None, compare=False)
+
+    def __post_init__(self):
+        self.effective_interval = self.interval
+
+    @property
+    def base_interval(self) -> float:
+        """
+        Interval currently aimed for: the boosted one while boosted.
+        """
+        return self.boost_interval if self.boost_interval is not None else self.interval
+
+    @property
+    def min_interval(self) -> float:
+        """
+        Shortest interval the collector may be sampled at.
+        """
+        return min(self.interval, self.fast_interval or self.interval)
+
+    def boost(self, interval: Optional[float]):
+        """
+        Sample at ``interval`` instead of the configured one, or go back to
+        the configured interval with None.
+        """
+        self.boost_interval = interval if interval is None or interval < self.interval else None
+        self.effective_interval = self.base_interval
+
+    def record_duration(self, duration: float):
+        """
+        Remember how long the last run took and stretch the interval if the
+        run exceeded the cost budget.
+        """
+        self.last_duration = duration
+        interval = self.base_interval
+        allowed = interval * self.budget
+        if self.budget > 0 and duration > allowed:
+            stretched = duration / self.budget
+            if stretched > self.effective_interval:
+                logger.warning(
+                    f"Collector {self.name} took {duration:.3f}s (budget {allowed:.3f}s), "
+                    f"sampling every {stretched:.1f}s instead of {interval:.1f}s"
+                )
+            self.effective_interval = stretched
+        else:
+            self.effective_interval = interval
+
+
+class CollectorRegistry:
+    """
+    Registry of the collectors the agent samples.
+
+    Intervals can be overridden per collector from the environment with
+    ``AGENT_<NAME>_INTERVAL`` (e.g. ``AGENT_PROCESSES_INTERVAL=30``).
+    """
+
+    def __init__(self):
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func: Optional[Callable[[], Any]] = None, *,
+                 interval: float = 1.0, timeout: float = 5.0, budget: float = 0.2,
+                 history: bool = True):
+        """
+        Register ``func`` as collector ``name``. Can also be used as a decorator.
+        """
+        def decorator(fn):
+            env_interval = os.environ.get(f"AGENT_{name.upper()}_INTERVAL")
+            collector = Collector(
+                name=name,
+                func=fn,
+                interval=float(env_interval) if env_interval else interval,
+                timeout=timeout,
+                budget=budget,
+                history=history,
+            )
+            with self._lock:
+                self._collectors[name] = collector
+            return fn
+
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def get(self, name: str) -> Collector:
+        return self._collectors[name]
+
+    def names(self) -> List[str]:
+        return list(self._collectors)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._collectors
+
+    def __iter__(self) -> Iterator[Collector]:
+        with self._lock:
+            return iter(list(self._collectors.values()))
+
+    def __len__(self) -> int:
+        return len(self._collectors)
@@ -0,0 +1,131 @@
+# agent/disks.py
+import concurrent.futures
+import logging
+import threading
+import time
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psutil
+
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Filesystems that are never local disk capacity: pseudo and in-memory
+# filesystems, read-only images (snaps, live media), container overlays and
+# network mounts (which would also be counted on the server that owns them)
+DEFAULT_EXCLUDE_FSTYPES = (
+    "squashfs", "overlay", "tmpfs", "devtmpfs", "ramfs", "iso9660", "udf", "autofs",
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ceph", "glusterfs", "9p", "fuse.*",
+)
+DEFAULT_EXCLUDE_DEVICES = ("/dev/loop*",)
+DEFAULT_EXCLUDE_MOUNTPOINTS = ("/snap/*", "/var/lib/docker/*", "/var/lib/containers/*")
+
+
+def parse_patterns(value: Optional[str], default: Sequence[str] = ()) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated list of glob patterns; None means ``default``.
+    """
+    if value is None:
+        return tuple(default)
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _matches(value: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatchcase(value, pattern) for pattern in patterns)
+
+
+class DiskFilter:
+    """
+    Include/exclude rules for the partitions reported as disk capacity.
+
+    Every rule is a list of glob patterns. A partition is kept when its
+    fstype matches ``include_fstypes`` (if any are given) and none of the
+    exclude patterns match its fstype, device or mountpoint.
+    """
+
+    def __init__(self, include_fstypes: Sequence[str] = (),
+                 exclude_fstypes: Sequence[str] = DEFAULT_EXCLUDE_FSTYPES,
+                 exclude_devices: Sequence[str] = DEFAULT_EXCLUDE_DEVICES,
+                 exclude_mountpoints: Sequence[str] = DEFAULT_EXCLUDE_MOUNTPOINTS):
+        self.include_fstypes = tuple(include_fstypes)
+        self.exclude_fstypes = tuple(exclude_fstypes)
+        self.exclude_devices = tuple(exclude_devices)
+        self.exclude_mountpoints = tuple(exclude_mountpoints)
+
+    def accepts(self, partition) -> bool:
+        if not partition.fstype:
+            return False
+        if self.include_fstypes and not _matches(partition.fstype, self.include_fstypes):
+            return False
+        return not (_matches(partition.fstype, self.exclude_fstypes)
+                    or _matches(partition.device, self.exclude_devices)
+                    or _matches(partition.mountpoint, self.exclude_mountpoints))
+
+    def select(self, partitions: Iterable) -> List:
+        """
+        Apply the rules and keep one mount per device (the shortest
+        mountpoint), so bind mounts and btrfs subvolumes are not counted
+        more than once.
+        """
+        by_device = {}
+        for partition in partitions:
+            if not self.accepts(partition):
+                continue
+            kept = by_device.get(partition.device)
+            if kept is None or len(partition.mountpoint) < len(kept.mountpoint):
+                by_device[partition.device] = partition
+        return list(by_device.values())
+
+
+class DiskUsageCache:
+    """
+    Per-mountpoint cache of ``psutil.disk_usage``.
+
+    Usage is re-read at most once per ``interval`` seconds. Each read runs in
+    its own thread and is abandoned after ``timeout`` seconds, so a hung
+    mount (e.g. an unreachable network filesystem) only keeps serving its
+    previous value instead of blocking the disk collector; reads of the same
+    mount never pile up behind a hung one.
+    """
+
+    def __init__(self, interval: float = 60.0, timeout: float = 2.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.flight = SingleFlight()
+        self._usage: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, mountpoint: str):
+        usage = psutil.disk_usage(mountpoint)
+        with self._lock:
+            self._usage[mountpoint] = (time.monotonic(), usage)
+        return usage
+
+    def get_many(self, mountpoints: Iterable[str]) -> Dict[str, Any]:
+        """
+        Return ``{mountpoint: usage}``, refreshing expired entries
+        concurrently. Mountpoints whose usage has never been read
+        successfully are left out. Entries for mountpoints not asked for are
+        dropped.
+        """
+        mountpoints = list(mountpoints)
+        now = time.monotonic()
+        with self._lock:
+            self._usage = {mp: entry for mp, entry in self._usage.items() if mp in mountpoints}
+            expired = [mp for mp in mountpoints
+                       if mp not in self._usage or now - self._usage[mp][0] >= self.interval]
+
+        futures = {mp: self.flight.submit(mp, lambda mp=mp: self._read(mp)) for mp in expired}
+        deadline = time.monotonic() + self.timeout
+        for mountpoint, future in futures.items():
+            try:
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except concurrent.futures.TimeoutError:
+                logger.warning(f"Disk usage of {mountpoint} timed out after {self.timeout}s, serving its previous value")
+            except Exception as e:
+                logger.warning(f"Disk usage of {mountpoint} failed: {str(e)}")
+
+        with self._lock:
+            return {mp: self._usage[mp][1] for mp in mountpoints if mp in self._usage}
@@ -0,0 +1,93 @@
+# agent/history.py
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring of (timestamp, value) samples.
+
+    Storage is allocated up front (timestamps in a float array, values in a
+    list of the same size), so memory stays bounded no matter how long the
+    agent runs. Timestamps are appended in increasing order, which lets
+    ``since`` binary-search for the cursor.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._timestamps = array('d', bytes(8 * self.capacity))
+        self._values: List[Any] = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _slot(self, index: int) -> int:
+        # Map a logical index (0 = oldest) onto the underlying storage
+        return (self._next - self._count + index) % self.capacity
+
+    def append(self, timestamp: float, value: Any):
+        with self._lock:
+            self._timestamps[self._next] = timestamp
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def since(self, timestamp: Optional[float] = None, step: Optional[float] = None) -> List[Tuple[float, Any]]:
+        """
+        Samples newer than ``timestamp``, oldest first. With ``step``, samples
+        closer than ``step`` seconds to the previously returned one are skipped.
+        """
+        with self._lock:
+            lo, hi = 0, self._count
+            if timestamp is not None:
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._timestamps[self._slot(mid)] <= timestamp:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+
+            samples = []
+            last = None
+            for index in range(lo, self._count):
+                slot = self._slot(index)
+                ts = self._timestamps[slot]
+                if step and last is not None and ts < last + step:
+                    continue
+                samples.append((ts, self._values[slot]))
+                last = ts
+            return samples
+
+
+class History:
+    """
+    Per-collector sample history covering roughly ``seconds`` of wall time.
+
+    Each collector gets its own ring sized from its sampling interval, so a
+    collector sampled every second keeps more points than one sampled every
+    minute while both cover the same window.
+    """
+
+    def __init__(self, seconds: float = 3600):
+        self.seconds = seconds
+        self._rings: Dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, interval: float, timestamp: float, value: Any):
+        ring = self._rings.get(name)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(name, RingBuffer(self.seconds / max(interval, 0.001)))
+        ring.append(timestamp, value)
+
+    def names(self) -> List[str]:
+        return list(self._rings)
+
+    def since(self, name: str, timestamp: Optional[float] = None,
+              step: Optional[float] = None) -> List[Tuple[float, Any]]:
+        ring = self._rings.get(name)
+        return [] if ring is None else ring.since(timestamp, step)
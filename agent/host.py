@@ -0,0 +1,142 @@
+# agent/host.py
+import logging
+import platform
+import select
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# rtnetlink multicast groups for link and address changes
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+# Wait this long after an interface event so a burst of changes causes one refresh
+EVENT_DEBOUNCE = 1.0
+
+
+def _interface_ip() -> str:
+    """
+    First non-loopback IPv4 address of a local interface, without touching DNS.
+    """
+    for addrs in psutil.net_if_addrs().values():
+        for addr in addrs:
+            if addr.family == socket.AF_INET and not addr.address.startswith("127."):
+                return addr.address
+    return "127.0.0.1"
+
+
+def _open_netlink() -> Optional[socket.socket]:
+    """
+    Subscribe to rtnetlink interface/address notifications where available.
+    """
+    if not hasattr(socket, "AF_NETLINK"):
+        return None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        sock.setblocking(False)
+        return sock
+    except OSError as e:
+        logger.info(f"Netlink not available, refreshing host identity on TTL only: {str(e)}")
+        return None
+
+
+def collect_host_identity(resolve: bool = True) -> Dict[str, Any]:
+    """
+    Collect the static facts about this host. With resolve=False the IP is
+    taken from the local interfaces instead of the resolver.
+    """
+    hostname = socket.gethostname()
+    ip_address = None
+    if resolve:
+        try:
+            ip_address = socket.gethostbyname(hostname)
+        except OSError as e:
+            logger.warning(f"Could not resolve {hostname}: {str(e)}")
+    if not ip_address:
+        ip_address = _interface_ip()
+
+    return {
+        "hostname": hostname,
+        "ip_address": ip_address,
+        "os_info": f"{platform.system()} {platform.release()}",
+        "cores": psutil.cpu_count(logical=True),
+        "physical_cores": psutil.cpu_count(logical=False),
+        "boot_time": psutil.boot_time(),
+    }
+
+
+class HostIdentity:
+    """
+    Cached host identity.
+
+    A cheap, resolver-free identity is available immediately; a background
+    thread then resolves the primary IP and refreshes everything every ``ttl``
+    seconds or when netlink reports an interface/address change, so request
+    handlers never wait on DNS.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.refreshed_at = 0.0
+        self._identity = collect_host_identity(resolve=False)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> Dict[str, Any]:
+        return self._identity
+
+    def refresh(self):
+        try:
+            self._identity = collect_host_identity()
+            self.refreshed_at = time.time()
+        except Exception as e:
+            logger.error(f"Error refreshing host identity: {str(e)}")
+
+    def _run(self):
+        sock = _open_netlink()
+        try:
+            next_refresh = time.monotonic()
+            while not self._stop.is_set():
+                remaining = next_refresh - time.monotonic()
+                if remaining <= 0:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.ttl
+                    continue
+
+                # Wake up at least once a second so stop() is honoured promptly
+                timeout = min(remaining, 1.0)
+                if sock is None:
+                    self._stop.wait(timeout)
+                    continue
+                readable, _, _ = select.select([sock], [], [], timeout)
+                if readable:
+                    try:
+                        while sock.recv(65536):
+                            pass
+                    except OSError:
+                        # Drained (EAGAIN) or the kernel dropped events (ENOBUFS)
+                        pass
+                    next_refresh = min(next_refresh, time.monotonic() + EVENT_DEBOUNCE)
+        finally:
+            if sock is not None:
+                sock.close()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="host-identity", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -1,43 +1,129 @@
+import logging
+import os
 import psutil
 import time
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from datetime import datetime
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
-from typing import Dict, List, Any
-import platform
-import socket
-from pydantic import BaseModel
+from typing import Dict, List, Any, Optional
+from pydantic import BaseModel, ConfigDict
 
+from .adaptive import DEFAULT_RULES as DEFAULT_ADAPTIVE_RULES, AdaptiveSampling, parse_rules
+from .cgroups import CgroupTable, cgroup_v2_available, select_cgroups
+from .collectors import CollectorRegistry
+from .disks import (DEFAULT_EXCLUDE_DEVICES, DEFAULT_EXCLUDE_FSTYPES, DEFAULT_EXCLUDE_MOUNTPOINTS,
+                    DiskFilter, DiskUsageCache, parse_patterns)
+from .encoding import CONTENT_TYPE as BINARY_CONTENT_TYPE, encode_metrics
+from .host import HostIdentity
+from .rates import RateTracker
+from .processes import ProcessTable, select_processes
+from .procfs import ProcfsProcessTable, procfs_available
+from .prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE, PrometheusExporter
+from .push import MetricsPusher, Spool
+from .sampler import Sampler
+from .selfstats import EndpointStats, RequestStatsMiddleware, process_stats
+from .shm import SharedSnapshotWriter
+from .shmreader import DEFAULT_PATH as DEFAULT_SHM_PATH
+from .stream import Broadcaster, parse_fields, sse_events
+from .versions import VersionLog
 
-app = FastAPI(
-    title="Linux Metrics Agent",
-    description="Agent for collecting system metrics on Linux hosts",
-    version="1.0.0"
+logger = logging.getLogger(__name__)
+
+# Adaptive sampling: cheap collectors run at a low base rate and are boosted
+# to AGENT_ADAPTIVE_FAST_INTERVAL while an AGENT_ADAPTIVE_RULES rule fires
+# (collector.field>N: above N, collector.field~N: moved by N since the last
+# sample), decaying back AGENT_ADAPTIVE_HOLD seconds after the last trigger
+ADAPTIVE = os.environ.get("AGENT_ADAPTIVE", "0").lower() in ("1", "true", "yes")
+ADAPTIVE_RULES = parse_rules(os.environ.get("AGENT_ADAPTIVE_RULES", DEFAULT_ADAPTIVE_RULES))
+ADAPTIVE_FAST_INTERVAL = float(os.environ.get("AGENT_ADAPTIVE_FAST_INTERVAL", "1.0"))
+ADAPTIVE_HOLD = float(os.environ.get("AGENT_ADAPTIVE_HOLD", "30"))
+
+# Default seconds between samples of the cheap collectors (CPU, memory) and
+# seconds of per-collector history kept in memory. Each collector's interval
+# can also be overridden with AGENT_<NAME>_INTERVAL.
+SAMPLE_INTERVAL = float(os.environ.get("AGENT_SAMPLE_INTERVAL", "10.0" if ADAPTIVE else "1.0"))
+HISTORY_SECONDS = float(os.environ.get("AGENT_HISTORY_SECONDS", "3600"))
+# Cached values up to this many seconds old are served without re-collecting
+MAX_STALENESS = float(os.environ.get("AGENT_MAX_STALENESS", "5.0"))
+# Seconds between background refreshes of hostname/IP/OS facts
+HOST_REFRESH_TTL = float(os.environ.get("AGENT_HOST_TTL", "300"))
+# Process table implementation: "procfs" reads /proc directly (Linux only),
+# "psutil" uses psutil.Process, "auto" picks procfs where available
+PROCESS_SCANNER = os.environ.get("AGENT_PROCESS_SCANNER", "auto")
+# cgroup v2 hierarchy to report on, and how many levels below it to walk
+CGROUP_ROOT = os.environ.get("AGENT_CGROUP_ROOT", "/sys/fs/cgroup")
+CGROUP_DEPTH = int(os.environ.get("AGENT_CGROUP_DEPTH", "4"))
+# Partitions counted as disk capacity: comma-separated glob patterns
+# (an empty value disables the defaults of an exclude rule)
+DISK_FILTER = DiskFilter(
+    include_fstypes=parse_patterns(os.environ.get("AGENT_DISK_INCLUDE_FSTYPES")),
+    exclude_fstypes=parse_patterns(os.environ.get("AGENT_DISK_EXCLUDE_FSTYPES"), DEFAULT_EXCLUDE_FSTYPES),
+    exclude_devices=parse_patterns(os.environ.get("AGENT_DISK_EXCLUDE_DEVICES"), DEFAULT_EXCLUDE_DEVICES),
+    exclude_mountpoints=parse_patterns(os.environ.get("AGENT_DISK_EXCLUDE_MOUNTPOINTS"), DEFAULT_EXCLUDE_MOUNTPOINTS),
 )
+# Seconds between disk_usage() reads of each mount, and how long one may take
+DISK_USAGE_INTERVAL = float(os.environ.get("AGENT_DISK_USAGE_INTERVAL", "60"))
+DISK_USAGE_TIMEOUT = float(os.environ.get("AGENT_DISK_USAGE_TIMEOUT", "2"))
+# Processes (by CPU) exported on /metrics/prometheus
+PROMETHEUS_TOP_PROCESSES = int(os.environ.get("AGENT_PROMETHEUS_TOP_PROCESSES", "10"))
+# Memory-mapped file the latest CPU/memory sample is published to for local
+# readers (see agent/shmreader.py); set to an empty value to disable
+SHM_PATH = os.environ.get("AGENT_SHM_PATH", DEFAULT_SHM_PATH if os.path.isdir(os.path.dirname(DEFAULT_SHM_PATH)) else "")
+# Push mode: POST batches of samples to the dashboard's ingest endpoint
+# (e.g. http://dashboard:8000/historical/api/ingest/) instead of waiting to be
+# polled; disabled when empty. One sample every AGENT_PUSH_INTERVAL seconds,
+# AGENT_PUSH_BATCH samples per request. Batches that cannot be delivered are
+# kept in AGENT_PUSH_SPOOL_DIR (in memory if empty), up to
+# AGENT_PUSH_SPOOL_BATCHES of them.
+PUSH_URL = os.environ.get("AGENT_PUSH_URL", "")
+PUSH_INTERVAL = float(os.environ.get("AGENT_PUSH_INTERVAL", "60"))
+PUSH_BATCH = int(os.environ.get("AGENT_PUSH_BATCH", "5"))
+PUSH_SPOOL_DIR = os.environ.get("AGENT_PUSH_SPOOL_DIR", "")
+PUSH_SPOOL_BATCHES = int(os.environ.get("AGENT_PUSH_SPOOL_BATCHES", "1000"))
+PUSH_TOKEN = os.environ.get("AGENT_PUSH_TOKEN", "")
+# Longest collector profiling window /agent/profile will open
+PROFILE_MAX_SECONDS = float(os.environ.get("AGENT_PROFILE_MAX_SECONDS", "60"))
+# Responses at least this many bytes are gzipped for clients that accept it
+GZIP_MINIMUM_SIZE = int(os.environ.get("AGENT_GZIP_MINIMUM_SIZE", "1000"))
 
 
 class MetricsResponse(BaseModel):
+    # Extra collectors registered beyond the core four are passed through as-is
+    model_config = ConfigDict(extra="allow")
+
     timestamp: str
     hostname: str
     ip_address: str
     os_info: str
-    cpu: Dict[str, Any]
-    memory: Dict[str, Any]
-    disk: Dict[str, Any]
-    processes: List[Dict[str, Any]]
+    # Collectors that have not produced a value yet are returned empty and
+    # flagged in ``status`` instead of failing the whole response
+    cpu: Dict[str, Any] = {}
+    memory: Dict[str, Any] = {}
+    disk: Dict[str, Any] = {}
+    processes: List[Dict[str, Any]] = []
+    status: Dict[str, Dict[str, Any]] = {}
+    version: str = ""
+
+# Collectors sampled by the agent; register new ones here with their own interval
+collectors = CollectorRegistry()
+
+# Host identity is resolved once and refreshed in the background, never per request
+host_identity = HostIdentity(ttl=HOST_REFRESH_TTL)
 
 # Get host information
 def get_host_info():
-    hostname = socket.gethostname()
-    ip_address = socket.gethostbyname(hostname)
-    os_info = f"{platform.system()} {platform.release()}"
-    return hostname, ip_address, os_info
+    identity = host_identity.get()
+    return identity["hostname"], identity["ip_address"], identity["os_info"]
 
 # Get CPU metrics
+@collectors.register("cpu", interval=SAMPLE_INTERVAL, timeout=2.0)
 def get_cpu_metrics():
-    cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-    cpu_times = psutil.cpu_times_percent(interval=1)
+    # Non-blocking: psutil reports usage since the previous call, which the
+    # sampler makes once per SAMPLE_INTERVAL
+    cpu_percent = psutil.cpu_percent(interval=None, percpu=True)
+    cpu_times = psutil.cpu_times_percent(interval=None)
     
     return {
         "percent_usage_per_core": cpu_percent,
@@ -45,11 +131,12 @@ def get_cpu_metrics():
         "user": cpu_times.user,
         "system": cpu_times.system,
         "idle": cpu_times.idle,
-        "cores": psutil.cpu_count(logical=True),
-        "physical_cores": psutil.cpu_count(logical=False)
+        "cores": host_identity.get()["cores"],
+        "physical_cores": host_identity.get()["physical_cores"]
     }
 
 # Get memory metrics
+@collectors.register("memory", interval=SAMPLE_INTERVAL, timeout=2.0)
 def get_memory_metrics():
     memory = psutil.virtual_memory()
     swap = psutil.swap_memory()
@@ -65,14 +152,20 @@ def get_memory_metrics():
         "swap_percent": swap.percent
     }
 
+# Cached per-mount usage, so a slow or hung mount never stalls the disk collector
+disk_usage_cache = DiskUsageCache(interval=DISK_USAGE_INTERVAL, timeout=DISK_USAGE_TIMEOUT)
+
 # Get disk metrics
+@collectors.register("disk", interval=10.0, timeout=DISK_USAGE_TIMEOUT + 5.0)
 def get_disk_metrics():
-    partitions = psutil.disk_partitions()
+    # Local disks only, one mount per device, so the partition sizes can be summed
+    partitions = DISK_FILTER.select(psutil.disk_partitions())
+    usages = disk_usage_cache.get_many(partition.mountpoint for partition in partitions)
     disk_data = []
     
     for partition in partitions:
-        if partition.fstype:
-            usage = psutil.disk_usage(partition.mountpoint)
+        usage = usages.get(partition.mountpoint)
+        if usage is not None:
             disk_data.append({
                 "device": partition.device,
                 "mountpoint": partition.mountpoint,
@@ -97,32 +190,219 @@ def get_disk_metrics():
         "io_stats": io_stats
     }
 
+# Previous counter samples for the I/O rate collectors
+disk_io_rates = RateTracker()
+net_io_rates = RateTracker()
+
+# Get per-disk I/O rates
+@collectors.register("diskio", interval=SAMPLE_INTERVAL, timeout=2.0)
+def get_disk_io_metrics():
+    counters = psutil.disk_io_counters(perdisk=True) or {}
+    rates = disk_io_rates.update({name: c._asdict() for name, c in counters.items()})
+    
+    devices = {}
+    for name, rate in rates.items():
+        devices[name] = {
+            "read_bytes_per_sec": rate["read_bytes"],
+            "write_bytes_per_sec": rate["write_bytes"],
+            "read_iops": rate["read_count"],
+            "write_iops": rate["write_count"],
+            # busy_time is milliseconds spent doing I/O (Linux/FreeBSD only)
+            "busy_percent": min(100.0, rate["busy_time"] / 10) if "busy_time" in rate else None
+        }
+    
+    return {"devices": devices}
+
+# Get per-interface network rates
+@collectors.register("network", interval=SAMPLE_INTERVAL, timeout=2.0)
+def get_network_metrics():
+    counters = psutil.net_io_counters(pernic=True) or {}
+    rates = net_io_rates.update({nic: c._asdict() for nic, c in counters.items()})
+    
+    interfaces = {}
+    for nic, rate in rates.items():
+        interfaces[nic] = {
+            "bytes_sent_per_sec": rate["bytes_sent"],
+            "bytes_recv_per_sec": rate["bytes_recv"],
+            "packets_sent_per_sec": rate["packets_sent"],
+            "packets_recv_per_sec": rate["packets_recv"],
+            "errors_in_per_sec": rate["errin"],
+            "errors_out_per_sec": rate["errout"],
+            "drops_in_per_sec": rate["dropin"],
+            "drops_out_per_sec": rate["dropout"]
+        }
+    
+    return {"interfaces": interfaces}
+
+# Long-lived process table so cpu_percent deltas and static fields survive between samples
+if PROCESS_SCANNER == "procfs" or (PROCESS_SCANNER == "auto" and procfs_available()):
+    process_table = ProcfsProcessTable()
+else:
+    process_table = ProcessTable()
+
 # Get process information
+# Full process tables are too large to keep in the history buffer
+@collectors.register("processes", interval=15.0, timeout=10.0, budget=0.1, history=False)
 def get_process_info():
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent', 'create_time', 'status']):
+    # Ordering is applied per request by select_processes()
+    return process_table.refresh()
+
+
+# Per-cgroup usage (containers, systemd slices); only on cgroup v2 hosts
+if cgroup_v2_available(CGROUP_ROOT):
+    cgroup_table = CgroupTable(CGROUP_ROOT, max_depth=CGROUP_DEPTH)
+
+    @collectors.register("cgroups", interval=5.0, timeout=5.0, history=False)
+    def get_cgroup_metrics():
+        return cgroup_table.refresh()
+
+
+def parse_limit_mode(mode: str, param: str = "processes"):
+    """
+    Parse a /metrics table parameter (``processes``, ``cgroups``): ``all``,
+    ``none`` or ``top:N``. Returns the number of rows to include, or None for
+    all of them.
+    """
+    if mode == "all":
+        return None
+    if mode == "none":
+        return 0
+    if mode.startswith("top:"):
         try:
-            # Get process information
-            process_info = proc.info
-            # Add command line if available
-            try:
-                process_info['cmdline'] = ' '.join(proc.cmdline())
-            except (psutil.AccessDenied, psutil.ZombieProcess):
-                process_info['cmdline'] = "Access Denied"
-            
-            # Format create time
-            if 'create_time' in process_info:
-                process_info['create_time'] = datetime.fromtimestamp(
-                    process_info['create_time']
-                ).strftime('%Y-%m-%d %H:%M:%S')
-            
-            processes.append(process_info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    # Sort processes by CPU usage (descending)
-    processes.sort(key=lambda x: x.get('cpu_percent', 0), reverse=True)
-    return processes
+            count = int(mode[4:])
+        except ValueError:
+            count = -1
+        if count >= 0:
+            return count
+    raise HTTPException(status_code=400, detail=f"Invalid {param} mode: {mode!r} (expected all, none or top:N)")
+
+
+def parse_cursors(value: Optional[str]) -> Dict[str, float]:
+    """
+    Parse the /metrics/history ``cursors`` parameter: comma-separated
+    ``collector:unix_ts`` pairs, as returned in ``cursors``.
+    """
+    cursors = {}
+    for item in (value or "").split(","):
+        if not item:
+            continue
+        name, _, timestamp = item.rpartition(":")
+        try:
+            cursors[name] = float(timestamp)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {item!r} (expected collector:timestamp)")
+    return cursors
+
+
+sampler = Sampler(
+    collectors,
+    history_seconds=HISTORY_SECONDS,
+    max_staleness=MAX_STALENESS,
+)
+sampler.profiler.max_seconds = PROFILE_MAX_SECONDS
+
+# The agent's own overhead, reported at /agent/stats
+agent_process = psutil.Process()
+endpoint_stats = EndpointStats()
+started_at = time.time()
+
+# Pushes every new sample to the /metrics/stream subscribers
+broadcaster = Broadcaster()
+sampler.listeners.append(broadcaster.publish)
+
+# Versions every change so /metrics can answer If-None-Match and ?since_version=
+# (only a few process tables are retained since they are large)
+version_log = VersionLog(depths={"processes": 5})
+sampler.listeners.append(version_log.record)
+
+if ADAPTIVE:
+    adaptive_sampling = AdaptiveSampling(sampler, ADAPTIVE_RULES, fast_interval=ADAPTIVE_FAST_INTERVAL,
+                                         hold=ADAPTIVE_HOLD)
+    sampler.listeners.append(adaptive_sampling.record)
+
+# Lock-free local export of the latest sample; the file is opened by the lifespan
+shared_snapshot = SharedSnapshotWriter(SHM_PATH) if SHM_PATH else None
+if shared_snapshot is not None:
+    sampler.listeners.append(shared_snapshot.record)
+
+# Prometheus exposition, re-rendered once per new sample rather than per scrape
+prometheus_exporter = PrometheusExporter(host_identity.get, top_processes=PROMETHEUS_TOP_PROCESSES)
+sampler.listeners.append(prometheus_exporter.record)
+
+# Optional push to the dashboard; the sending thread is started by the lifespan
+pusher = MetricsPusher(PUSH_URL, host_identity.get, interval=PUSH_INTERVAL, batch_size=PUSH_BATCH,
+                       spool=Spool(PUSH_SPOOL_DIR or None, max_batches=PUSH_SPOOL_BATCHES),
+                       token=PUSH_TOKEN or None) if PUSH_URL else None
+if pusher is not None:
+    sampler.listeners.append(pusher.record)
+
+
+async def get_snapshot(*names: str):
+    """
+    Return the latest sample of the given collectors (default: all). Values
+    older than their collector's interval (or MAX_STALENESS, if larger) are
+    re-collected off the event loop, with concurrent requests sharing a
+    single in-flight collection.
+    """
+    return await sampler.snapshot(names or None)
+
+
+def collector_response(snapshot, name: str):
+    """
+    Build the response for a single collector, or 503 if it has never
+    produced a value (e.g. its first run timed out).
+    """
+    if name not in snapshot:
+        error = snapshot["status"][name].get("error", "no data yet")
+        raise HTTPException(status_code=503, detail=f"{name} metrics unavailable: {error}")
+    return {"timestamp": snapshot["timestamp"], name: snapshot[name], "status": snapshot["status"]}
+
+
+def negotiated_response(request: Request, content: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+    """
+    Render ``content`` in the compact binary encoding if the client asked for
+    it in Accept, otherwise as JSON. Either way the response is built
+    directly, skipping response_model validation of the large snapshot.
+    """
+    if BINARY_CONTENT_TYPE in request.headers.get("accept", ""):
+        return Response(encode_metrics(content, time.time()), media_type=BINARY_CONTENT_TYPE, headers=headers)
+    return JSONResponse(content, headers=headers)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Prime the cpu_percent baselines; the first CPU sample is taken one
+    # interval later so it measures a full interval instead of reading zeros
+    psutil.cpu_percent(interval=None, percpu=True)
+    psutil.cpu_times_percent(interval=None)
+    agent_process.cpu_percent(interval=None)
+    if shared_snapshot is not None:
+        try:
+            shared_snapshot.open()
+        except OSError as e:
+            logger.error(f"Cannot publish shared snapshot to {SHM_PATH}: {str(e)}")
+    host_identity.start()
+    sampler.start(delays={"cpu": collectors.get("cpu").effective_interval})
+    if pusher is not None:
+        pusher.start()
+    yield
+    if pusher is not None:
+        pusher.stop()
+    sampler.stop()
+    host_identity.stop()
+    if shared_snapshot is not None:
+        shared_snapshot.close()
+
+
+app = FastAPI(
+    title="Linux Metrics Agent",
+    description="Agent for collecting system metrics on Linux hosts",
+    version="1.0.0",
+    lifespan=lifespan
+)
+# Starlette leaves text/event-stream uncompressed, so /metrics/stream is unaffected
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+app.add_middleware(RequestStatsMiddleware, stats=endpoint_stats)
 
 @app.get("/", response_model=dict)
 async def root():
@@ -130,30 +410,99 @@ async def root():
     return {
         "message": "Linux Metrics Agent",
         "endpoints": {
+            "/host": "Get static host identity (hostname, IP, OS, core counts)",
             "/metrics": "Get full system metrics",
             "/metrics/cpu": "Get CPU metrics only",
             "/metrics/memory": "Get memory metrics only",
             "/metrics/disk": "Get disk metrics only",
-            "/metrics/processes": "Get process information only"
+            "/metrics/diskio": "Get per-disk I/O rates (bytes/s, IOPS, busy %)",
+            "/metrics/network": "Get per-interface network rates (bytes/s, packets/s, errors/s)",
+            "/metrics/processes": "Get process information only (limit, offset, sort=cpu|memory|pid, user, name)",
+            "/metrics/cgroups": "Get per-cgroup CPU, memory, I/O and pressure on cgroup v2 hosts (limit, sort=cpu|memory|io)",
+            "/metrics/prometheus": "Get the latest samples in the Prometheus text format",
+            "/metrics/history": "Get buffered samples newer than ?since=<unix ts> or per-collector ?cursors=cpu:<ts>,..., optionally thinned to one per ?step=<seconds>",
+            "/metrics/stream": "Server-Sent Events stream of new samples (?collectors=, ?fields=cpu.overall_usage, ?delta=true)",
+            "/agent/stats": "Get the agent's own CPU/RSS, collector timings and errors, and request latency per endpoint",
+            "/agent/profile": "POST ?seconds=N to profile collector runs for a bounded window, GET for the report",
+            "/metrics/{name}": "Get any registered collector: " + ", ".join(collectors.names())
         }
     }
 
+@app.get("/host")
+async def get_host():
+    """Get the cached host identity. Cheap; never touches DNS on the request path."""
+    return host_identity.get()
+
 @app.get("/metrics", response_model=MetricsResponse)
-async def get_metrics():
-    """Get all system metrics including CPU, memory, disk and process information."""
+async def get_metrics(request: Request, processes: str = "all", cgroups: str = "all",
+                      since_version: Optional[str] = None):
+    """
+    Get all system metrics including CPU, memory, disk and process information.
+    ``processes`` and ``cgroups`` may be ``all``, ``none`` or ``top:N`` (top N
+    by CPU usage).
+    Collectors run concurrently with individual deadlines; ``status`` marks
+    any collector whose value is stale or missing.
+
+    The response carries an ETag with the data version (``<epoch>-<n>``,
+    the epoch changing with every agent start): a matching
+    ``If-None-Match`` gets 304 Not Modified. With ``since_version=V`` only
+    what changed after version V is returned: changed fields per collector
+    and added/removed/changed processes (among the top N with ``top:N``).
+    A version from an earlier agent process gets every collector in full.
+
+    Clients sending ``Accept: application/x-sysmetrics`` get the full
+    snapshot in the compact binary encoding (see agent/encoding.py); large
+    responses are gzipped when ``Accept-Encoding`` allows it.
+    """
+    process_limit = parse_limit_mode(processes)
+    cgroup_limit = parse_limit_mode(cgroups, "cgroups")
+    # Read the version before collecting so it never claims newer data than it returns
+    current_version = version_log.tag(version_log.current(collectors.names()))
+    etag = f'"{current_version}"'
+    if since_version is None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
     try:
         hostname, ip_address, os_info = get_host_info()
-        
-        return {
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        snapshot = await get_snapshot()
+
+        if since_version is not None:
+            excluded = {name for name, limit in (("processes", process_limit), ("cgroups", cgroup_limit)) if limit == 0}
+            names = [name for name in collectors.names() if name not in excluded]
+            select = {}
+            if process_limit:
+                select["processes"] = lambda rows: select_processes(rows, limit=process_limit)[1]
+            if cgroup_limit:
+                select["cgroups"] = lambda groups: select_cgroups(groups, limit=cgroup_limit)
+            version, changes, full = version_log.changes_since(names, version_log.parse(since_version), select)
+            version = version_log.tag(version)
+            return JSONResponse({
+                "timestamp": snapshot["timestamp"],
+                "hostname": hostname,
+                "ip_address": ip_address,
+                "os_info": os_info,
+                "version": version,
+                "since_version": since_version,
+                "changes": changes,
+                "full": full,
+                "status": snapshot["status"]
+            }, headers={"ETag": f'"{version}"'})
+
+        if cgroup_limit == 0:
+            snapshot.pop("cgroups", None)
+        elif "cgroups" in snapshot:
+            snapshot["cgroups"] = select_cgroups(snapshot["cgroups"], limit=cgroup_limit)
+        return negotiated_response(request, {
+            **snapshot,
+            "cpu": snapshot.get("cpu", {}),
+            "memory": snapshot.get("memory", {}),
+            "disk": snapshot.get("disk", {}),
             "hostname": hostname,
             "ip_address": ip_address,
             "os_info": os_info,
-            "cpu": get_cpu_metrics(),
-            "memory": get_memory_metrics(),
-            "disk": get_disk_metrics(),
-            "processes": get_process_info()
-        }
+            "processes": select_processes(snapshot.get("processes", []), limit=process_limit)[1],
+            "version": current_version
+        }, headers={"ETag": etag, "Vary": "Accept"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error collecting metrics: {str(e)}")
 
@@ -161,7 +510,9 @@ async def get_metrics():
 async def get_cpu():
     """Get CPU metrics only."""
     try:
-        return {"timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "cpu": get_cpu_metrics()}
+        return collector_response(await get_snapshot("cpu"), "cpu")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error collecting CPU metrics: {str(e)}")
 
@@ -169,7 +520,9 @@ async def get_cpu():
 async def get_memory():
     """Get memory metrics only."""
     try:
-        return {"timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "memory": get_memory_metrics()}
+        return collector_response(await get_snapshot("memory"), "memory")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error collecting memory metrics: {str(e)}")
 
@@ -177,18 +530,195 @@ async def get_memory():
 async def get_disk():
     """Get disk metrics only."""
     try:
-        return {"timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "disk": get_disk_metrics()}
+        return collector_response(await get_snapshot("disk"), "disk")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error collecting disk metrics: {str(e)}")
 
 @app.get("/metrics/processes")
-async def get_processes():
-    """Get process information only."""
+async def get_processes(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("cpu", pattern="^(cpu|memory|pid)$"),
+    user: Optional[str] = None,
+    name: Optional[str] = None
+):
+    """
+    Get process information only. Supports filtering by exact ``user`` and by a
+    case-insensitive ``name`` substring (matched against name and cmdline),
+    ordering by ``sort`` and paging with ``limit``/``offset``.
+    """
     try:
-        return {"timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'), "processes": get_process_info()}
+        snapshot = await get_snapshot("processes")
+        collector_response(snapshot, "processes")
+        total, page = select_processes(
+            snapshot["processes"], sort=sort, limit=limit, offset=offset, user=user, name=name
+        )
+        return {"timestamp": snapshot["timestamp"], "total": total, "processes": page, "status": snapshot["status"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error collecting process information: {str(e)}")
 
+@app.get("/metrics/cgroups")
+async def get_cgroups(
+    limit: Optional[int] = Query(None, ge=1),
+    sort: str = Query("cpu", pattern="^(cpu|memory|io)$")
+):
+    """
+    Get per-cgroup CPU %, memory current/peak, I/O rates and PSI pressure,
+    ordered by ``sort`` and optionally limited to the top ``limit`` cgroups.
+    Only available on cgroup v2 hosts.
+    """
+    if "cgroups" not in collectors:
+        raise HTTPException(status_code=404, detail="cgroup v2 is not available on this host")
+    try:
+        snapshot = await get_snapshot("cgroups")
+        collector_response(snapshot, "cgroups")
+        return {
+            "timestamp": snapshot["timestamp"],
+            "total": len(snapshot["cgroups"]),
+            "cgroups": select_cgroups(snapshot["cgroups"], sort=sort, limit=limit),
+            "status": snapshot["status"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error collecting cgroup metrics: {str(e)}")
+
+@app.get("/metrics/prometheus")
+async def get_prometheus():
+    """
+    Get the latest samples in the Prometheus text exposition format. Served
+    from a buffer rendered once per sample; never triggers a collection.
+    """
+    return Response(prometheus_exporter.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/metrics/history")
+async def get_history(
+    since: Optional[float] = None,
+    step: Optional[float] = Query(None, gt=0),
+    names: Optional[str] = Query(None, alias="collectors"),
+    cursors: Optional[str] = None
+):
+    """
+    Get buffered samples newer than ``since`` (unix timestamp) for every
+    collector, or only the comma-separated ``collectors``. Samples are
+    ``[timestamp, value]`` pairs.
+
+    Collectors are sampled concurrently, so a slower one can record a sample
+    older than another's newest; each collector therefore gets its own
+    cursor. Pass the returned ``cursors`` back as
+    ``cursors=cpu:<ts>,memory:<ts>`` (they take precedence over ``since``)
+    to continue without gaps or duplicates.
+    """
+    positions = parse_cursors(cursors)
+    selected = names.split(",") if names else sampler.history.names()
+    history = {}
+    next_cursors = {}
+    for name in selected:
+        start = positions.get(name, since)
+        history[name] = sampler.history.since(name, start, step)
+        next_cursors[name] = history[name][-1][0] if history[name] else start
+    return {
+        "cursors": next_cursors,
+        "history": history
+    }
+
+@app.get("/metrics/stream")
+async def stream_metrics(
+    names: Optional[str] = Query(None, alias="collectors"),
+    fields: Optional[str] = None,
+    delta: bool = False
+):
+    """
+    Stream each new sample as a Server-Sent Event. By default every collector
+    that is kept in history (i.e. not the full process table) is streamed;
+    ``collectors`` picks specific ones and ``fields`` (e.g.
+    ``cpu.overall_usage,memory.percent_used``) limits the fields sent. With
+    ``delta=true`` only fields that changed since the previous frame are sent.
+    """
+    selection = parse_fields(fields)
+    if names:
+        selected = names.split(",")
+    elif selection:
+        selected = list(selection)
+    else:
+        selected = [collector.name for collector in collectors if collector.history]
+    unknown = [name for name in selected if name not in collectors]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown collector: {', '.join(unknown)}")
+
+    subscription = broadcaster.subscribe(selected)
+
+    async def events():
+        try:
+            async for event in sse_events(subscription, sampler.values(selected), selection, delta):
+                yield event
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/agent/stats")
+async def get_agent_stats():
+    """
+    Get the agent's own overhead: RSS and CPU of the agent process, per
+    collector run counts, errors and duration histograms (with the interval
+    actually used after budget stretching), and request latency per endpoint.
+    """
+    collector_stats = sampler.stats.as_dict()
+    for collector in collectors:
+        collector_stats.setdefault(collector.name, {}).update({
+            "interval": collector.interval,
+            "effective_interval": collector.effective_interval,
+            "boost_interval": collector.boost_interval,
+            "last_duration": collector.last_duration,
+        })
+    return {
+        "uptime": round(time.time() - started_at, 1),
+        "process": process_stats(agent_process),
+        "collectors": collector_stats,
+        "endpoints": endpoint_stats.as_dict(),
+        "profiler": {"active": sampler.profiler.active}
+    }
+
+@app.post("/agent/profile")
+async def start_profile(seconds: float = Query(10.0, gt=0)):
+    """
+    Profile every collector run with cProfile for ``seconds`` (capped at
+    AGENT_PROFILE_MAX_SECONDS). Read the report from GET /agent/profile.
+    """
+    return {"profiling": True, "seconds": sampler.profiler.start(seconds)}
+
+@app.delete("/agent/profile")
+async def stop_profile():
+    """Close the current profiling window early."""
+    sampler.profiler.stop()
+    return {"profiling": False}
+
+@app.get("/agent/profile")
+async def get_profile(limit: int = Query(30, ge=1), sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$")):
+    """Get the cProfile report of the current or last profiling window."""
+    return sampler.profiler.report(limit, sort)
+
+@app.get("/metrics/{name}")
+async def get_collector(name: str):
+    """Get the latest value of any registered collector."""
+    if name not in collectors:
+        raise HTTPException(status_code=404, detail=f"Unknown collector: {name}")
+    try:
+        return collector_response(await get_snapshot(name), name)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error collecting {name} metrics: {str(e)}")
+
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
+    uvicorn.run("agent.main:app", host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
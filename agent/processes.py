@@ -0,0 +1,130 @@
+# agent/processes.py
+import heapq
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+
+class _ProcessEntry:
+    """
+    A tracked process: the long-lived psutil.Process plus its immutable fields.
+    """
+
+    __slots__ = ("proc", "key", "static")
+
+    def __init__(self, proc: psutil.Process):
+        self.proc = proc
+        with proc.oneshot():
+            create_time = proc.create_time()
+            name = proc.name()
+            try:
+                username = proc.username()
+            except psutil.AccessDenied:
+                username = None
+            try:
+                cmdline = ' '.join(proc.cmdline())
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                cmdline = "Access Denied"
+
+        self.key = (proc.pid, create_time)
+        self.static = {
+            "pid": proc.pid,
+            "name": name,
+            "username": username,
+            "create_time": datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S'),
+            "cmdline": cmdline,
+        }
+        # First call only sets the baseline; the next sample returns a real delta
+        proc.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        row = dict(self.static)
+        with self.proc.oneshot():
+            try:
+                row["cpu_percent"] = self.proc.cpu_percent(interval=None)
+                row["memory_percent"] = self.proc.memory_percent()
+            except psutil.AccessDenied:
+                row["cpu_percent"] = 0.0
+                row["memory_percent"] = 0.0
+            row["status"] = self.proc.status()
+        return row
+
+
+class ProcessTable:
+    """
+    Process table that persists between samples.
+
+    Entries are keyed by (pid, create_time) so a recycled pid is treated as a
+    new process. Keeping the psutil.Process objects alive gives cpu_percent a
+    real delta since the previous sample, and cmdline, username and the
+    formatted start time are only read once per process.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, float], _ProcessEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """
+        Sample every running process and drop entries for processes that exited.
+        """
+        with self._lock:
+            by_pid = {key[0]: entry for key, entry in self._entries.items()}
+            entries = {}
+            rows = []
+            for pid in psutil.pids():
+                entry = by_pid.get(pid)
+                try:
+                    if entry is None or not entry.proc.is_running():
+                        entry = _ProcessEntry(psutil.Process(pid))
+                    rows.append(entry.sample())
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+                entries[entry.key] = entry
+
+            self._entries = entries
+            return rows
+
+
+# Sort keys for select_processes; CPU and memory rank highest first, pid ascending
+SORT_KEYS = {
+    "cpu": (lambda row: row.get("cpu_percent") or 0, True),
+    "memory": (lambda row: row.get("memory_percent") or 0, True),
+    "pid": (lambda row: row["pid"], False),
+}
+
+
+def select_processes(processes: List[Dict[str, Any]], sort: str = "cpu", limit: Optional[int] = None,
+                     offset: int = 0, user: Optional[str] = None,
+                     name: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Filter, order and page a process list.
+
+    When a limit is given only the first offset + limit rows are selected with
+    a heap instead of sorting the whole table. Returns the number of rows that
+    matched the filters together with the requested page.
+    """
+    key, descending = SORT_KEYS[sort]
+
+    rows = processes
+    if user is not None:
+        rows = [row for row in rows if row.get("username") == user]
+    if name:
+        needle = name.lower()
+        rows = [row for row in rows
+                if needle in (row.get("name") or "").lower() or needle in (row.get("cmdline") or "").lower()]
+
+    if limit is None:
+        ordered = sorted(rows, key=key, reverse=descending)
+    elif descending:
+        ordered = heapq.nlargest(offset + limit, rows, key=key)
+    else:
+        ordered = heapq.nsmallest(offset + limit, rows, key=key)
+
+    end = None if limit is None else offset + limit
+    return len(rows), ordered[offset:end]
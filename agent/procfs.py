@@ -0,0 +1,203 @@
+# agent/procfs.py
+import os
+import pwd
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+PROC = "/proc"
+
+# Single-letter states from /proc/<pid>/stat, named the way psutil reports them
+STATES = {
+    "R": psutil.STATUS_RUNNING,
+    "S": psutil.STATUS_SLEEPING,
+    "D": psutil.STATUS_DISK_SLEEP,
+    "T": psutil.STATUS_STOPPED,
+    "t": psutil.STATUS_TRACING_STOP,
+    "Z": psutil.STATUS_ZOMBIE,
+    "X": psutil.STATUS_DEAD,
+    "x": psutil.STATUS_DEAD,
+    "K": "wake-kill",
+    "W": psutil.STATUS_WAKING,
+    "I": psutil.STATUS_IDLE,
+    "P": psutil.STATUS_PARKED,
+}
+
+# Fields of /proc/<pid>/stat counted from the one after "(comm)"
+_STATE, _UTIME, _STIME, _STARTTIME = 0, 11, 12, 19
+
+
+def procfs_available() -> bool:
+    """
+    Whether the /proc fast path can be used on this machine.
+    """
+    return psutil.LINUX and os.path.exists(os.path.join(PROC, str(os.getpid()), "stat"))
+
+
+class _Entry:
+    """
+    A tracked process: its immutable fields plus the CPU time seen at the
+    previous sample.
+    """
+
+    __slots__ = ("key", "static", "cpu_ticks")
+
+    def __init__(self, key: Tuple[int, int], static: Dict[str, Any], cpu_ticks: int):
+        self.key = key
+        self.static = static
+        self.cpu_ticks = cpu_ticks
+
+
+class ProcfsProcessTable:
+    """
+    Linux-only drop-in for ProcessTable that reads /proc directly.
+
+    Each sample costs one read of ``/proc/<pid>/stat`` and ``statm`` into a
+    reused buffer; ``cmdline`` and ``status`` (for the owner) are only read
+    when a process is first seen. CPU% is the change in utime + stime since
+    the previous sample over the wall time between samples, which is what
+    psutil's ``cpu_percent(interval=None)`` reports. Rows have the same shape
+    as ProcessTable's.
+    """
+
+    def __init__(self, proc: str = PROC):
+        self.proc = proc
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.boot_time = psutil.boot_time()
+        self.total_memory = psutil.virtual_memory().total
+        self._buffer = bytearray(4096)
+        self._users: Dict[int, Optional[str]] = {}
+        self._entries: Dict[Tuple[int, int], _Entry] = {}
+        self._sampled_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _read(self, path: str) -> bytes:
+        """
+        Read a whole /proc file into the shared buffer, growing it if needed.
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = 0
+            while True:
+                view = memoryview(self._buffer)[size:]
+                count = os.readv(fd, [view])
+                view.release()
+                if count == 0:
+                    break
+                size += count
+                if size == len(self._buffer):
+                    self._buffer.extend(bytes(len(self._buffer)))
+            return bytes(self._buffer[:size])
+        finally:
+            os.close(fd)
+
+    def _username(self, pid: int) -> Optional[str]:
+        # Owner is the real uid, as psutil.Process.username() reports it
+        for line in self._read(f"{self.proc}/{pid}/status").splitlines():
+            if line.startswith(b"Uid:"):
+                uid = int(line.split()[1])
+                break
+        else:
+            return None
+        if uid not in self._users:
+            try:
+                self._users[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self._users[uid] = str(uid)
+        return self._users[uid]
+
+    def _cmdline(self, pid: int) -> List[str]:
+        data = self._read(f"{self.proc}/{pid}/cmdline").decode("utf-8", "surrogateescape")
+        if data.endswith("\x00"):
+            data = data[:-1]
+        if not data:
+            return []
+        # Processes that rewrite their title may use spaces instead of NULs
+        return data.split("\x00" if "\x00" in data else " ")
+
+    def _new_entry(self, pid: int, comm: str, starttime: int, cpu_ticks: int) -> _Entry:
+        try:
+            cmdline = self._cmdline(pid)
+            joined = ' '.join(cmdline)
+        except PermissionError:
+            cmdline, joined = [], "Access Denied"
+        name = comm
+        if len(comm) >= 15 and cmdline:
+            # comm is truncated to 15 characters; recover the full name like psutil
+            candidate = os.path.basename(cmdline[0])
+            if candidate.startswith(comm):
+                name = candidate
+        try:
+            username = self._username(pid)
+        except PermissionError:
+            username = None
+
+        create_time = self.boot_time + starttime / self.clock_ticks
+        static = {
+            "pid": pid,
+            "name": name,
+            "username": username,
+            "create_time": datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S'),
+            "cmdline": joined,
+        }
+        return _Entry((pid, starttime), static, cpu_ticks)
+
+    def _pids(self) -> List[int]:
+        return [int(name) for name in os.listdir(self.proc) if name.isdigit()]
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """
+        Sample every running process and drop entries for processes that exited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = None if self._sampled_at is None else now - self._sampled_at
+            self._sampled_at = now
+
+            by_pid = {key[0]: entry for key, entry in self._entries.items()}
+            entries = {}
+            rows = []
+            for pid in self._pids():
+                try:
+                    stat = self._read(f"{self.proc}/{pid}/stat")
+                    statm = self._read(f"{self.proc}/{pid}/statm")
+                except (FileNotFoundError, ProcessLookupError, PermissionError):
+                    continue
+
+                # comm may itself contain spaces and parentheses
+                close = stat.rindex(b")")
+                comm = stat[stat.index(b"(") + 1:close].decode("utf-8", "surrogateescape")
+                fields = stat[close + 2:].split()
+                starttime = int(fields[_STARTTIME])
+                cpu_ticks = int(fields[_UTIME]) + int(fields[_STIME])
+
+                entry = by_pid.get(pid)
+                if entry is None or entry.key[1] != starttime:
+                    try:
+                        entry = self._new_entry(pid, comm, starttime, cpu_ticks)
+                    except (FileNotFoundError, ProcessLookupError):
+                        continue
+                    cpu_percent = 0.0
+                elif elapsed:
+                    cpu_percent = (cpu_ticks - entry.cpu_ticks) / self.clock_ticks / elapsed * 100
+                else:
+                    cpu_percent = 0.0
+                entry.cpu_ticks = cpu_ticks
+
+                rss = int(statm.split()[1]) * self.page_size
+                row = dict(entry.static)
+                row["cpu_percent"] = round(cpu_percent, 1)
+                row["memory_percent"] = rss / self.total_memory * 100
+                row["status"] = STATES.get(fields[_STATE].decode(), fields[_STATE].decode())
+                rows.append(row)
+                entries[entry.key] = entry
+
+            self._entries = entries
+            return rows
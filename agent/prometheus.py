@@ -0,0 +1,245 @@
+# agent/prometheus.py
+import heapq
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[Dict[str, Any], Any]
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def family(name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> str:
+    """
+    Render one metric family in the Prometheus text format. Samples whose
+    value is None are skipped.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        if labels:
+            label_text = ",".join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {format_value(value)}")
+        else:
+            lines.append(f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_cpu(cpu: Dict[str, Any], **_) -> List[str]:
+    return [
+        family("sysmetrics_cpu_usage_percent", "gauge", "Overall CPU usage averaged over all cores.",
+               [({}, cpu.get("overall_usage"))]),
+        family("sysmetrics_cpu_core_usage_percent", "gauge", "CPU usage per logical core.",
+               [({"core": core}, value) for core, value in enumerate(cpu.get("percent_usage_per_core") or [])]),
+        family("sysmetrics_cpu_time_percent", "gauge", "Share of CPU time spent per mode.",
+               [({"mode": mode}, cpu.get(mode)) for mode in ("user", "system", "idle")]),
+        family("sysmetrics_cpu_cores", "gauge", "Number of CPU cores.",
+               [({"kind": "logical"}, cpu.get("cores")), ({"kind": "physical"}, cpu.get("physical_cores"))]),
+    ]
+
+
+def render_memory(memory: Dict[str, Any], **_) -> List[str]:
+    bytes_fields = [
+        ("sysmetrics_memory_total_bytes", "total", "Total physical memory."),
+        ("sysmetrics_memory_available_bytes", "available", "Memory available without swapping."),
+        ("sysmetrics_memory_used_bytes", "used", "Memory in use."),
+        ("sysmetrics_memory_free_bytes", "free", "Memory not used at all."),
+        ("sysmetrics_swap_total_bytes", "swap_total", "Total swap space."),
+        ("sysmetrics_swap_used_bytes", "swap_used", "Swap space in use."),
+    ]
+    return [family(name, "gauge", help_text, [({}, memory.get(field))]) for name, field, help_text in bytes_fields] + [
+        family("sysmetrics_memory_used_percent", "gauge", "Memory usage percentage.", [({}, memory.get("percent_used"))]),
+        family("sysmetrics_swap_used_percent", "gauge", "Swap usage percentage.", [({}, memory.get("swap_percent"))]),
+    ]
+
+
+def render_disk(disk: Dict[str, Any], **_) -> List[str]:
+    partitions = disk.get("partitions") or []
+
+    def per_partition(field):
+        return [({"device": p["device"], "mountpoint": p["mountpoint"], "fstype": p["fstype"]}, p.get(field))
+                for p in partitions]
+
+    io_stats = disk.get("io_stats") or {}
+    return [
+        family("sysmetrics_filesystem_size_bytes", "gauge", "Filesystem size.", per_partition("total")),
+        family("sysmetrics_filesystem_used_bytes", "gauge", "Filesystem space in use.", per_partition("used")),
+        family("sysmetrics_filesystem_free_bytes", "gauge", "Filesystem space free.", per_partition("free")),
+        family("sysmetrics_filesystem_used_percent", "gauge", "Filesystem usage percentage.", per_partition("percent_used")),
+        family("sysmetrics_disk_reads_completed_total", "counter", "Reads completed on all disks.",
+               [({}, io_stats.get("read_count"))]),
+        family("sysmetrics_disk_writes_completed_total", "counter", "Writes completed on all disks.",
+               [({}, io_stats.get("write_count"))]),
+        family("sysmetrics_disk_read_bytes_total", "counter", "Bytes read from all disks.",
+               [({}, io_stats.get("read_bytes"))]),
+        family("sysmetrics_disk_written_bytes_total", "counter", "Bytes written to all disks.",
+               [({}, io_stats.get("write_bytes"))]),
+    ]
+
+
+def render_diskio(diskio: Dict[str, Any], **_) -> List[str]:
+    devices = diskio.get("devices") or {}
+    fields = [
+        ("sysmetrics_disk_read_bytes_per_second", "read_bytes_per_sec", "Bytes read per second."),
+        ("sysmetrics_disk_write_bytes_per_second", "write_bytes_per_sec", "Bytes written per second."),
+        ("sysmetrics_disk_read_iops", "read_iops", "Reads completed per second."),
+        ("sysmetrics_disk_write_iops", "write_iops", "Writes completed per second."),
+        ("sysmetrics_disk_busy_percent", "busy_percent", "Share of time the disk was busy."),
+    ]
+    return [family(name, "gauge", help_text, [({"device": device}, rates.get(field)) for device, rates in devices.items()])
+            for name, field, help_text in fields]
+
+
+def render_network(network: Dict[str, Any], **_) -> List[str]:
+    interfaces = network.get("interfaces") or {}
+    fields = [
+        ("sysmetrics_network_receive_bytes_per_second", "bytes_recv_per_sec", "Bytes received per second."),
+        ("sysmetrics_network_transmit_bytes_per_second", "bytes_sent_per_sec", "Bytes sent per second."),
+        ("sysmetrics_network_receive_packets_per_second", "packets_recv_per_sec", "Packets received per second."),
+        ("sysmetrics_network_transmit_packets_per_second", "packets_sent_per_sec", "Packets sent per second."),
+        ("sysmetrics_network_receive_errors_per_second", "errors_in_per_sec", "Receive errors per second."),
+        ("sysmetrics_network_transmit_errors_per_second", "errors_out_per_sec", "Transmit errors per second."),
+        ("sysmetrics_network_receive_drops_per_second", "drops_in_per_sec", "Inbound packets dropped per second."),
+        ("sysmetrics_network_transmit_drops_per_second", "drops_out_per_sec", "Outbound packets dropped per second."),
+    ]
+    return [family(name, "gauge", help_text, [({"interface": nic}, rates.get(field)) for nic, rates in interfaces.items()])
+            for name, field, help_text in fields]
+
+
+def render_processes(processes: List[Dict[str, Any]], top_processes: int = 10, **_) -> List[str]:
+    # Only the busiest processes: one series per pid would explode cardinality
+    top = heapq.nlargest(top_processes, processes, key=lambda row: row.get("cpu_percent") or 0)
+
+    def labels(row):
+        return {"pid": row["pid"], "name": row.get("name") or "", "username": row.get("username") or ""}
+
+    return [
+        family("sysmetrics_processes", "gauge", "Number of processes.", [({}, len(processes))]),
+        family("sysmetrics_process_cpu_percent", "gauge", "CPU usage of the top processes by CPU.",
+               [(labels(row), row.get("cpu_percent")) for row in top]),
+        family("sysmetrics_process_memory_percent", "gauge", "Memory usage of the top processes by CPU.",
+               [(labels(row), row.get("memory_percent")) for row in top]),
+    ]
+
+
+def render_cgroups(cgroups: Dict[str, Dict[str, Any]], **_) -> List[str]:
+    fields = [
+        ("sysmetrics_cgroup_cpu_percent", "cpu_percent", "CPU usage of the cgroup as a percentage of one core."),
+        ("sysmetrics_cgroup_memory_current_bytes", "memory_current", "Memory charged to the cgroup."),
+        ("sysmetrics_cgroup_memory_peak_bytes", "memory_peak", "Peak memory charged to the cgroup."),
+        ("sysmetrics_cgroup_io_read_bytes_per_second", "io_read_bytes_per_sec", "Bytes read by the cgroup per second."),
+        ("sysmetrics_cgroup_io_write_bytes_per_second", "io_write_bytes_per_sec", "Bytes written by the cgroup per second."),
+        ("sysmetrics_cgroup_pids", "pids", "Processes in the cgroup."),
+    ]
+    pressure = [({"cgroup": path, "resource": resource, "kind": kind}, value)
+                for path, row in cgroups.items()
+                for resource, kinds in (row.get("pressure") or {}).items()
+                for kind, value in kinds.items()]
+    return [family(name, "gauge", help_text, [({"cgroup": path}, row.get(field)) for path, row in cgroups.items()])
+            for name, field, help_text in fields] + [
+        family("sysmetrics_cgroup_pressure_percent", "gauge", "PSI share of time stalled, 10 second average.", pressure),
+    ]
+
+
+def render_generic(value: Any, name: str = "", **_) -> List[str]:
+    # Collectors without a dedicated renderer: export their top-level numbers
+    if not isinstance(value, dict):
+        return []
+    return [family(f"sysmetrics_{name}_{field}", "gauge", f"{field} from the {name} collector.", [({}, number)])
+            for field, number in value.items()
+            if isinstance(number, (int, float)) and not isinstance(number, bool)]
+
+
+RENDERERS: Dict[str, Callable[..., List[str]]] = {
+    "cpu": render_cpu,
+    "memory": render_memory,
+    "disk": render_disk,
+    "diskio": render_diskio,
+    "network": render_network,
+    "processes": render_processes,
+    "cgroups": render_cgroups,
+}
+
+
+class PrometheusExporter:
+    """
+    Prometheus text exposition of the latest samples.
+
+    Used as a sampler listener. Each collector's block of metric families is
+    rendered once per new sample of that collector (lazily, on the next
+    scrape) and the whole exposition is kept as a cached byte buffer, so
+    concurrent scrapes between samples share it without re-rendering.
+    """
+
+    def __init__(self, host_info: Optional[Callable[[], Dict[str, Any]]] = None, top_processes: int = 10):
+        self.host_info = host_info
+        self.top_processes = top_processes
+        self._values: Dict[str, Tuple[float, Any]] = {}
+        self._blocks: Dict[str, str] = {}
+        # Collectors with a sample newer than their rendered block, in arrival order
+        self._dirty: Dict[str, None] = {}
+        self._buffer: Optional[bytes] = None
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+
+    def record(self, name: str, timestamp: float, value: Any):
+        with self._lock:
+            self._values[name] = (timestamp, value)
+            self._dirty[name] = None
+            self._buffer = None
+
+    def _render_block(self, name: str, value: Any) -> str:
+        renderer = RENDERERS.get(name, render_generic)
+        return "".join(renderer(value, name=name, top_processes=self.top_processes))
+
+    def render(self) -> bytes:
+        """
+        Return the current exposition, re-rendering only the collectors that
+        produced a new sample since the previous render.
+        """
+        with self._lock:
+            if self._buffer is not None:
+                return self._buffer
+
+        # One renderer at a time; scrapes arriving meanwhile wait and reuse its buffer
+        with self._render_lock:
+            with self._lock:
+                if self._buffer is not None:
+                    return self._buffer
+                dirty = {name: self._values[name] for name in self._dirty}
+                self._dirty = {}
+
+            blocks = {name: self._render_block(name, value) for name, (_, value) in dirty.items()}
+
+            with self._lock:
+                self._blocks.update(blocks)
+                parts = []
+                if self.host_info is not None:
+                    info = self.host_info()
+                    parts.append(family("sysmetrics_host_info", "gauge", "Host identity.", [(
+                        {"hostname": info.get("hostname"), "ip_address": info.get("ip_address"),
+                         "os_info": info.get("os_info")}, 1
+                    )]))
+                parts.append(family(
+                    "sysmetrics_collector_last_sample_timestamp_seconds", "gauge",
+                    "Unix time of each collector's latest sample.",
+                    [({"collector": name}, timestamp) for name, (timestamp, _) in self._values.items()]
+                ))
+                parts.extend(self._blocks[name] for name in self._values if name in self._blocks)
+                buffer = "".join(parts).encode("utf-8")
+                # A sample that arrived while rendering invalidates this buffer
+                if not self._dirty:
+                    self._buffer = buffer
+            return buffer
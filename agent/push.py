@@ -0,0 +1,242 @@
+# agent/push.py
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/x-ndjson"
+# Collectors the dashboard stores; everything else stays on the agent
+PUSHED_COLLECTORS = ("cpu", "memory", "disk")
+
+
+def encode_batch(documents: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode samples as gzip-compressed NDJSON, one sample per line.
+    """
+    lines = "".join(json.dumps(document, separators=(",", ":")) + "\n" for document in documents)
+    return gzip.compress(lines.encode("utf-8"))
+
+
+class Spool:
+    """
+    Bounded FIFO of encoded batches waiting to be sent.
+
+    Kept in memory, or in ``directory`` (one file per batch) so batches
+    survive an agent restart. Once ``max_batches`` are queued the oldest
+    batch is dropped to make room.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_batches: int = 1000):
+        self.directory = directory
+        self.max_batches = max_batches
+        self.dropped = 0
+        self._memory: Deque[bytes] = deque()
+        self._counter = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _files(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".ndjson.gz"))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._files()) if self.directory else len(self._memory)
+
+    def put(self, batch: bytes):
+        with self._lock:
+            if self.directory:
+                files = self._files()
+                for name in files[:max(0, len(files) - self.max_batches + 1)]:
+                    os.unlink(os.path.join(self.directory, name))
+                    self.dropped += 1
+                self._counter += 1
+                path = os.path.join(self.directory, f"{time.time_ns():020d}-{self._counter:06d}.ndjson.gz")
+                # Write then rename, so a crash never leaves a truncated batch behind
+                with open(path + ".tmp", "wb") as f:
+                    f.write(batch)
+                os.replace(path + ".tmp", path)
+            else:
+                if len(self._memory) >= self.max_batches:
+                    self._memory.popleft()
+                    self.dropped += 1
+                self._memory.append(batch)
+
+    def peek(self) -> Optional[bytes]:
+        """
+        Return the oldest batch without removing it, or None if empty.
+        """
+        with self._lock:
+            if not self.directory:
+                return self._memory[0] if self._memory else None
+            files = self._files()
+            if not files:
+                return None
+            with open(os.path.join(self.directory, files[0]), "rb") as f:
+                return f.read()
+
+    def pop(self):
+        """
+        Remove the oldest batch.
+        """
+        with self._lock:
+            if not self.directory:
+                if self._memory:
+                    self._memory.popleft()
+                return
+            files = self._files()
+            if files:
+                os.unlink(os.path.join(self.directory, files[0]))
+
+
+class MetricsPusher:
+    """
+    Push mode: ship samples to the dashboard instead of waiting to be polled.
+
+    Used as a sampler listener that keeps the latest CPU, memory and disk
+    values. Every ``interval`` seconds a background thread turns them into a
+    sample in the same format as /metrics (without processes), and every
+    ``batch_size`` samples it POSTs them as one gzip-compressed NDJSON batch
+    over a keep-alive session.
+
+    Batches go through the bounded ``spool`` and are sent oldest first.
+    While the dashboard is unreachable or failing, sending is retried with
+    exponential backoff (with jitter, capped at ``max_backoff`` seconds) and
+    new batches keep queueing up in the spool. A batch the dashboard rejects
+    as invalid (4xx) is dropped rather than retried forever.
+    """
+
+    def __init__(self, url: str, host_info: Callable[[], Dict[str, Any]], interval: float = 60.0,
+                 batch_size: int = 5, spool: Optional[Spool] = None,
+                 timeout: Tuple[float, float] = (3.05, 10.0), max_backoff: float = 300.0,
+                 token: Optional[str] = None, session: Optional[requests.Session] = None):
+        self.url = url
+        self.host_info = host_info
+        self.interval = interval
+        self.batch_size = batch_size
+        self.spool = spool if spool is not None else Spool()
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.session = session or requests.Session()
+        self.session.headers.update({"Content-Type": CONTENT_TYPE, "Content-Encoding": "gzip"})
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.failures = 0
+        self.sent = 0
+        self._values: Dict[str, Tuple[float, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, name: str, timestamp: float, value: Any):
+        if name in PUSHED_COLLECTORS:
+            with self._lock:
+                self._values[name] = (timestamp, value)
+
+    def sample(self) -> Optional[Dict[str, Any]]:
+        """
+        Build a sample from the latest values, or None before the first CPU
+        sample.
+        """
+        with self._lock:
+            values = dict(self._values)
+        if "cpu" not in values:
+            return None
+        identity = self.host_info()
+        timestamp = max(timestamp for timestamp, _ in values.values())
+        return {
+            "timestamp": datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+            "hostname": identity["hostname"],
+            "ip_address": identity["ip_address"],
+            "os_info": identity["os_info"],
+            **{name: values[name][1] if name in values else {} for name in PUSHED_COLLECTORS},
+        }
+
+    def add(self, document: Dict[str, Any]):
+        """
+        Queue a sample; a full batch is moved to the spool.
+        """
+        self._pending.append(document)
+        if len(self._pending) >= self.batch_size:
+            self.spool.put(encode_batch(self._pending))
+            self._pending = []
+
+    def _backoff(self) -> float:
+        return min(self.max_backoff, self.interval * 2 ** (self.failures - 1)) * random.uniform(0.5, 1.0)
+
+    def flush(self, until: Optional[float] = None) -> bool:
+        """
+        Send spooled batches, oldest first, until the spool is empty (returns
+        True) or the dashboard fails (schedules a retry). Gives up early once
+        the pusher is stopping, or past monotonic time ``until`` if given.
+        """
+        while time.monotonic() < until if until is not None else not self._stop.is_set():
+            batch = self.spool.peek()
+            if batch is None:
+                return True
+            try:
+                response = self.session.post(self.url, data=batch, timeout=self.timeout)
+                if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                    logger.error(f"Dashboard rejected a batch of samples ({response.status_code}), dropping it")
+                    self.spool.pop()
+                    continue
+                response.raise_for_status()
+            except requests.RequestException as e:
+                self.failures += 1
+                delay = self._backoff()
+                self._retry_at = time.monotonic() + delay
+                logger.warning(f"Failed to push samples to {self.url}: {str(e)} "
+                               f"({len(self.spool)} batches spooled, retrying in {delay:.0f}s)")
+                return False
+            self.spool.pop()
+            self.sent += 1
+            self.failures = 0
+        return False
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_sample:
+                document = self.sample()
+                if document is not None:
+                    self.add(document)
+                next_sample += self.interval
+                if next_sample <= now:
+                    next_sample = now + self.interval
+            if now >= self._retry_at:
+                self.flush()
+            wake = next_sample if self.failures == 0 else min(next_sample, self._retry_at)
+            self._stop.wait(max(0.0, wake - time.monotonic()))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-pusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Spool the partial batch and, unless backing off, try to send what is left
+        if self._pending:
+            self.spool.put(encode_batch(self._pending))
+            self._pending = []
+        if self.failures == 0:
+            self.flush(until=time.monotonic() + timeout)
+        self.session.close()
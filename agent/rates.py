@@ -0,0 +1,52 @@
+# agent/rates.py
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+def counter_delta(previous: int, current: int) -> int:
+    """
+    Increase of a monotonically increasing counter between two samples.
+
+    A decrease is treated as a reset (device re-attached, driver reloaded,
+    counter cleared): the counter is assumed to have restarted from zero,
+    so the increase is its current value. Wraps are not guessed at, since
+    psutil already folds kernel counter wraps into its totals.
+    """
+    if current >= previous:
+        return current - previous
+    return current
+
+
+class RateTracker:
+    """
+    Turns cumulative counters into per-second rates.
+
+    ``update`` takes the current counters per key (a disk, a NIC, ...) and
+    returns the rate of every field since the previous call. Keys seen for
+    the first time only establish a baseline; keys that disappear are
+    forgotten, so hot-plugged devices start cleanly when they come back.
+    """
+
+    def __init__(self):
+        self._previous: Dict[str, Tuple[float, Mapping[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, counters: Mapping[str, Mapping[str, int]],
+               now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic() if now is None else now
+        rates = {}
+        with self._lock:
+            for key, values in counters.items():
+                previous = self._previous.get(key)
+                if previous is None:
+                    continue
+                elapsed = now - previous[0]
+                if elapsed <= 0:
+                    continue
+                rates[key] = {
+                    field: counter_delta(previous[1][field], value) / elapsed
+                    for field, value in values.items()
+                    if field in previous[1]
+                }
+            self._previous = {key: (now, dict(values)) for key, values in counters.items()}
+        return rates
@@ -0,0 +1,245 @@
+# agent/sampler.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .collectors import CollectorRegistry
+from .history import History
+from .selfstats import CollectorStats, Profiler
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Sampler:
+    """
+    Background sampling engine.
+
+    Runs each registered collector on its own interval and keeps the latest
+    snapshot plus a bounded per-collector history of previous samples, so the
+    request handlers only ever read memory and never block on psutil.
+
+    A value is served from memory while it is younger than the larger of its
+    collector's effective interval and ``max_staleness``; older values are
+    re-collected on demand. Collections run concurrently in a thread pool,
+    each bounded by its collector's timeout, and go through a SingleFlight so
+    concurrent requests (and the background thread) share one in-flight run
+    per collector. A collector that misses its deadline or fails keeps its
+    previous value and is reported as stale.
+
+    Functions in ``listeners`` are called as ``listener(name, timestamp,
+    value)`` after every successful collection. Run durations and errors are
+    kept in ``stats``; while ``profiler`` is active, runs are profiled.
+    """
+
+    def __init__(self, collectors: CollectorRegistry, history_seconds: float = 3600,
+                 max_staleness: float = 5.0, workers: int = 8):
+        self.collectors = collectors
+        self.max_staleness = max_staleness
+        self.history = History(history_seconds)
+        self.flight = SingleFlight()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector")
+        self._values: Dict[str, Any] = {}
+        self._collected_at: Dict[str, float] = {}
+        self._timestamps: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._next_due: Dict[str, float] = {}
+        # Background runs still in flight, with the deadline they must finish by
+        self._pending: Dict[str, Tuple[concurrent.futures.Future, float]] = {}
+        self._latest: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.listeners: List[Callable[[str, float, Any], None]] = []
+        self.stats = CollectorStats()
+        self.profiler = Profiler()
+
+    def _collect(self, name: str) -> Any:
+        collector = self.collectors.get(name)
+        started = time.monotonic()
+        error = None
+        try:
+            value = self.profiler.call(collector.func) if self.profiler.active else collector.func()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Collector {name} failed: {error}")
+            with self._lock:
+                self._errors[name] = error
+            raise
+        finally:
+            duration = time.monotonic() - started
+            collector.record_duration(duration)
+            self.stats.record(name, duration, error)
+
+        with self._lock:
+            self._values[name] = value
+            self._collected_at[name] = time.monotonic()
+            self._errors.pop(name, None)
+            now = datetime.now()
+            self._timestamps[name] = now.timestamp()
+            timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+            self._latest = {**(self._latest or {}), "timestamp": timestamp, name: value}
+        if collector.history:
+            # Size the ring for the fastest rate so boosted samples still fit the window
+            self.history.record(name, collector.min_interval, now.timestamp(), value)
+        for listener in self.listeners:
+            try:
+                listener(name, now.timestamp(), value)
+            except Exception as e:
+                logger.error(f"Sample listener failed for {name}: {str(e)}")
+        return value
+
+    def collect(self, name: str) -> Any:
+        """
+        Collect one collector now, sharing any collection already in flight.
+        """
+        return self.flight.do(name, lambda: self._collect(name))
+
+    def submit(self, name: str) -> concurrent.futures.Future:
+        """
+        Start collecting ``name`` in the thread pool (or join the collection
+        already in flight) and return its future.
+        """
+        return self.flight.submit(name, lambda: self._collect(name), self.executor)
+
+    def age(self, name: str) -> Optional[float]:
+        """
+        Seconds since ``name`` was last collected, or None if never.
+        """
+        with self._lock:
+            collected_at = self._collected_at.get(name)
+        return None if collected_at is None else time.monotonic() - collected_at
+
+    def _status(self, name: str, error: Optional[str] = None) -> Dict[str, Any]:
+        age = self.age(name)
+        with self._lock:
+            error = error or self._errors.get(name)
+        status = {"stale": error is not None, "age": None if age is None else round(age, 3)}
+        if error is not None:
+            status["error"] = error
+        return status
+
+    async def refresh(self, name: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Make sure ``name`` is no older than ``max_age`` seconds, re-collecting
+        it within its collector's deadline if needed, and return its status.
+        """
+        collector = self.collectors.get(name)
+        if max_age is None:
+            # A collector stretched for exceeding its cost budget stays stretched on demand too
+            max_age = max(self.max_staleness, collector.effective_interval)
+        age = self.age(name)
+        if age is not None and age <= max_age:
+            return self._status(name)
+
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(self.submit(name)), collector.timeout)
+        except asyncio.TimeoutError:
+            return self._status(name, f"timed out after {collector.timeout}s")
+        except Exception as e:
+            return self._status(name, str(e))
+        return self._status(name)
+
+    async def snapshot(self, names: Optional[Iterable[str]] = None,
+                       max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Return a snapshot of ``names`` (default: every collector), refreshing
+        them concurrently. Collectors that have never produced a value are
+        left out; every collector gets an entry in ``status``.
+        """
+        names = self.collectors.names() if names is None else list(names)
+        statuses = await asyncio.gather(*(self.refresh(name, max_age) for name in names))
+        with self._lock:
+            latest = self._latest or {}
+            snapshot = {"timestamp": latest.get("timestamp", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))}
+            for name in names:
+                if name in self._values:
+                    snapshot[name] = self._values[name]
+        snapshot["status"] = dict(zip(names, statuses))
+        return snapshot
+
+    def values(self, names: Optional[Iterable[str]] = None) -> Dict[str, Tuple[float, Any]]:
+        """
+        Return ``{name: (unix timestamp, value)}`` for the collectors that have
+        produced a value, without triggering any collection.
+        """
+        with self._lock:
+            names = list(self._values) if names is None else names
+            return {name: (self._timestamps[name], self._values[name]) for name in names if name in self._values}
+
+    def run_due(self) -> List[str]:
+        """
+        Start every collector whose interval has elapsed in the thread pool,
+        without waiting for them. Runs started earlier are checked against
+        their timeout on each call. Returns the names that were started.
+        """
+        now = time.monotonic()
+        for name, (future, deadline) in list(self._pending.items()):
+            if future.done():
+                del self._pending[name]
+            elif now >= deadline:
+                logger.warning(f"Collector {name} missed its deadline, serving its previous value")
+                del self._pending[name]
+
+        started = []
+        for collector in self.collectors:
+            due = self._next_due.get(collector.name, now)
+            if due > now:
+                continue
+            # Schedule against a fixed clock so slow runs don't drift the cadence
+            next_due = due + collector.effective_interval
+            self._next_due[collector.name] = next_due if next_due > now else now + collector.effective_interval
+            if self.flight.in_flight(collector.name):
+                # Still stuck in a previous run; don't tie up another worker
+                logger.warning(f"Collector {collector.name} is still running, skipping this cycle")
+                continue
+            self._pending[collector.name] = (self.submit(collector.name), now + collector.timeout)
+            started.append(collector.name)
+        return started
+
+    def reschedule(self, name: str):
+        """
+        Bring ``name``'s next run forward to one (new) effective interval from
+        now, e.g. after its interval was shortened, and wake the sampler.
+        """
+        collector = self.collectors.get(name)
+        due = time.monotonic() + collector.effective_interval
+        if due < self._next_due.get(name, due + 1):
+            self._next_due[name] = due
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_due()
+            now = time.monotonic()
+            due = [self._next_due.get(collector.name, now) for collector in self.collectors]
+            due += [deadline for _, deadline in self._pending.values()]
+            self._wake.wait(max(0.0, min(due) - now) if due else 1.0)
+            self._wake.clear()
+
+    def start(self, delays: Optional[Dict[str, float]] = None):
+        """
+        Start the background thread. ``delays`` holds seconds to wait before
+        the first run of some collectors; the others run at once.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        now = time.monotonic()
+        for name, delay in (delays or {}).items():
+            self._next_due.setdefault(name, now + delay)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
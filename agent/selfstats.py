@@ -0,0 +1,266 @@
+# agent/selfstats.py
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import psutil
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations, cheap enough to update on every
+    collection and request.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the ``q`` quantile (the maximum
+        seen for the overflow bucket), or None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {**{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                        "+Inf": self.counts[-1]},
+        }
+
+
+class CollectorStats:
+    """
+    Per-collector run counts, error counts and duration histograms.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._last_errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float, error: Optional[str] = None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(duration)
+            if error is not None:
+                self._errors[name] = self._errors.get(name, 0) + 1
+                self._last_errors[name] = error
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    "runs": histogram.count,
+                    "errors": self._errors.get(name, 0),
+                    "last_error": self._last_errors.get(name),
+                    "duration": histogram.as_dict(),
+                }
+                for name, histogram in self._histograms.items()
+            }
+
+
+class EndpointStats:
+    """
+    Request counts, server errors and latency (time until the response
+    starts) per endpoint, keyed by method and route template so
+    ``/metrics/{name}`` is one entry however it is called.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, duration: float, status: int):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = Histogram()
+            histogram.observe(duration)
+            if status >= 500:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {endpoint: {"requests": histogram.count, "server_errors": self._errors.get(endpoint, 0),
+                               "latency": histogram.as_dict()}
+                    for endpoint, histogram in self._histograms.items()}
+
+
+class RequestStatsMiddleware:
+    """
+    ASGI middleware feeding every HTTP request into an EndpointStats.
+    """
+
+    def __init__(self, app, stats: EndpointStats):
+        self.app = app
+        self.stats = stats
+
+    def _record(self, scope, duration: float, status: int):
+        # The router stores the matched route in the scope
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        self.stats.record(f"{scope['method']} {path}", duration, status)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        async def send_wrapper(message):
+            nonlocal recorded
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                self._record(scope, time.perf_counter() - started, message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not recorded:
+                self._record(scope, time.perf_counter() - started, 500)
+            raise
+
+
+class Profiler:
+    """
+    Runtime-toggled cProfile of collector runs for a bounded window.
+
+    ``start(seconds)`` opens a window during which every collector run is
+    profiled and merged into one report; it closes by itself when the window
+    ends. Runs that overlap a run already being profiled are executed
+    unprofiled (Python 3.12+ allows only one active profiler) and counted as
+    skipped.
+    """
+
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_seconds = max_seconds
+        self._until = 0.0
+        self._started: Optional[float] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._runs = 0
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() < self._until
+
+    def start(self, seconds: float) -> float:
+        """
+        Start (or restart) a profiling window, capped at ``max_seconds``.
+        Returns the window length actually used.
+        """
+        seconds = min(seconds, self.max_seconds)
+        with self._lock:
+            self._stats = None
+            self._runs = self._skipped = 0
+            self._started = time.time()
+            self._until = time.monotonic() + seconds
+        return seconds
+
+    def stop(self):
+        self._until = 0.0
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            with self._lock:
+                self._skipped += 1
+            return fn()
+        try:
+            return fn()
+        finally:
+            profile.disable()
+            with self._lock:
+                self._runs += 1
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def report(self, limit: int = 30, sort: str = "cumulative") -> Dict[str, Any]:
+        """
+        Status of the current or last window plus the top ``limit`` functions.
+        """
+        with self._lock:
+            text = None
+            if self._stats is not None:
+                stream = io.StringIO()
+                self._stats.stream = stream
+                self._stats.sort_stats(sort).print_stats(limit)
+                text = stream.getvalue()
+            return {
+                "active": self.active,
+                "remaining": round(max(0.0, self._until - time.monotonic()), 1),
+                "started": self._started,
+                "profiled_runs": self._runs,
+                "skipped_runs": self._skipped,
+                "report": text,
+            }
+
+
+def process_stats(process: psutil.Process) -> Dict[str, Any]:
+    """
+    Resource usage of the agent process itself. ``cpu_percent`` covers the
+    time since the previous call with the same ``process``.
+    """
+    with process.oneshot():
+        cpu_times = process.cpu_times()
+        memory = process.memory_info()
+        stats = {
+            "pid": process.pid,
+            "cpu_percent": process.cpu_percent(interval=None),
+            "cpu_user_seconds": cpu_times.user,
+            "cpu_system_seconds": cpu_times.system,
+            "rss_bytes": memory.rss,
+            "vms_bytes": memory.vms,
+            "threads": process.num_threads(),
+        }
+        try:
+            stats["open_fds"] = process.num_fds()
+        except (AttributeError, psutil.AccessDenied):
+            # num_fds() is POSIX only
+            stats["open_fds"] = None
+    return stats
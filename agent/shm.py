@@ -0,0 +1,79 @@
+# agent/shm.py
+import logging
+import mmap
+import os
+import threading
+from typing import Any, Optional
+
+from .shmreader import (CPU, CPU_OFFSET, HEADER, LAYOUT_VERSION, MAGIC, MAX_CORES, MEMORY, MEMORY_FIELDS,
+                        MEMORY_OFFSET, PER_CORE, PER_CORE_OFFSET, SEQUENCE, SEQUENCE_OFFSET, SIZE)
+
+logger = logging.getLogger(__name__)
+
+
+class SharedSnapshotWriter:
+    """
+    Publish the latest CPU and memory samples into a memory-mapped file with
+    the fixed layout described in agent/shmreader.py.
+
+    Used as a sampler listener. Updates are bracketed by a seqlock so
+    readers never need a lock. The file is reused in place across agent
+    restarts, so readers that keep it mapped see new samples once the agent
+    is back.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < SIZE:
+                os.ftruncate(fd, SIZE)
+            shared = mmap.mmap(fd, SIZE, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        magic, version, sequence = HEADER.unpack_from(shared, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            shared[:] = bytes(SIZE)
+            sequence = 0
+        # Continue the previous run's sequence so it never goes backwards
+        self._sequence = sequence + (sequence % 2)
+        HEADER.pack_into(shared, 0, MAGIC, LAYOUT_VERSION, self._sequence)
+        with self._lock:
+            self._map = shared
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def record(self, name: str, timestamp: float, value: Any):
+        if name not in ("cpu", "memory"):
+            return
+        with self._lock:
+            if self._map is None:
+                return
+            self._sequence += 1
+            SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+            try:
+                if name == "cpu":
+                    self._write_cpu(timestamp, value)
+                else:
+                    MEMORY.pack_into(self._map, MEMORY_OFFSET, timestamp,
+                                     *(value.get(field) or 0 for field in MEMORY_FIELDS[1:]))
+            finally:
+                self._sequence += 1
+                SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+
+    def _write_cpu(self, timestamp: float, cpu: Any):
+        per_core = list(cpu.get("percent_usage_per_core") or [])[:MAX_CORES]
+        CPU.pack_into(self._map, CPU_OFFSET, timestamp, cpu.get("overall_usage") or 0.0,
+                      cpu.get("user") or 0.0, cpu.get("system") or 0.0, cpu.get("idle") or 0.0,
+                      cpu.get("cores") or 0, cpu.get("physical_cores") or 0, len(per_core), 0)
+        PER_CORE.pack_into(self._map, PER_CORE_OFFSET, *per_core, *([0.0] * (MAX_CORES - len(per_core))))
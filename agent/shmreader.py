@@ -0,0 +1,132 @@
+# agent/shmreader.py
+"""
+Lock-free reader for the agent's shared-memory snapshot.
+
+The agent publishes its latest CPU and memory sample into a memory-mapped
+file (default /dev/shm/sysmetrics). Local consumers can read it without
+HTTP or JSON:
+
+    from agent.shmreader import SnapshotReader
+
+    with SnapshotReader() as reader:
+        print(reader.read()["cpu"]["overall_usage"])
+
+or from the shell: ``python -m agent.shmreader``. This module only uses the
+standard library so it can be copied into other tools as is.
+
+Layout (little-endian):
+
+    header  4s magic b"SMSM", I layout version, Q sequence
+    cpu     d timestamp, d overall, d user, d system, d idle,
+            I cores, I physical cores, I per-core count, I reserved,
+            MAX_CORES x d per-core usage
+    memory  d timestamp, Q total, Q available, Q used, Q free, d percent used,
+            Q swap total, Q swap used, d swap percent
+
+The writer makes the sequence odd while it updates the payload and even
+again when done (a seqlock); a reader retries whenever the sequence was odd
+or changed while it was reading. Timestamps are unix seconds, 0 until the
+first sample.
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict
+
+MAGIC = b"SMSM"
+LAYOUT_VERSION = 1
+DEFAULT_PATH = "/dev/shm/sysmetrics"
+MAX_CORES = 512
+
+HEADER = struct.Struct("<4sIQ")
+SEQUENCE_OFFSET = 8
+SEQUENCE = struct.Struct("<Q")
+CPU = struct.Struct("<dddddIIII")
+PER_CORE = struct.Struct(f"<{MAX_CORES}d")
+MEMORY = struct.Struct("<dQQQQdQQd")
+
+CPU_OFFSET = HEADER.size
+PER_CORE_OFFSET = CPU_OFFSET + CPU.size
+MEMORY_OFFSET = PER_CORE_OFFSET + PER_CORE.size
+SIZE = MEMORY_OFFSET + MEMORY.size
+
+MEMORY_FIELDS = ("timestamp", "total", "available", "used", "free", "percent_used",
+                 "swap_total", "swap_used", "swap_percent")
+
+
+class SnapshotReader:
+    """
+    Read-only view of the shared snapshot file.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), SIZE, access=mmap.ACCESS_READ)
+        magic, version, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {LAYOUT_VERSION} sysmetrics snapshot")
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def sequence(self) -> int:
+        """
+        Current sequence number; it grows by 2 with every published sample.
+        """
+        return SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+
+    def read(self, timeout: float = 1.0) -> Dict[str, Any]:
+        """
+        Return a consistent copy of the snapshot, retrying while the agent is
+        in the middle of an update.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            before = self.sequence()
+            if before % 2 == 0:
+                cpu = CPU.unpack_from(self._map, CPU_OFFSET)
+                per_core = PER_CORE.unpack_from(self._map, PER_CORE_OFFSET)
+                memory = MEMORY.unpack_from(self._map, MEMORY_OFFSET)
+                if self.sequence() == before:
+                    break
+            if time.monotonic() > deadline:
+                raise TimeoutError("snapshot kept changing while being read")
+            # Let the writer finish
+            time.sleep(0)
+
+        timestamp, overall, user, system, idle, cores, physical_cores, count, _ = cpu
+        return {
+            "sequence": before,
+            "cpu": {
+                "timestamp": timestamp,
+                "percent_usage_per_core": list(per_core[:count]),
+                "overall_usage": overall,
+                "user": user,
+                "system": system,
+                "idle": idle,
+                "cores": cores,
+                "physical_cores": physical_cores,
+            },
+            "memory": dict(zip(MEMORY_FIELDS, memory)),
+        }
+
+
+def main():
+    path = os.environ.get("AGENT_SHM_PATH") or DEFAULT_PATH
+    with SnapshotReader(path) as reader:
+        snapshot = reader.read()
+    print(f"cpu: {snapshot['cpu']['overall_usage']:.1f}% of {snapshot['cpu']['cores']} cores, "
+          f"memory: {snapshot['memory']['percent_used']:.1f}% of {snapshot['memory']['total']} bytes "
+          f"(sequence {snapshot['sequence']})")
+
+
+if __name__ == "__main__":
+    main()
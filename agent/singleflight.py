@@ -0,0 +1,67 @@
+# agent/singleflight.py
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; everyone who asks for the
+    same key while it is in flight waits for and shares that result (or
+    exception). Works from plain threads (``do``) and, through the future
+    returned by ``submit``, from the event loop. A caller that stops
+    waiting (e.g. on a deadline) does not cancel the shared call; later
+    callers attach to it instead of starting another one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            # Mark it running so a waiter giving up can never cancel the shared call
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def _execute(self, key: str, future: Future, fn: Callable[[], Any]):
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+        else:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_result(result)
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        future, leader = self._claim(key)
+        if leader:
+            self._execute(key, future, fn)
+        return future.result()
+
+    def submit(self, key: str, fn: Callable[[], Any], executor: Optional[Executor] = None) -> Future:
+        """
+        Start ``fn`` on ``executor`` unless a call for ``key`` is already in
+        flight, and return the shared future without waiting for it.
+        """
+        future, leader = self._claim(key)
+        if leader:
+            if executor is None:
+                threading.Thread(target=self._execute, args=(key, future, fn), daemon=True).start()
+            else:
+                executor.submit(self._execute, key, future, fn)
+        return future
@@ -0,0 +1,144 @@
+# agent/stream.py
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+# Seconds between SSE keep-alive comments when nothing is published
+HEARTBEAT_INTERVAL = 15.0
+
+
+class Subscription:
+    """
+    One streaming client: a bounded queue fed from the sampler threads.
+
+    A client that cannot keep up loses its oldest frames rather than making
+    the queue (and the agent's memory) grow without bound.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, names: Iterable[str], maxsize: int = 100):
+        self.loop = loop
+        self.names = set(names)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, item: Tuple[str, float, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    def push(self, item: Tuple[str, float, Any]):
+        # Called from collector threads; hand the frame over to the event loop
+        self.loop.call_soon_threadsafe(self._put, item)
+
+
+class Broadcaster:
+    """
+    Fan out every new collector sample to the subscribed streaming clients.
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, names: Iterable[str], maxsize: int = 100) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), names, maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, name: str, timestamp: float, value: Any):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if name not in subscription.names:
+                continue
+            try:
+                subscription.push((name, timestamp, value))
+            except RuntimeError:
+                # The client's event loop is gone
+                self.unsubscribe(subscription)
+
+
+def parse_fields(fields: Optional[str]) -> Dict[str, Optional[Set[str]]]:
+    """
+    Parse ``cpu.overall_usage,memory`` into {"cpu": {"overall_usage"}, "memory": None}
+    where None means every field of that collector.
+    """
+    selection: Dict[str, Optional[Set[str]]] = {}
+    for item in (fields or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, field = item.partition(".")
+        if not field:
+            selection[name] = None
+        elif name not in selection or selection[name] is not None:
+            selection.setdefault(name, set()).add(field)
+    return selection
+
+
+def select_fields(value: Any, fields: Optional[Set[str]]) -> Any:
+    if fields is None or not isinstance(value, dict):
+        return value
+    return {key: value[key] for key in fields if key in value}
+
+
+def changed_fields(previous: Any, current: Any) -> Any:
+    """
+    Fields of ``current`` that differ from ``previous``, or None if nothing
+    changed. Non-dict values are sent whole whenever they change.
+    """
+    if not isinstance(previous, dict) or not isinstance(current, dict):
+        return None if previous == current else current
+    delta = {key: value for key, value in current.items() if previous.get(key) != value}
+    return delta or None
+
+
+async def sse_events(subscription: Subscription, initial: Dict[str, Tuple[float, Any]],
+                     fields: Dict[str, Optional[Set[str]]], delta: bool = False,
+                     heartbeat: float = HEARTBEAT_INTERVAL) -> AsyncIterator[str]:
+    """
+    Yield Server-Sent Events for a subscription: the current value of every
+    subscribed collector, then each new sample as it is produced. With
+    ``delta`` only the fields that changed since the previous frame of the
+    same collector are sent.
+    """
+    sent: Dict[str, Any] = {}
+    sequence = 0
+
+    def render(name: str, timestamp: float, value: Any) -> Optional[str]:
+        nonlocal sequence
+        value = select_fields(value, fields.get(name) if fields else None)
+        payload = value
+        if delta and name in sent:
+            payload = changed_fields(sent[name], value)
+            if payload is None:
+                return None
+        sent[name] = value
+        sequence += 1
+        data = json.dumps({"timestamp": timestamp, name: payload}, separators=(",", ":"))
+        return f"id: {sequence}\ndata: {data}\n\n"
+
+    for name, (timestamp, value) in initial.items():
+        event = render(name, timestamp, value)
+        if event:
+            yield event
+
+    while True:
+        try:
+            name, timestamp, value = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        event = render(name, timestamp, value)
+        if event:
+            yield event
@@ -0,0 +1,100 @@
+# agent/tests/test_adaptive.py
+import time
+from unittest import TestCase
+
+from agent.adaptive import AdaptiveSampling, Rule, parse_rules, resolve
+from agent.collectors import Collector, CollectorRegistry
+from agent.sampler import Sampler
+
+
+class TestRules(TestCase):
+
+    def test_parse_rules(self):
+        """Test the collector.field>N / collector.field~N syntax"""
+        rules = parse_rules("cpu.overall_usage>80, diskio.devices.*.busy_percent~5.5")
+        self.assertEqual(rules, [
+            Rule("cpu", ("overall_usage",), ">", 80.0),
+            Rule("diskio", ("devices", "*", "busy_percent"), "~", 5.5),
+        ])
+        with self.assertRaises(ValueError):
+            parse_rules("cpu>80")
+
+    def test_resolve_wildcard_takes_largest(self):
+        """Test that * matches every device and the busiest one counts"""
+        value = {"devices": {"sda": {"busy_percent": 10.0}, "sdb": {"busy_percent": 95.0}, "sdc": {}}}
+        self.assertEqual(resolve(value, ["devices", "*", "busy_percent"]), 95.0)
+        self.assertIsNone(resolve(value, ["missing"]))
+
+    def test_threshold_and_change_rules(self):
+        """Test that > fires above the threshold and ~ on a large jump"""
+        above = Rule("cpu", ("overall_usage",), ">", 80.0)
+        change = Rule("cpu", ("overall_usage",), "~", 25.0)
+        self.assertTrue(above.fires(None, {"overall_usage": 85.0}))
+        self.assertFalse(above.fires(None, {"overall_usage": 50.0}))
+        self.assertFalse(change.fires(None, {"overall_usage": 50.0}))
+        self.assertTrue(change.fires({"overall_usage": 20.0}, {"overall_usage": 50.0}))
+        self.assertFalse(change.fires({"overall_usage": 40.0}, {"overall_usage": 50.0}))
+
+
+class TestCollectorBoost(TestCase):
+
+    def test_boost_and_budget(self):
+        """Test that a boosted interval is still subject to the cost budget"""
+        collector = Collector(name="cpu", func=lambda: {}, interval=10.0, budget=0.2)
+        collector.boost(1.0)
+        self.assertEqual(collector.effective_interval, 1.0)
+
+        collector.record_duration(0.5)
+        self.assertEqual(collector.effective_interval, 2.5)
+
+        collector.boost(None)
+        self.assertEqual(collector.effective_interval, 10.0)
+        self.assertIsNone(collector.boost_interval)
+
+
+class TestAdaptiveSampling(TestCase):
+
+    def setUp(self):
+        self.values = [{"overall_usage": 5.0}]
+        registry = CollectorRegistry()
+        registry.register("cpu", lambda: self.values[-1], interval=8.0)
+        self.sampler = Sampler(registry)
+        self.adaptive = AdaptiveSampling(self.sampler, parse_rules("cpu.overall_usage>80"),
+                                         fast_interval=1.0, hold=5.0, decay=2.0)
+        self.collector = registry.get("cpu")
+
+    def test_boost_then_decay(self):
+        """Test boosting on a spike, holding, then decaying back to the base rate"""
+        self.adaptive.record("cpu", 100.0, {"overall_usage": 95.0})
+        self.assertEqual(self.collector.boost_interval, 1.0)
+
+        # Quiet, but still within the hold period
+        self.adaptive.record("cpu", 103.0, {"overall_usage": 10.0})
+        self.assertEqual(self.collector.boost_interval, 1.0)
+
+        intervals = []
+        for timestamp in (106.0, 107.0, 108.0):
+            self.adaptive.record("cpu", timestamp, {"overall_usage": 10.0})
+            intervals.append(self.collector.boost_interval)
+        self.assertEqual(intervals, [2.0, 4.0, None])
+        self.assertEqual(self.collector.effective_interval, 8.0)
+
+    def test_fast_interval_sizes_history(self):
+        """Test that history is sized for the boosted rate"""
+        self.assertEqual(self.collector.min_interval, 1.0)
+
+    def test_spike_reschedules_running_sampler(self):
+        """Test that a boost takes effect without waiting out the base interval"""
+        self.adaptive.fast_interval = 0.05
+        self.collector.fast_interval = 0.05
+        self.sampler.listeners.append(self.adaptive.record)
+        self.sampler.start()
+        self.addCleanup(self.sampler.stop)
+        time.sleep(0.1)
+        runs = self.sampler.stats.as_dict()["cpu"]["runs"]
+
+        self.values.append({"overall_usage": 99.0})
+        self.sampler.collect("cpu")
+        time.sleep(0.5)
+
+        self.assertGreater(self.sampler.stats.as_dict()["cpu"]["runs"] - runs, 4)
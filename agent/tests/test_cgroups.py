@@ -0,0 +1,102 @@
+# agent/tests/test_cgroups.py
+import os
+import tempfile
+from unittest import TestCase
+
+from agent.cgroups import (CgroupTable, cgroup_v2_available, parse_io_stat, parse_pressure,
+                           select_cgroups)
+
+PRESSURE = "some avg10={some:.2f} avg60=0.00 avg300=0.00 total=100\nfull avg10=0.50 avg60=0.00 avg300=0.00 total=10\n"
+
+
+class TestParsers(TestCase):
+
+    def test_io_stat_sums_devices(self):
+        """Test that io.stat counters are summed over every device"""
+        totals = parse_io_stat(
+            "8:0 rbytes=100 wbytes=200 rios=1 wios=2 dbytes=0 dios=0\n"
+            "8:16 rbytes=50 wbytes=0 rios=3 wios=0 dbytes=0 dios=0\n"
+        )
+        self.assertEqual(totals, {"rbytes": 150, "wbytes": 200, "rios": 4, "wios": 2})
+
+    def test_pressure_keeps_avg10(self):
+        """Test that PSI files are reduced to their 10-second averages"""
+        self.assertEqual(parse_pressure(PRESSURE.format(some=2.5)), {"some": 2.5, "full": 0.5})
+
+
+class TestCgroupTable(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+        with open(os.path.join(self.root, "cgroup.controllers"), "w") as f:
+            f.write("cpu io memory pids\n")
+
+    def write_cgroup(self, path, usage_usec=0, rbytes=0, memory=1024, peak=None, cpu_some=0.0):
+        directory = os.path.join(self.root, path)
+        os.makedirs(directory, exist_ok=True)
+        files = {
+            "cpu.stat": f"usage_usec {usage_usec}\nuser_usec {usage_usec}\nsystem_usec 0\n",
+            "io.stat": f"8:0 rbytes={rbytes} wbytes=0 rios=0 wios=0 dbytes=0 dios=0\n",
+            "memory.current": f"{memory}\n",
+            "pids.current": "3\n",
+            "cpu.pressure": PRESSURE.format(some=cpu_some),
+        }
+        if peak is not None:
+            files["memory.peak"] = f"{peak}\n"
+        for name, content in files.items():
+            with open(os.path.join(directory, name), "w") as f:
+                f.write(content)
+
+    def test_detects_unified_hierarchy(self):
+        """Test that only a root with cgroup.controllers counts as v2"""
+        self.assertTrue(cgroup_v2_available(self.root))
+        self.assertFalse(cgroup_v2_available(os.path.join(self.root, "missing")))
+
+    def test_first_sample_has_no_rates(self):
+        """Test that gauges are reported immediately and rates after a baseline"""
+        self.write_cgroup("system.slice", memory=4096, peak=8192, cpu_some=1.25)
+        group = CgroupTable(self.root).refresh(now=0.0)["/system.slice"]
+
+        self.assertEqual(group["memory_current"], 4096)
+        self.assertEqual(group["memory_peak"], 8192)
+        self.assertEqual(group["pids"], 3)
+        self.assertEqual(group["pressure"]["cpu"], {"some": 1.25, "full": 0.5})
+        self.assertIsNone(group["cpu_percent"])
+        self.assertIsNone(group["io_read_bytes_per_sec"])
+
+    def test_rates_from_counter_deltas(self):
+        """Test CPU % of one core and I/O bytes/s from successive samples"""
+        table = CgroupTable(self.root)
+        self.write_cgroup("system.slice/docker-abc.scope", usage_usec=1_000_000, rbytes=0)
+        table.refresh(now=10.0)
+
+        # 1.5 s of CPU and 4 MiB read over 2 s
+        self.write_cgroup("system.slice/docker-abc.scope", usage_usec=2_500_000, rbytes=4 * 2 ** 20)
+        group = table.refresh(now=12.0)["/system.slice/docker-abc.scope"]
+
+        self.assertEqual(group["cpu_percent"], 75.0)
+        self.assertEqual(group["io_read_bytes_per_sec"], 2 * 2 ** 20)
+        self.assertIsNone(group["memory_peak"])
+
+    def test_max_depth(self):
+        """Test that the walk stops max_depth levels below the root"""
+        self.write_cgroup("a")
+        self.write_cgroup("a/b")
+        self.write_cgroup("a/b/c")
+
+        groups = CgroupTable(self.root, max_depth=2).refresh()
+
+        self.assertEqual(sorted(groups), ["/a", "/a/b"])
+
+    def test_select_top_cgroups(self):
+        """Test ordering and limiting cgroups by each sort key"""
+        groups = {
+            "/a": {"cpu_percent": 5.0, "memory_current": 300, "io_read_bytes_per_sec": 0, "io_write_bytes_per_sec": 9},
+            "/b": {"cpu_percent": 50.0, "memory_current": 100, "io_read_bytes_per_sec": 1, "io_write_bytes_per_sec": 1},
+            "/c": {"cpu_percent": None, "memory_current": 200, "io_read_bytes_per_sec": None, "io_write_bytes_per_sec": None},
+        }
+        self.assertEqual(list(select_cgroups(groups, "cpu", limit=2)), ["/b", "/a"])
+        self.assertEqual(list(select_cgroups(groups, "memory")), ["/a", "/c", "/b"])
+        self.assertEqual(list(select_cgroups(groups, "io", limit=1)), ["/a"])
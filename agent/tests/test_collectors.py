@@ -0,0 +1,51 @@
+# agent/tests/test_collectors.py
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from agent.collectors import Collector, CollectorRegistry
+
+
+class TestCollectorRegistry(TestCase):
+
+    def test_register_as_decorator(self):
+        """Test registering a collector with its own sampling policy"""
+        registry = CollectorRegistry()
+
+        @registry.register("load", interval=30, timeout=2, budget=0.5)
+        def load():
+            return [0.1, 0.2, 0.3]
+
+        collector = registry.get("load")
+        self.assertIn("load", registry)
+        self.assertEqual(registry.names(), ["load"])
+        self.assertIs(collector.func, load)
+        self.assertEqual((collector.interval, collector.timeout, collector.budget), (30, 2, 0.5))
+
+    @patch.dict(os.environ, {"AGENT_DISK_INTERVAL": "120"})
+    def test_interval_override_from_environment(self):
+        """Test that AGENT_<NAME>_INTERVAL overrides the declared interval"""
+        registry = CollectorRegistry()
+        registry.register("disk", lambda: {}, interval=60)
+
+        self.assertEqual(registry.get("disk").interval, 120.0)
+
+    def test_unregister(self):
+        registry = CollectorRegistry()
+        registry.register("cpu", lambda: {})
+        registry.unregister("cpu")
+
+        self.assertEqual(len(registry), 0)
+
+
+class TestCollectorBudget(TestCase):
+
+    def test_over_budget_run_stretches_interval(self):
+        """Test that an expensive run lowers the collector's sampling rate"""
+        collector = Collector(name="processes", func=lambda: [], interval=10, budget=0.1)
+
+        collector.record_duration(2.0)
+        self.assertEqual(collector.effective_interval, 20.0)
+
+        collector.record_duration(0.5)
+        self.assertEqual(collector.effective_interval, 10)
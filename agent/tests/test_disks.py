@@ -0,0 +1,94 @@
+# agent/tests/test_disks.py
+import threading
+from collections import namedtuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from agent.disks import DiskFilter, DiskUsageCache, parse_patterns
+
+Partition = namedtuple("Partition", "device mountpoint fstype opts")
+Usage = namedtuple("Usage", "total used free percent")
+
+
+class TestDiskFilter(TestCase):
+
+    def test_default_rules_drop_pseudo_filesystems(self):
+        """Test that snaps, loop devices, overlays and network mounts are excluded"""
+        partitions = [
+            Partition("/dev/sda1", "/", "ext4", "rw"),
+            Partition("/dev/loop3", "/snap/core/123", "squashfs", "ro"),
+            Partition("/dev/loop4", "/mnt/image", "ext4", "ro"),
+            Partition("overlay", "/var/lib/docker/overlay2/abc/merged", "overlay", "rw"),
+            Partition("server:/export", "/mnt/nfs", "nfs4", "rw"),
+            Partition("sshfs#host:", "/mnt/remote", "fuse.sshfs", "rw"),
+            Partition("/dev/sdb1", "/home", "xfs", "rw"),
+        ]
+        selected = DiskFilter().select(partitions)
+        self.assertEqual([p.mountpoint for p in selected], ["/", "/home"])
+
+    def test_dedup_by_device_keeps_shortest_mountpoint(self):
+        """Test that a device mounted twice is reported once"""
+        partitions = [
+            Partition("/dev/sda2", "/srv/data/bind", "btrfs", "rw"),
+            Partition("/dev/sda2", "/srv", "btrfs", "rw"),
+        ]
+        selected = DiskFilter().select(partitions)
+        self.assertEqual([p.mountpoint for p in selected], ["/srv"])
+
+    def test_include_and_custom_exclude_rules(self):
+        """Test include fstypes and mountpoint excludes"""
+        disk_filter = DiskFilter(include_fstypes=["ext*"], exclude_mountpoints=["/boot*"])
+        partitions = [
+            Partition("/dev/sda1", "/", "ext4", "rw"),
+            Partition("/dev/sda2", "/boot", "ext2", "rw"),
+            Partition("/dev/sdb1", "/data", "xfs", "rw"),
+        ]
+        self.assertEqual([p.mountpoint for p in disk_filter.select(partitions)], ["/"])
+
+    def test_parse_patterns(self):
+        """Test that unset means the defaults and an empty value means none"""
+        self.assertEqual(parse_patterns(None, ("tmpfs",)), ("tmpfs",))
+        self.assertEqual(parse_patterns("", ("tmpfs",)), ())
+        self.assertEqual(parse_patterns("nfs*, cifs"), ("nfs*", "cifs"))
+
+
+class TestDiskUsageCache(TestCase):
+
+    def test_usage_is_cached_for_interval(self):
+        """Test that disk_usage is only called again once the interval has passed"""
+        cache = DiskUsageCache(interval=60.0)
+        with patch("agent.disks.psutil.disk_usage", return_value=Usage(100, 40, 60, 40.0)) as disk_usage, \
+                patch("agent.disks.time.monotonic", return_value=1000.0):
+            cache.get_many(["/"])
+            usages = cache.get_many(["/"])
+        self.assertEqual(usages["/"].used, 40)
+        self.assertEqual(disk_usage.call_count, 1)
+
+        with patch("agent.disks.psutil.disk_usage", return_value=Usage(100, 50, 50, 50.0)), \
+                patch("agent.disks.time.monotonic", return_value=1061.0):
+            self.assertEqual(cache.get_many(["/"])["/"].used, 50)
+
+    def test_hung_mount_serves_previous_value(self):
+        """Test that a mount that stops responding keeps its last usage"""
+        cache = DiskUsageCache(interval=0.0, timeout=0.05)
+        with patch("agent.disks.psutil.disk_usage", return_value=Usage(100, 40, 60, 40.0)):
+            cache.get_many(["/mnt/nfs"])
+
+        release = threading.Event()
+
+        def hang(mountpoint):
+            release.wait(5)
+            return Usage(100, 90, 10, 90.0)
+
+        with patch("agent.disks.psutil.disk_usage", side_effect=hang) as disk_usage:
+            self.assertEqual(cache.get_many(["/mnt/nfs"])["/mnt/nfs"].used, 40)
+            # Still hung: the next collection attaches to the same read
+            cache.get_many(["/mnt/nfs"])
+            self.assertEqual(disk_usage.call_count, 1)
+            release.set()
+
+    def test_never_read_mounts_are_left_out(self):
+        """Test that a mount whose usage cannot be read is omitted"""
+        cache = DiskUsageCache()
+        with patch("agent.disks.psutil.disk_usage", side_effect=PermissionError("denied")):
+            self.assertEqual(cache.get_many(["/secret"]), {})
@@ -0,0 +1,105 @@
+# agent/tests/test_encoding.py
+import importlib.util
+import json
+import os
+import struct
+from unittest import TestCase
+
+from agent.encoding import FORMAT_VERSION, decode_metrics, encode_metrics
+
+# The dashboard's copy of the decoder (it has no dependencies of its own)
+CODEC_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "dashboard", "metrics", "codec.py")
+
+
+def load_dashboard_codec():
+    spec = importlib.util.spec_from_file_location("dashboard_codec", CODEC_PATH)
+    codec = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(codec)
+    return codec
+
+
+class TestEncoding(TestCase):
+
+    def setUp(self):
+        self.doc = {
+            "timestamp": "2024-01-01 12:00:00",
+            "hostname": "web-1",
+            "ip_address": "10.0.0.5",
+            "os_info": "Linux 6.1",
+            "cpu": {"percent_usage_per_core": [12.5, 7.25], "overall_usage": 9.875, "user": 5.0,
+                    "system": 2.5, "idle": 92.5, "cores": 2, "physical_cores": 1},
+            "memory": {"total": 8589934592, "available": 4294967296, "used": 4294967296, "free": 1073741824,
+                       "percent_used": 50.0, "swap_total": 0, "swap_used": 0, "swap_percent": 0.0},
+            "disk": {
+                "partitions": [{"device": "/dev/sda1", "mountpoint": "/", "fstype": "ext4",
+                                "total": 100, "used": 40, "free": 60, "percent_used": 40.0}],
+                "io_stats": {"read_count": 1, "write_count": 2, "read_bytes": 3, "write_bytes": 4},
+            },
+            "processes": [{"pid": 1, "name": "init", "username": "root", "status": "sleeping",
+                           "cpu_percent": 0.5, "memory_percent": 0.125,
+                           "create_time": "2024-01-01 00:00:00", "cmdline": "/sbin/init splash"},
+                          {"pid": 42, "name": "zombie", "username": None, "status": "zombie",
+                           "cpu_percent": 0.0, "memory_percent": 0.0,
+                           "create_time": "2024-01-01 00:00:01", "cmdline": ""}],
+            "network": {"interfaces": {"eth0": {"bytes_recv_per_sec": 10.5}}},
+            "status": {"cpu": {"stale": False, "age": 0.1}},
+            "version": 7,
+        }
+
+    def test_round_trip(self):
+        """Test that decoding an encoded document gives back the same document"""
+        self.assertEqual(decode_metrics(encode_metrics(self.doc, 1704110400.0)), self.doc)
+
+    def test_smaller_than_json(self):
+        """Test that the binary layout is more compact than the JSON body"""
+        encoded = encode_metrics(self.doc)
+        self.assertLess(len(encoded), len(json.dumps(self.doc, separators=(",", ":"))))
+
+    def test_missing_collectors_encode_as_empty(self):
+        """Test that a snapshot without values still encodes, leaving out CPU and memory instead of zeros"""
+        decoded = decode_metrics(encode_metrics({"timestamp": "2024-01-01 12:00:00", "hostname": "web-1",
+                                                 "cpu": {}, "memory": self.doc["memory"]}))
+        self.assertEqual(decoded["hostname"], "web-1")
+        self.assertIsNone(decoded["ip_address"])
+        self.assertNotIn("cpu", decoded)
+        self.assertEqual(decoded["memory"], self.doc["memory"])
+        self.assertEqual(decoded["processes"], [])
+        self.assertEqual(decoded["disk"], {"partitions": []})
+
+    def test_long_strings_cut_on_character_boundary(self):
+        """Test that a string over the length limit is truncated to valid UTF-8"""
+        self.doc["hostname"] = "a" + "é" * 40000
+        decoded = decode_metrics(encode_metrics(self.doc))
+        self.assertEqual(decoded["hostname"], "a" + "é" * 32766)
+
+    def test_decodes_version_1(self):
+        """Test that documents from agents still on format version 1 (no section flags) are decoded"""
+        encoded = bytearray(encode_metrics(self.doc))
+        struct.pack_into("<B", encoded, 3, 1)
+        flags = struct.calcsize("<3sBd") + sum(2 + len(self.doc[field].encode())
+                                               for field in ("timestamp", "hostname", "ip_address", "os_info"))
+        del encoded[flags]
+        self.assertEqual(decode_metrics(bytes(encoded)), self.doc)
+
+    def test_dashboard_decoder_matches(self):
+        """Test that the dashboard's copy of the decoder reads what the agent encodes"""
+        codec = load_dashboard_codec()
+        self.assertEqual(codec.FORMAT_VERSION, FORMAT_VERSION)
+
+        encoded = encode_metrics(self.doc, 1704110400.0)
+        self.assertEqual(codec.decode_metrics(encoded), self.doc)
+
+        # With the CPU and memory sections left out
+        partial = {**self.doc, "cpu": {}}
+        del partial["memory"]
+        decoded = codec.decode_metrics(encode_metrics(partial))
+        expected = {key: value for key, value in partial.items() if key != "cpu"}
+        self.assertEqual(decoded, expected)
+        self.assertEqual(decoded, decode_metrics(encode_metrics(partial)))
+
+    def test_rejects_unknown_version(self):
+        """Test that an unsupported format version is refused"""
+        encoded = bytearray(encode_metrics(self.doc))
+        struct.pack_into("<B", encoded, 3, 99)
+        with self.assertRaises(ValueError):
+            decode_metrics(bytes(encoded))
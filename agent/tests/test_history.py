@@ -0,0 +1,55 @@
+# agent/tests/test_history.py
+from unittest import TestCase
+
+from agent.history import History, RingBuffer
+
+
+class TestRingBuffer(TestCase):
+
+    def test_overwrites_oldest_when_full(self):
+        """Test that the buffer keeps only the newest samples"""
+        ring = RingBuffer(3)
+        for ts in range(1, 6):
+            ring.append(float(ts), ts * 10)
+
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.since(), [(3.0, 30), (4.0, 40), (5.0, 50)])
+
+    def test_since_cursor(self):
+        """Test that since returns only samples strictly after the cursor"""
+        ring = RingBuffer(10)
+        for ts in range(1, 8):
+            ring.append(float(ts), ts)
+
+        self.assertEqual([ts for ts, _ in ring.since(4.0)], [5.0, 6.0, 7.0])
+        self.assertEqual(ring.since(7.0), [])
+        self.assertEqual(len(ring.since(0.5)), 7)
+
+    def test_since_cursor_after_wrap(self):
+        """Test the binary search across the wrap-around point"""
+        ring = RingBuffer(4)
+        for ts in range(1, 11):
+            ring.append(float(ts), ts)
+
+        self.assertEqual([ts for ts, _ in ring.since(8.0)], [9.0, 10.0])
+
+    def test_step_thins_samples(self):
+        """Test that step keeps at most one sample per step seconds"""
+        ring = RingBuffer(100)
+        for ts in range(0, 10):
+            ring.append(float(ts), ts)
+
+        self.assertEqual([ts for ts, _ in ring.since(step=3)], [0.0, 3.0, 6.0, 9.0])
+
+
+class TestHistory(TestCase):
+
+    def test_capacity_follows_collector_interval(self):
+        """Test that each collector's ring covers the same time window"""
+        history = History(seconds=60)
+        history.record("cpu", 1.0, 1.0, {})
+        history.record("disk", 30.0, 1.0, {})
+
+        self.assertEqual(history._rings["cpu"].capacity, 60)
+        self.assertEqual(history._rings["disk"].capacity, 2)
+        self.assertEqual(history.since("missing"), [])
@@ -0,0 +1,43 @@
+# agent/tests/test_host.py
+import socket
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from agent.host import HostIdentity, collect_host_identity
+
+
+class TestHostIdentity(TestCase):
+
+    @patch('agent.host.socket.gethostbyname', side_effect=socket.gaierror("resolver down"))
+    def test_resolver_failure_falls_back_to_interface_ip(self, mock_resolve):
+        """Test that a broken resolver does not fail identity collection"""
+        identity = collect_host_identity()
+
+        self.assertTrue(identity["ip_address"])
+        self.assertEqual(identity["hostname"], socket.gethostname())
+        self.assertGreaterEqual(identity["cores"], 1)
+
+    @patch('agent.host.socket.gethostbyname')
+    def test_get_does_not_resolve(self, mock_resolve):
+        """Test that reading the cached identity never touches DNS"""
+        identity = HostIdentity()
+        for _ in range(10):
+            identity.get()
+
+        mock_resolve.assert_not_called()
+
+    @patch('agent.host.socket.gethostbyname', return_value="10.1.2.3")
+    def test_background_refresh_resolves_ip(self, mock_resolve):
+        """Test that the background thread refreshes the identity off the request path"""
+        identity = HostIdentity(ttl=60)
+        identity.start()
+        try:
+            deadline = time.monotonic() + 2
+            while identity.get()["ip_address"] != "10.1.2.3" and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            identity.stop()
+
+        self.assertEqual(identity.get()["ip_address"], "10.1.2.3")
+        self.assertGreater(identity.refreshed_at, 0)
@@ -0,0 +1,138 @@
+# agent/tests/test_main.py
+import asyncio
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from starlette.requests import Request
+
+from agent import main
+from agent.collectors import CollectorRegistry
+from agent.history import History
+from agent.versions import VersionLog
+
+
+def make_request(headers=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/metrics",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+
+def process(pid, cpu_percent):
+    return {"pid": pid, "create_time": f"t{pid}", "name": f"p{pid}", "cpu_percent": cpu_percent}
+
+
+class TestMetricsVersions(TestCase):
+
+    def setUp(self):
+        self.log = VersionLog(epoch="boot1")
+        self.processes = [process(1, 5.0), process(2, 1.0), process(3, 0.0)]
+        self.log.record("cpu", 1.0, {"overall_usage": 1.0})
+        self.log.record("processes", 1.0, self.processes)
+        self.snapshot = {"timestamp": "2024-01-01 00:00:00", "cpu": {"overall_usage": 1.0},
+                         "processes": self.processes, "status": {}}
+
+        async def get_snapshot(*names):
+            return dict(self.snapshot)
+
+        for name, value in (("version_log", self.log), ("get_snapshot", get_snapshot),
+                            ("get_host_info", lambda: ("web1", "10.0.0.1", "Linux"))):
+            patcher = patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_metrics(self, headers=None, processes="all", since_version=None):
+        return asyncio.run(main.get_metrics(make_request(headers), processes=processes, cgroups="all",
+                                            since_version=since_version))
+
+    def test_etag_and_not_modified(self):
+        """Test that /metrics carries the data version as ETag and answers a matching If-None-Match with 304"""
+        response = self.get_metrics()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], '"boot1-2"')
+
+        self.assertEqual(self.get_metrics({"If-None-Match": '"boot1-2"'}).status_code, 304)
+
+        self.log.record("cpu", 2.0, {"overall_usage": 7.0})
+        response = self.get_metrics({"If-None-Match": '"boot1-2"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], '"boot1-3"')
+
+    def test_since_version_returns_changes(self):
+        """Test that since_version returns only what changed, versioned like the ETag"""
+        self.log.record("cpu", 2.0, {"overall_usage": 7.0})
+
+        body = json.loads(self.get_metrics(since_version="boot1-2").body)
+
+        self.assertEqual(body["version"], "boot1-3")
+        self.assertEqual(body["changes"], {"cpu": {"overall_usage": 7.0}})
+        self.assertEqual(body["full"], [])
+
+    def test_since_version_keeps_top_processes(self):
+        """Test that processes=top:N is applied to both sides of the process diff"""
+        self.log.record("processes", 2.0, [process(1, 5.0), process(2, 0.5), process(3, 9.0)])
+
+        body = json.loads(self.get_metrics(processes="top:2", since_version="boot1-2").body)
+
+        diff = body["changes"]["processes"]
+        self.assertEqual([row["pid"] for row in diff["added"]], [3])
+        self.assertEqual(diff["removed"], [[2, "t2"]])
+        self.assertEqual(diff["changed"], [])
+        self.assertNotIn("processes", json.loads(self.get_metrics(processes="none", since_version="boot1-2").body)["changes"])
+
+    def test_versions_from_before_a_restart(self):
+        """Test that a restarted agent never answers an old version with 304 or a delta"""
+        restarted = VersionLog(epoch="boot2")
+        # The new process has counted up past the client's old version
+        for usage in (1.0, 2.0, 3.0):
+            restarted.record("cpu", usage, {"overall_usage": usage})
+        restarted.record("processes", 1.0, self.processes)
+
+        with patch.object(main, "version_log", restarted):
+            self.assertEqual(self.get_metrics({"If-None-Match": '"boot1-2"'}).status_code, 200)
+            body = json.loads(self.get_metrics(since_version="boot1-2").body)
+
+        self.assertEqual(body["version"], "boot2-4")
+        self.assertEqual(sorted(body["full"]), ["cpu", "processes"])
+        self.assertEqual(body["changes"]["cpu"], {"overall_usage": 3.0})
+
+
+class TestHistoryCursors(TestCase):
+
+    def setUp(self):
+        self.history = History(3600)
+        registry = CollectorRegistry()
+        for name in ("cpu", "memory"):
+            registry.register(name, lambda: None)
+        sampler = main.Sampler(registry)
+        sampler.history = self.history
+        patcher = patch.object(main, "sampler", sampler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_history(self, since=None, cursors=None):
+        return asyncio.run(main.get_history(since=since, step=None, names=None, cursors=cursors))
+
+    def test_slow_collector_is_not_skipped(self):
+        """Test that a sample recorded late with an older timestamp is still returned on the next poll"""
+        self.history.record("cpu", 1.0, 100.0, "c1")
+        self.history.record("memory", 1.0, 102.0, "m1")
+        first = self.get_history(since=90.0)
+        self.assertEqual(first["cursors"], {"cpu": 100.0, "memory": 102.0})
+
+        # A slow cpu run stamped at 101 only lands after memory's 102 was served
+        self.history.record("cpu", 1.0, 101.0, "c2")
+        cursors = ",".join(f"{name}:{ts}" for name, ts in first["cursors"].items())
+        second = self.get_history(cursors=cursors)
+
+        self.assertEqual(second["history"]["cpu"], [(101.0, "c2")])
+        self.assertEqual(second["history"]["memory"], [])
+        self.assertEqual(second["cursors"], {"cpu": 101.0, "memory": 102.0})
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(main.HTTPException):
+            self.get_history(cursors="cpu:soon")
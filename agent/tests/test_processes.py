@@ -0,0 +1,88 @@
+# agent/tests/test_processes.py
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+import psutil
+
+from agent.processes import ProcessTable, select_processes
+
+
+class TestProcessTable(TestCase):
+
+    def test_refresh_returns_current_process(self):
+        """Test that the table reports this process with the expected fields"""
+        table = ProcessTable()
+        rows = {row["pid"]: row for row in table.refresh()}
+
+        row = rows[os.getpid()]
+        for field in ("pid", "name", "username", "cpu_percent", "memory_percent",
+                      "create_time", "status", "cmdline"):
+            self.assertIn(field, row)
+        self.assertIn("python", row["cmdline"].lower())
+
+    def test_process_objects_are_reused(self):
+        """Test that entries survive between refreshes instead of being rebuilt"""
+        table = ProcessTable()
+        table.refresh()
+        key = next(k for k in table._entries if k[0] == os.getpid())
+        first = table._entries[key]
+
+        table.refresh()
+
+        self.assertIs(table._entries[key], first)
+
+    def test_static_fields_read_once(self):
+        """Test that cmdline is memoized rather than re-read every sample"""
+        table = ProcessTable()
+        table.refresh()
+        with patch.object(psutil.Process, "cmdline", side_effect=AssertionError("re-read")):
+            rows = table.refresh()
+
+        self.assertTrue(any(row["pid"] == os.getpid() for row in rows))
+
+    def test_exited_processes_are_dropped(self):
+        """Test that entries for vanished pids are removed"""
+        table = ProcessTable()
+        table.refresh()
+        with patch("agent.processes.psutil.pids", return_value=[os.getpid()]):
+            rows = table.refresh()
+
+        self.assertEqual([row["pid"] for row in rows], [os.getpid()])
+        self.assertEqual(len(table), 1)
+
+
+class TestSelectProcesses(TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {"pid": 3, "name": "nginx", "username": "www", "cpu_percent": 5.0, "memory_percent": 1.0, "cmdline": "nginx: worker"},
+            {"pid": 1, "name": "systemd", "username": "root", "cpu_percent": 0.1, "memory_percent": 0.5, "cmdline": "/sbin/init"},
+            {"pid": 7, "name": "python", "username": "root", "cpu_percent": 50.0, "memory_percent": 9.0, "cmdline": "python app.py"},
+            {"pid": 5, "name": "postgres", "username": "pg", "cpu_percent": 20.0, "memory_percent": 12.0, "cmdline": "postgres -D /data"},
+        ]
+
+    def test_top_n_by_cpu(self):
+        """Test that limit selects the highest CPU consumers in order"""
+        total, page = select_processes(self.rows, limit=2)
+
+        self.assertEqual(total, 4)
+        self.assertEqual([row["pid"] for row in page], [7, 5])
+
+    def test_sort_and_offset(self):
+        """Test memory and pid ordering with pagination"""
+        _, by_memory = select_processes(self.rows, sort="memory", limit=2, offset=1)
+        _, by_pid = select_processes(self.rows, sort="pid")
+
+        self.assertEqual([row["pid"] for row in by_memory], [7, 3])
+        self.assertEqual([row["pid"] for row in by_pid], [1, 3, 5, 7])
+
+    def test_filters(self):
+        """Test filtering by exact user and name substring"""
+        total, page = select_processes(self.rows, user="root")
+        self.assertEqual(total, 2)
+        self.assertEqual([row["pid"] for row in page], [7, 1])
+
+        total, page = select_processes(self.rows, name="POST")
+        self.assertEqual(total, 1)
+        self.assertEqual(page[0]["pid"], 5)
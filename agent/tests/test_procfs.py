@@ -0,0 +1,116 @@
+# agent/tests/test_procfs.py
+import os
+import tempfile
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from agent.processes import ProcessTable
+from agent.procfs import ProcfsProcessTable, procfs_available
+
+
+def stat_line(pid, comm, state="S", utime=0, stime=0, starttime=1000):
+    # pid (comm) state ppid pgrp session tty tpgid flags minflt cminflt majflt
+    # cmajflt utime stime cutime cstime priority nice threads itrealvalue starttime
+    return f"{pid} ({comm}) {state} 1 1 1 0 -1 0 0 0 0 0 {utime} {stime} 0 0 20 0 1 0 {starttime} 0 0\n"
+
+
+@skipUnless(procfs_available(), "requires /proc")
+class TestProcfsProcessTable(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.proc = self.tmp.name
+
+    def write_process(self, pid, comm="worker", cmdline=b"worker\x00--fast\x00", rss_pages=256, **stat):
+        directory = os.path.join(self.proc, str(pid))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "stat"), "w") as f:
+            f.write(stat_line(pid, comm, **stat))
+        with open(os.path.join(directory, "statm"), "w") as f:
+            f.write(f"1000 {rss_pages} 100 10 0 200 0\n")
+        with open(os.path.join(directory, "cmdline"), "wb") as f:
+            f.write(cmdline)
+        with open(os.path.join(directory, "status"), "w") as f:
+            f.write(f"Name:\t{comm}\nUid:\t0\t0\t0\t0\n")
+
+    def test_rows_match_psutil_table(self):
+        """Test that the fast path produces the same rows as the psutil table"""
+        rows = {row["pid"]: row for row in ProcfsProcessTable().refresh()}
+        expected = {row["pid"]: row for row in ProcessTable().refresh()}
+
+        row = rows[os.getpid()]
+        for field in ("pid", "name", "username", "create_time", "status", "cmdline"):
+            self.assertEqual(row[field], expected[os.getpid()][field])
+        self.assertAlmostEqual(row["memory_percent"], expected[os.getpid()]["memory_percent"], delta=0.5)
+
+    def test_parses_stat_fields(self):
+        """Test parsing of comm with spaces and parentheses, state and cmdline"""
+        self.write_process(10, comm="odd (name) x", state="R", cmdline=b"/usr/bin/odd\x00-v\x00")
+        row = ProcfsProcessTable(self.proc).refresh()[0]
+
+        self.assertEqual(row["pid"], 10)
+        self.assertEqual(row["name"], "odd (name) x")
+        self.assertEqual(row["status"], "running")
+        self.assertEqual(row["cmdline"], "/usr/bin/odd -v")
+        self.assertEqual(row["username"], "root")
+        self.assertEqual(row["cpu_percent"], 0.0)
+
+    def test_truncated_comm_uses_cmdline_name(self):
+        """Test that a 15-character comm is expanded from cmdline like psutil does"""
+        self.write_process(11, comm="very-long-proce", cmdline=b"/opt/very-long-process-name\x00")
+        row = ProcfsProcessTable(self.proc).refresh()[0]
+        self.assertEqual(row["name"], "very-long-process-name")
+
+    def test_cpu_percent_from_jiffy_deltas(self):
+        """Test that CPU% is the change in utime + stime over wall time"""
+        table = ProcfsProcessTable(self.proc)
+        table.clock_ticks = 100
+        self.write_process(12, utime=100, stime=50)
+        with patch("agent.procfs.time.monotonic", return_value=10.0):
+            table.refresh()
+
+        # 150 more ticks at 100 Hz over 2 seconds = 75%
+        self.write_process(12, utime=200, stime=100)
+        with patch("agent.procfs.time.monotonic", return_value=12.0):
+            row = table.refresh()[0]
+
+        self.assertEqual(row["cpu_percent"], 75.0)
+
+    def test_static_fields_read_once(self):
+        """Test that cmdline is only read when a process is first seen"""
+        self.write_process(13)
+        table = ProcfsProcessTable(self.proc)
+        table.refresh()
+        os.remove(os.path.join(self.proc, "13", "cmdline"))
+
+        rows = table.refresh()
+
+        self.assertEqual(rows[0]["cmdline"], "worker --fast")
+
+    def test_recycled_pid_is_a_new_process(self):
+        """Test that a pid reused by a new process does not inherit the old entry"""
+        table = ProcfsProcessTable(self.proc)
+        self.write_process(14, cmdline=b"old\x00", starttime=1000, utime=500)
+        table.refresh()
+
+        self.write_process(14, cmdline=b"new\x00", starttime=2000, utime=10)
+        row = table.refresh()[0]
+
+        self.assertEqual(row["cmdline"], "new")
+        self.assertEqual(row["cpu_percent"], 0.0)
+
+    def test_exited_processes_are_dropped(self):
+        """Test that entries for vanished pids are removed"""
+        self.write_process(15)
+        self.write_process(16)
+        table = ProcfsProcessTable(self.proc)
+        table.refresh()
+
+        for name in os.listdir(os.path.join(self.proc, "16")):
+            os.remove(os.path.join(self.proc, "16", name))
+        os.rmdir(os.path.join(self.proc, "16"))
+        rows = table.refresh()
+
+        self.assertEqual([row["pid"] for row in rows], [15])
+        self.assertEqual(len(table), 1)
@@ -0,0 +1,84 @@
+# agent/tests/test_prometheus.py
+from unittest import TestCase
+from unittest.mock import patch
+
+from agent import prometheus
+from agent.prometheus import PrometheusExporter, family, render_processes
+
+
+class TestFormat(TestCase):
+
+    def test_family_renders_help_type_and_samples(self):
+        """Test the text format, label escaping and skipped None values"""
+        text = family("sysmetrics_test", "gauge", "A test.", [
+            ({"path": 'C:\\dir "x"\n'}, 1.5),
+            ({"path": "/"}, None),
+            ({}, 3),
+        ])
+        self.assertEqual(text, (
+            "# HELP sysmetrics_test A test.\n"
+            "# TYPE sysmetrics_test gauge\n"
+            'sysmetrics_test{path="C:\\\\dir \\"x\\"\\n"} 1.5\n'
+            "sysmetrics_test 3\n"
+        ))
+
+    def test_processes_limited_to_top_cpu(self):
+        """Test that only the busiest processes become series"""
+        rows = [{"pid": pid, "name": f"p{pid}", "username": "root", "cpu_percent": float(pid),
+                 "memory_percent": 0.1} for pid in range(20)]
+        text = "".join(render_processes(rows, top_processes=3))
+
+        self.assertIn("sysmetrics_processes 20\n", text)
+        self.assertIn('sysmetrics_process_cpu_percent{pid="19",name="p19",username="root"} 19.0', text)
+        self.assertNotIn('pid="16"', text)
+
+
+class TestPrometheusExporter(TestCase):
+
+    def setUp(self):
+        self.exporter = PrometheusExporter(lambda: {"hostname": "web-1", "ip_address": "10.0.0.1", "os_info": "Linux"})
+
+    def test_renders_collectors(self):
+        """Test that recorded samples appear in the exposition"""
+        self.exporter.record("memory", 100.0, {"total": 1024, "used": 512, "percent_used": 50.0})
+        self.exporter.record("custom", 100.0, {"queue_depth": 7, "label": "x"})
+        text = self.exporter.render().decode()
+
+        self.assertIn('sysmetrics_host_info{hostname="web-1",ip_address="10.0.0.1",os_info="Linux"} 1', text)
+        self.assertIn('sysmetrics_collector_last_sample_timestamp_seconds{collector="memory"} 100.0', text)
+        self.assertIn("sysmetrics_memory_total_bytes 1024\n", text)
+        self.assertIn("sysmetrics_memory_used_percent 50.0\n", text)
+        self.assertIn("sysmetrics_custom_queue_depth 7\n", text)
+        self.assertNotIn("sysmetrics_memory_free_bytes 0", text)
+
+    def test_buffer_reused_until_next_sample(self):
+        """Test that scrapes between samples share one rendered buffer"""
+        self.exporter.record("cpu", 1.0, {"overall_usage": 5.0})
+        first = self.exporter.render()
+        self.assertIs(self.exporter.render(), first)
+
+        self.exporter.record("cpu", 2.0, {"overall_usage": 7.0})
+        second = self.exporter.render()
+        self.assertIsNot(second, first)
+        self.assertIn(b"sysmetrics_cpu_usage_percent 7.0", second)
+
+    def test_only_changed_collectors_are_rerendered(self):
+        """Test that a new sample re-renders just that collector's block"""
+        calls = []
+
+        def counting(name):
+            def render(value, **_):
+                calls.append(name)
+                return [family(f"sysmetrics_{name}", "gauge", name, [({}, value)])]
+            return render
+
+        with patch.dict(prometheus.RENDERERS, {"cpu": counting("cpu"), "memory": counting("memory")}):
+            self.exporter.record("cpu", 1.0, 1)
+            self.exporter.record("memory", 1.0, 2)
+            self.exporter.render()
+            self.exporter.record("cpu", 2.0, 3)
+            text = self.exporter.render().decode()
+
+        self.assertEqual(calls, ["cpu", "memory", "cpu"])
+        self.assertIn("sysmetrics_cpu 3\n", text)
+        self.assertIn("sysmetrics_memory 2\n", text)
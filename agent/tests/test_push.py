@@ -0,0 +1,125 @@
+# agent/tests/test_push.py
+import gzip
+import json
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+
+import requests
+
+from agent.push import MetricsPusher, Spool, encode_batch
+
+IDENTITY = {"hostname": "web1", "ip_address": "10.0.0.1", "os_info": "Linux 6.1"}
+
+
+def response(status_code):
+    result = requests.Response()
+    result.status_code = status_code
+    return result
+
+
+def decode(batch):
+    return [json.loads(line) for line in gzip.decompress(batch).decode().splitlines()]
+
+
+class TestSpool(TestCase):
+
+    def test_memory_spool_drops_oldest(self):
+        """Test that a full spool makes room by dropping the oldest batch"""
+        spool = Spool(max_batches=2)
+        for batch in (b"1", b"2", b"3"):
+            spool.put(batch)
+        self.assertEqual(len(spool), 2)
+        self.assertEqual(spool.dropped, 1)
+        self.assertEqual(spool.peek(), b"2")
+        spool.pop()
+        self.assertEqual(spool.peek(), b"3")
+
+    def test_directory_spool_survives_restart(self):
+        """Test that spooled batches are read back, in order, by a new spool"""
+        with tempfile.TemporaryDirectory() as directory:
+            spool = Spool(directory, max_batches=2)
+            for batch in (b"1", b"2", b"3"):
+                spool.put(batch)
+
+            reopened = Spool(directory, max_batches=2)
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.peek(), b"2")
+            reopened.pop()
+            self.assertEqual(reopened.peek(), b"3")
+
+
+class TestMetricsPusher(TestCase):
+
+    def setUp(self):
+        self.session = Mock(spec=requests.Session)
+        self.session.headers = {}
+        self.pusher = MetricsPusher("http://dashboard/historical/api/ingest/", lambda: IDENTITY,
+                                    interval=60.0, batch_size=2, session=self.session, token="secret")
+
+    def test_sample_in_dashboard_format(self):
+        """Test that samples carry the host identity and the stored collectors only"""
+        self.assertIsNone(self.pusher.sample())
+        self.pusher.record("cpu", 100.0, {"overall_usage": 5.0})
+        self.pusher.record("processes", 100.0, [{"pid": 1}])
+
+        document = self.pusher.sample()
+        self.assertEqual(document["hostname"], "web1")
+        self.assertEqual(document["cpu"], {"overall_usage": 5.0})
+        self.assertEqual(document["memory"], {})
+        self.assertNotIn("processes", document)
+        self.assertEqual(self.session.headers["Authorization"], "Bearer secret")
+
+    def test_batches_and_sends(self):
+        """Test that full batches are sent as gzip NDJSON, oldest first"""
+        self.session.post.return_value = response(200)
+        for i in range(5):
+            self.pusher.add({"hostname": "web1", "n": i})
+
+        self.assertTrue(self.pusher.flush())
+        batches = [decode(call.kwargs["data"]) for call in self.session.post.call_args_list]
+        self.assertEqual([[row["n"] for row in batch] for batch in batches], [[0, 1], [2, 3]])
+        self.assertEqual(self.pusher.sent, 2)
+        self.assertEqual(len(self.pusher.spool), 0)
+
+    def test_failure_spools_and_backs_off(self):
+        """Test that an unreachable dashboard keeps batches and backs off exponentially"""
+        self.session.post.side_effect = requests.ConnectionError("refused")
+        self.pusher.spool.put(encode_batch([{"n": 1}]))
+
+        self.assertFalse(self.pusher.flush())
+        self.assertFalse(self.pusher.flush())
+        self.assertEqual(len(self.pusher.spool), 1)
+        self.assertEqual(self.pusher.failures, 2)
+        self.assertTrue(60.0 <= self.pusher._backoff() <= 120.0)
+        self.pusher.failures = 10
+        self.assertLessEqual(self.pusher._backoff(), self.pusher.max_backoff)
+
+        self.session.post.side_effect = None
+        self.session.post.return_value = response(503)
+        self.assertFalse(self.pusher.flush())
+        self.assertEqual(len(self.pusher.spool), 1)
+
+        self.session.post.return_value = response(200)
+        self.assertTrue(self.pusher.flush())
+        self.assertEqual(self.pusher.failures, 0)
+        self.assertEqual(len(self.pusher.spool), 0)
+
+    def test_rejected_batch_is_dropped(self):
+        """Test that a batch the dashboard refuses does not block the spool"""
+        self.session.post.side_effect = [response(400), response(200)]
+        self.pusher.spool.put(encode_batch([{"n": 1}]))
+        self.pusher.spool.put(encode_batch([{"n": 2}]))
+
+        self.assertTrue(self.pusher.flush())
+        self.assertEqual(self.pusher.sent, 1)
+        self.assertEqual(len(self.pusher.spool), 0)
+
+    def test_stop_spools_partial_batch(self):
+        """Test that samples not yet batched are sent on shutdown"""
+        self.session.post.return_value = response(200)
+        self.pusher.add({"n": 1})
+        self.pusher.stop()
+
+        self.assertEqual(decode(self.session.post.call_args.kwargs["data"]), [{"n": 1}])
+        self.session.close.assert_called_once()
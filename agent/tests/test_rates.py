@@ -0,0 +1,43 @@
+# agent/tests/test_rates.py
+from unittest import TestCase
+
+from agent.rates import RateTracker, counter_delta
+
+
+class TestCounterDelta(TestCase):
+
+    def test_increase(self):
+        self.assertEqual(counter_delta(100, 250), 150)
+
+    def test_decrease_is_a_reset(self):
+        """Test that a counter going backwards is treated as restarted from zero, whatever its width"""
+        self.assertEqual(counter_delta(2 ** 32 - 10, 5), 5)
+        self.assertEqual(counter_delta(2 ** 34, 42), 42)
+
+
+class TestRateTracker(TestCase):
+
+    def test_first_sample_is_baseline(self):
+        tracker = RateTracker()
+        self.assertEqual(tracker.update({"sda": {"read_bytes": 1000}}, now=0.0), {})
+
+    def test_rates_per_second(self):
+        """Test that rates are deltas divided by elapsed time"""
+        tracker = RateTracker()
+        tracker.update({"eth0": {"bytes_recv": 1000, "errin": 0}}, now=10.0)
+        rates = tracker.update({"eth0": {"bytes_recv": 5000, "errin": 4}}, now=12.0)
+
+        self.assertEqual(rates, {"eth0": {"bytes_recv": 2000.0, "errin": 2.0}})
+
+    def test_hot_plugged_device(self):
+        """Test that removed devices are forgotten and re-added ones start from a new baseline"""
+        tracker = RateTracker()
+        tracker.update({"sda": {"read_count": 10}, "sdb": {"read_count": 500}}, now=0.0)
+        rates = tracker.update({"sda": {"read_count": 20}}, now=1.0)
+        self.assertEqual(set(rates), {"sda"})
+
+        rates = tracker.update({"sda": {"read_count": 30}, "sdb": {"read_count": 3}}, now=2.0)
+        self.assertEqual(set(rates), {"sda"})
+
+        rates = tracker.update({"sda": {"read_count": 40}, "sdb": {"read_count": 13}}, now=3.0)
+        self.assertEqual(rates["sdb"], {"read_count": 10.0})
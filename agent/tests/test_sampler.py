@@ -0,0 +1,203 @@
+# agent/tests/test_sampler.py
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from agent.collectors import CollectorRegistry
+from agent.sampler import Sampler
+
+
+def make_registry(interval=1.0, **funcs):
+    registry = CollectorRegistry()
+    for name, func in funcs.items():
+        registry.register(name, func, interval=interval)
+    return registry
+
+
+class TestSampler(TestCase):
+
+    def test_failed_collector_keeps_previous_value(self):
+        """Test that a failing collector does not drop its last good value"""
+        calls = {"count": 0}
+
+        def flaky():
+            calls["count"] += 1
+            if calls["count"] > 1:
+                raise RuntimeError("boom")
+            return {"value": 1}
+
+        sampler = Sampler(make_registry(flaky=flaky))
+        sampler.collect("flaky")
+        with self.assertRaises(RuntimeError):
+            sampler.collect("flaky")
+
+        self.assertEqual(sampler.values()["flaky"][1], {"value": 1})
+
+    def test_samples_are_recorded_in_history(self):
+        """Test that each collection is appended to its collector's history"""
+        counter = iter(range(100))
+        registry = CollectorRegistry()
+        registry.register("n", lambda: next(counter))
+        registry.register("big", lambda: ["row"] * 10, history=False)
+        sampler = Sampler(registry, history_seconds=3)
+        for _ in range(5):
+            sampler.collect("n")
+            sampler.collect("big")
+
+        self.assertEqual([value for _, value in sampler.history.since("n")], [2, 3, 4])
+        self.assertEqual(sampler.history.since("big"), [])
+
+    def test_background_thread_samples(self):
+        """Test that start() collects on its own clock until stop()"""
+        sampler = Sampler(make_registry(interval=0.01, n=lambda: 1))
+        sampler.start()
+        try:
+            deadline = time.monotonic() + 2
+            while len(sampler.history.since("n")) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sampler.stop()
+
+        self.assertGreaterEqual(len(sampler.history.since("n")), 3)
+
+    def test_snapshot_serves_fresh_values_from_cache(self):
+        """Test that values within the staleness window are not re-collected"""
+        calls = []
+        sampler = Sampler(make_registry(cpu=lambda: calls.append(1) or len(calls)), max_staleness=60)
+
+        first = asyncio.run(sampler.snapshot())
+        second = asyncio.run(sampler.snapshot())
+
+        self.assertEqual(first["cpu"], 1)
+        self.assertEqual(second["cpu"], 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_snapshot_respects_stretched_interval(self):
+        """Test that a collector stretched for exceeding its budget is not re-run on demand"""
+        calls = []
+        registry = CollectorRegistry()
+        registry.register("processes", lambda: calls.append(1) or len(calls), interval=0.01, budget=0.1)
+        sampler = Sampler(registry, max_staleness=0)
+        sampler.collect("processes")
+        # A 6s run against a 10% budget: sampled every 60s instead of every 10ms
+        registry.get("processes").record_duration(6.0)
+
+        time.sleep(0.05)
+        snapshot = asyncio.run(sampler.snapshot())
+
+        self.assertEqual(snapshot["processes"], 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_snapshot_recollects_stale_values(self):
+        """Test that a zero staleness window forces a fresh collection"""
+        calls = []
+        sampler = Sampler(make_registry(cpu=lambda: calls.append(1) or len(calls), memory=lambda: "m"))
+        sampler.collect("cpu")
+
+        snapshot = asyncio.run(sampler.snapshot(["cpu"], max_age=0))
+
+        self.assertEqual(snapshot["cpu"], 2)
+        self.assertNotIn("memory", snapshot)
+
+    def test_collectors_run_on_their_own_interval(self):
+        """Test that a slow-interval collector is not sampled every tick"""
+        counts = {"fast": 0, "slow": 0}
+        registry = CollectorRegistry()
+        registry.register("fast", lambda: counts.__setitem__("fast", counts["fast"] + 1), interval=0.01)
+        registry.register("slow", lambda: counts.__setitem__("slow", counts["slow"] + 1), interval=60)
+        sampler = Sampler(registry)
+
+        deadline = time.monotonic() + 2
+        while counts["fast"] < 5 and time.monotonic() < deadline:
+            sampler.run_due()
+            time.sleep(0.01)
+
+        self.assertGreaterEqual(counts["fast"], 5)
+        self.assertEqual(counts["slow"], 1)
+
+    def test_run_due_does_not_wait_for_collectors(self):
+        """Test that a tick only starts collections and reports a missed deadline on a later tick"""
+        release = threading.Event()
+        registry = CollectorRegistry()
+        registry.register("disk", lambda: release.wait(5), interval=60, timeout=0.05)
+        sampler = Sampler(registry)
+        self.addCleanup(release.set)
+
+        started = time.monotonic()
+        self.assertEqual(sampler.run_due(), ["disk"])
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        time.sleep(0.1)
+        with self.assertLogs("agent.sampler", "WARNING") as logs:
+            self.assertEqual(sampler.run_due(), [])
+        self.assertIn("missed its deadline", logs.output[0])
+
+    def test_start_delays_first_runs(self):
+        """Test that start() can hold back a collector's first run, e.g. until a rate baseline has a full interval"""
+        counts = {"cpu": 0, "memory": 0}
+        registry = CollectorRegistry()
+        for name in counts:
+            registry.register(name, lambda name=name: counts.__setitem__(name, counts[name] + 1), interval=60)
+        sampler = Sampler(registry)
+        sampler.start(delays={"cpu": 60})
+        try:
+            deadline = time.monotonic() + 2
+            while counts["memory"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sampler.stop()
+
+        self.assertEqual(counts, {"cpu": 0, "memory": 1})
+
+    def test_collectors_run_concurrently(self):
+        """Test that a snapshot's latency is bounded by the slowest collector, not the sum"""
+        registry = make_registry(a=lambda: time.sleep(0.2) or 1, b=lambda: time.sleep(0.2) or 2,
+                                 c=lambda: time.sleep(0.2) or 3)
+        sampler = Sampler(registry)
+
+        started = time.monotonic()
+        snapshot = asyncio.run(sampler.snapshot())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual((snapshot["a"], snapshot["b"], snapshot["c"]), (1, 2, 3))
+        self.assertLess(elapsed, 0.5)
+
+    def test_deadline_serves_previous_value_marked_stale(self):
+        """Test that a hung collector is reported stale instead of failing the snapshot"""
+        release = threading.Event()
+        hang = {"on": False}
+
+        def disk():
+            if hang["on"]:
+                release.wait(5)
+            return {"partitions": []}
+
+        registry = CollectorRegistry()
+        registry.register("disk", disk, timeout=0.05)
+        registry.register("cpu", lambda: {"overall_usage": 1.0})
+        sampler = Sampler(registry)
+        sampler.collect("disk")
+        hang["on"] = True
+
+        try:
+            snapshot = asyncio.run(sampler.snapshot(max_age=0))
+        finally:
+            release.set()
+
+        self.assertEqual(snapshot["disk"], {"partitions": []})
+        self.assertTrue(snapshot["status"]["disk"]["stale"])
+        self.assertIn("timed out", snapshot["status"]["disk"]["error"])
+        self.assertFalse(snapshot["status"]["cpu"]["stale"])
+
+    def test_missing_value_is_left_out(self):
+        """Test that a collector that never succeeded is omitted with an error status"""
+        def broken():
+            raise OSError("stale NFS handle")
+
+        sampler = Sampler(make_registry(disk=broken, cpu=lambda: 1))
+        snapshot = asyncio.run(sampler.snapshot())
+
+        self.assertNotIn("disk", snapshot)
+        self.assertEqual(snapshot["cpu"], 1)
+        self.assertEqual(snapshot["status"]["disk"]["error"], "stale NFS handle")
@@ -0,0 +1,109 @@
+# agent/tests/test_selfstats.py
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest import TestCase
+
+import psutil
+
+from agent.collectors import CollectorRegistry
+from agent.sampler import Sampler
+from agent.selfstats import EndpointStats, Histogram, Profiler, RequestStatsMiddleware, process_stats
+
+
+class TestHistogram(TestCase):
+
+    def test_buckets_and_quantiles(self):
+        """Test bucket counts and bucket-bound quantile estimates"""
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.005, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+
+        stats = histogram.as_dict()
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["buckets"], {"0.01": 2, "0.1": 1, "1.0": 1, "+Inf": 1})
+        self.assertEqual(stats["p50"], 0.1)
+        self.assertEqual(stats["p99"], 3.0)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestCollectorStats(TestCase):
+
+    def test_sampler_records_runs_and_errors(self):
+        """Test that every collection is timed and failures are counted"""
+        registry = CollectorRegistry()
+        registry.register("ok", lambda: 1)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.register("broken", broken)
+        sampler = Sampler(registry)
+        for _ in range(2):
+            sampler.collect("ok")
+            with self.assertRaises(RuntimeError):
+                sampler.collect("broken")
+
+        stats = sampler.stats.as_dict()
+        self.assertEqual(stats["ok"]["runs"], 2)
+        self.assertEqual(stats["ok"]["errors"], 0)
+        self.assertEqual(stats["broken"]["errors"], 2)
+        self.assertEqual(stats["broken"]["last_error"], "boom")
+
+
+class TestProfiler(TestCase):
+
+    def test_profiles_runs_within_window(self):
+        """Test that collector runs are profiled only while the window is open"""
+        registry = CollectorRegistry()
+        registry.register("work", lambda: sum(range(1000)))
+        sampler = Sampler(registry)
+
+        sampler.collect("work")
+        self.assertIsNone(sampler.profiler.report()["report"])
+
+        self.assertEqual(sampler.profiler.start(600), sampler.profiler.max_seconds)
+        sampler.collect("work")
+        sampler.profiler.stop()
+        sampler.collect("work")
+
+        report = sampler.profiler.report()
+        self.assertFalse(report["active"])
+        self.assertEqual(report["profiled_runs"], 1)
+        self.assertIn("function calls", report["report"])
+
+    def test_run_result_is_returned(self):
+        """Test that profiling does not change what the collector returns"""
+        profiler = Profiler()
+        profiler.start(5)
+        self.assertEqual(profiler.call(lambda: {"value": 3}), {"value": 3})
+
+
+class TestRequestStats(TestCase):
+
+    def test_latency_recorded_per_route_template(self):
+        """Test that requests are grouped by route and 5xx responses counted"""
+        stats = EndpointStats()
+
+        async def app(scope, receive, send):
+            scope["route"] = SimpleNamespace(path="/metrics/{name}")
+            status = 500 if scope["path"] == "/metrics/broken" else 200
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        middleware = RequestStatsMiddleware(app, stats)
+        for path in ("/metrics/cpu", "/metrics/memory", "/metrics/broken"):
+            asyncio.run(middleware({"type": "http", "method": "GET", "path": path}, None, send))
+
+        endpoint = stats.as_dict()["GET /metrics/{name}"]
+        self.assertEqual(endpoint["requests"], 3)
+        self.assertEqual(endpoint["server_errors"], 1)
+
+    def test_process_stats(self):
+        """Test that the agent's own resource usage is reported"""
+        stats = process_stats(psutil.Process())
+        self.assertEqual(stats["pid"], os.getpid())
+        self.assertGreater(stats["rss_bytes"], 0)
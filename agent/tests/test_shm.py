@@ -0,0 +1,75 @@
+# agent/tests/test_shm.py
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from agent.shm import SharedSnapshotWriter
+from agent.shmreader import SEQUENCE, SEQUENCE_OFFSET, SnapshotReader
+
+
+class TestSharedSnapshot(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "sysmetrics")
+        self.writer = SharedSnapshotWriter(self.path)
+        self.writer.open()
+        self.addCleanup(self.writer.close)
+
+    def test_round_trip(self):
+        """Test that readers see what the agent published"""
+        self.writer.record("cpu", 100.0, {"percent_usage_per_core": [10.0, 30.0], "overall_usage": 20.0,
+                                          "user": 15.0, "system": 5.0, "idle": 80.0, "cores": 2, "physical_cores": 1})
+        self.writer.record("memory", 101.0, {"total": 8192, "available": 4096, "used": 4096, "free": 1024,
+                                             "percent_used": 50.0, "swap_total": 0, "swap_used": 0, "swap_percent": 0.0})
+        self.writer.record("processes", 102.0, [])
+
+        with SnapshotReader(self.path) as reader:
+            snapshot = reader.read()
+
+        self.assertEqual(snapshot["sequence"], 4)
+        self.assertEqual(snapshot["cpu"]["timestamp"], 100.0)
+        self.assertEqual(snapshot["cpu"]["percent_usage_per_core"], [10.0, 30.0])
+        self.assertEqual(snapshot["cpu"]["overall_usage"], 20.0)
+        self.assertEqual(snapshot["cpu"]["cores"], 2)
+        self.assertEqual(snapshot["memory"]["timestamp"], 101.0)
+        self.assertEqual(snapshot["memory"]["used"], 4096)
+        self.assertEqual(snapshot["memory"]["percent_used"], 50.0)
+
+    def test_reader_retries_during_update(self):
+        """Test that a read never returns while the writer holds the seqlock"""
+        with SnapshotReader(self.path) as reader:
+            SEQUENCE.pack_into(self.writer._map, SEQUENCE_OFFSET, 7)
+            with self.assertRaises(TimeoutError):
+                reader.read(timeout=0.01)
+
+            timer = threading.Timer(0.05, SEQUENCE.pack_into, (self.writer._map, SEQUENCE_OFFSET, 8))
+            timer.start()
+            self.assertEqual(reader.read()["sequence"], 8)
+            timer.join()
+
+    def test_reopen_keeps_file_and_sequence(self):
+        """Test that an agent restart reuses the file readers already mapped"""
+        self.writer.record("memory", 1.0, {"total": 1})
+        reader = SnapshotReader(self.path)
+        self.addCleanup(reader.close)
+        self.writer.close()
+
+        restarted = SharedSnapshotWriter(self.path)
+        restarted.open()
+        self.addCleanup(restarted.close)
+        restarted.record("memory", 2.0, {"total": 2})
+
+        snapshot = reader.read()
+        self.assertEqual(snapshot["memory"]["total"], 2)
+        self.assertEqual(snapshot["sequence"], 4)
+
+    def test_rejects_foreign_file(self):
+        """Test that the reader refuses files without the snapshot header"""
+        other = self.path + ".other"
+        with open(other, "wb") as f:
+            f.write(bytes(8192))
+        with self.assertRaises(ValueError):
+            SnapshotReader(other)
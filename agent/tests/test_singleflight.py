@@ -0,0 +1,66 @@
+# agent/tests/test_singleflight.py
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from agent.singleflight import SingleFlight
+
+
+class TestSingleFlight(TestCase):
+
+    def test_concurrent_threads_share_one_call(self):
+        """Test that threads asking for the same key share one execution"""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("cpu", slow))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 2
+        while not flight.in_flight("cpu") and time.monotonic() < deadline:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 5)
+        self.assertFalse(flight.in_flight("cpu"))
+
+    def test_async_callers_share_one_submitted_call(self):
+        """Test that concurrent coroutines coalesce onto one thread-pool call"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return len(calls)
+
+        async def scrape():
+            return await asyncio.gather(*(asyncio.wrap_future(flight.submit("disk", slow)) for _ in range(10)))
+
+        results = asyncio.run(scrape())
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [1] * 10)
+
+    def test_exception_is_shared_and_key_released(self):
+        """Test that errors propagate to callers and don't wedge the key"""
+        flight = SingleFlight()
+
+        def broken():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("memory", broken)
+        self.assertEqual(flight.do("memory", lambda: 42), 42)
@@ -0,0 +1,81 @@
+# agent/tests/test_stream.py
+import asyncio
+import json
+import threading
+from unittest import TestCase
+
+from agent.stream import Broadcaster, changed_fields, parse_fields, sse_events
+
+
+def decode(event):
+    return json.loads(event.split("data: ", 1)[1])
+
+
+class TestFieldHelpers(TestCase):
+
+    def test_parse_fields(self):
+        self.assertEqual(
+            parse_fields("cpu.overall_usage,cpu.idle,memory"),
+            {"cpu": {"overall_usage", "idle"}, "memory": None}
+        )
+        self.assertEqual(parse_fields(None), {})
+
+    def test_changed_fields(self):
+        self.assertEqual(changed_fields({"a": 1, "b": 2}, {"a": 1, "b": 3}), {"b": 3})
+        self.assertIsNone(changed_fields({"a": 1}, {"a": 1}))
+        self.assertEqual(changed_fields(1, 2), 2)
+
+
+class TestSseEvents(TestCase):
+
+    def test_initial_values_then_published_samples(self):
+        """Test that a subscriber gets current values, then samples published from other threads"""
+        async def run():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe(["cpu"])
+            events = sse_events(subscription, {"cpu": (1.0, {"overall_usage": 5.0})}, {})
+
+            first = await events.__anext__()
+            thread = threading.Thread(target=broadcaster.publish, args=("cpu", 2.0, {"overall_usage": 7.0}))
+            thread.start()
+            # Samples for collectors the client did not subscribe to are not delivered
+            broadcaster.publish("memory", 2.0, {"percent_used": 1.0})
+            second = await asyncio.wait_for(events.__anext__(), 2)
+            thread.join()
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(decode(first), {"timestamp": 1.0, "cpu": {"overall_usage": 5.0}})
+        self.assertEqual(decode(second), {"timestamp": 2.0, "cpu": {"overall_usage": 7.0}})
+
+    def test_delta_and_field_selection(self):
+        """Test that delta mode sends only changed, selected fields and skips unchanged frames"""
+        async def run():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe(["cpu"])
+            events = sse_events(subscription, {}, {"cpu": {"overall_usage", "idle"}}, delta=True)
+            broadcaster.publish("cpu", 1.0, {"overall_usage": 5.0, "idle": 95.0, "user": 3.0})
+            broadcaster.publish("cpu", 2.0, {"overall_usage": 5.0, "idle": 95.0, "user": 4.0})
+            broadcaster.publish("cpu", 3.0, {"overall_usage": 6.0, "idle": 94.0, "user": 4.0})
+            return [decode(await asyncio.wait_for(events.__anext__(), 2)) for _ in range(2)]
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(first, {"timestamp": 1.0, "cpu": {"overall_usage": 5.0, "idle": 95.0}})
+        self.assertEqual(second, {"timestamp": 3.0, "cpu": {"overall_usage": 6.0, "idle": 94.0}})
+
+    def test_slow_subscriber_drops_oldest(self):
+        """Test that a full queue drops the oldest frame instead of growing"""
+        async def run():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe(["cpu"], maxsize=2)
+            for ts in range(5):
+                broadcaster.publish("cpu", float(ts), ts)
+            await asyncio.sleep(0)
+            return subscription
+
+        subscription = asyncio.run(run())
+
+        self.assertEqual(subscription.queue.qsize(), 2)
+        self.assertEqual(subscription.dropped, 3)
@@ -0,0 +1,95 @@
+# agent/tests/test_versions.py
+from unittest import TestCase
+
+from agent.versions import VersionLog, diff_processes
+
+
+class TestVersionLog(TestCase):
+
+    def test_unchanged_samples_keep_version(self):
+        """Test that only real changes bump the version"""
+        log = VersionLog()
+        log.record("memory", 1.0, {"total": 8, "used": 4})
+        log.record("memory", 2.0, {"total": 8, "used": 4})
+        self.assertEqual(log.current(["memory"]), 1)
+
+        log.record("memory", 3.0, {"total": 8, "used": 5})
+        self.assertEqual(log.current(["memory"]), 2)
+
+    def test_changes_since_returns_changed_fields(self):
+        """Test that a client at version N gets only what changed after N"""
+        log = VersionLog()
+        log.record("memory", 1.0, {"total": 8, "used": 4})
+        log.record("cpu", 1.0, {"overall_usage": 1.0, "cores": 4})
+        log.record("cpu", 2.0, {"overall_usage": 3.5, "cores": 4})
+
+        version, changes, full = log.changes_since(["cpu", "memory"], 2)
+
+        self.assertEqual(version, 3)
+        self.assertEqual(changes, {"cpu": {"overall_usage": 3.5}})
+        self.assertEqual(full, [])
+        self.assertEqual(log.changes_since(["cpu", "memory"], 3)[1], {})
+
+    def test_version_covers_only_the_requested_collectors(self):
+        """Test that the returned version is the newest among the requested collectors, matching current()"""
+        log = VersionLog()
+        log.record("cpu", 1.0, {"overall_usage": 1.0})
+        log.record("processes", 1.0, [{"pid": 1}])
+
+        version, _, _ = log.changes_since(["cpu"], 0)
+
+        self.assertEqual(version, 1)
+        self.assertEqual(version, log.current(["cpu"]))
+        # A version newer than these collectors' but not the log's is not a restart
+        self.assertEqual(log.changes_since(["cpu"], 2), (1, {}, []))
+
+    def test_expired_or_future_versions_get_full_values(self):
+        """Test that versions no longer retained, or from before a restart, fall back to full values"""
+        log = VersionLog(depth=2)
+        for used in range(5):
+            log.record("memory", float(used), {"used": used})
+
+        _, changes, full = log.changes_since(["memory"], 1)
+        self.assertEqual(changes, {"memory": {"used": 4}})
+        self.assertEqual(full, ["memory"])
+
+        _, changes, full = log.changes_since(["memory"], 99)
+        self.assertEqual(full, ["memory"])
+
+
+    def test_tags_carry_the_process_epoch(self):
+        """Test that version tags from another agent process are not recognised"""
+        log = VersionLog(epoch="boot1")
+        log.record("cpu", 1.0, {"overall_usage": 1.0})
+        self.assertEqual(log.tag(1), "boot1-1")
+        self.assertEqual(log.parse("boot1-1"), 1)
+
+        restarted = VersionLog(epoch="boot2")
+        restarted.record("cpu", 1.0, {"overall_usage": 2.0})
+        restarted.record("cpu", 2.0, {"overall_usage": 3.0})
+        for tag in ("boot1-1", "1", "boot2-x"):
+            self.assertIsNone(restarted.parse(tag))
+        self.assertEqual(restarted.changes_since(["cpu"], restarted.parse("boot1-1")),
+                         (2, {"cpu": {"overall_usage": 3.0}}, ["cpu"]))
+        self.assertNotEqual(VersionLog().epoch, VersionLog().epoch)
+
+
+class TestDiffProcesses(TestCase):
+
+    def test_added_removed_changed(self):
+        before = [
+            {"pid": 1, "create_time": "t1", "name": "init", "cpu_percent": 0.0},
+            {"pid": 2, "create_time": "t2", "name": "sshd", "cpu_percent": 1.0},
+            {"pid": 3, "create_time": "t3", "name": "cron", "cpu_percent": 0.0},
+        ]
+        after = [
+            {"pid": 1, "create_time": "t1", "name": "init", "cpu_percent": 0.0},
+            {"pid": 2, "create_time": "t2", "name": "sshd", "cpu_percent": 4.0},
+            {"pid": 3, "create_time": "t9", "name": "worker", "cpu_percent": 0.0},
+        ]
+
+        diff = diff_processes(before, after)
+
+        self.assertEqual(diff["added"], [after[2]])
+        self.assertEqual(diff["removed"], [[3, "t3"]])
+        self.assertEqual(diff["changed"], [{"pid": 2, "create_time": "t2", "cpu_percent": 4.0}])
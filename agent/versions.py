@@ -0,0 +1,136 @@
+# agent/versions.py
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .stream import changed_fields
+
+
+def process_key(row: Dict[str, Any]) -> Tuple[int, str]:
+    return row["pid"], row.get("create_time")
+
+
+def diff_processes(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Describe how a process list changed: new processes in full, the
+    (pid, create_time) keys of processes that exited, and the key and
+    changed fields of processes present in both.
+    """
+    old = {process_key(row): row for row in previous}
+    added, changed = [], []
+    for row in current:
+        key = process_key(row)
+        before = old.pop(key, None)
+        if before is None:
+            added.append(row)
+            continue
+        fields = changed_fields(before, row)
+        if fields:
+            changed.append({"pid": key[0], "create_time": key[1], **fields})
+    return {"added": added, "removed": [list(key) for key in old], "changed": changed}
+
+
+class VersionLog:
+    """
+    Assigns a monotonically increasing version to every change in the
+    collected data and keeps the last few versions of each collector, so a
+    client that already has version N can be sent just what changed since.
+
+    Used as a sampler listener. A sample equal to the previous one does not
+    create a new version.
+
+    Version numbers restart at 0 with the agent, so clients get them as tags
+    of the form ``<epoch>-<n>`` (see ``tag``), where the epoch is random per
+    process; a tag from an earlier process never matches a current version.
+    """
+
+    def __init__(self, depth: int = 32, depths: Optional[Dict[str, int]] = None,
+                 epoch: Optional[str] = None):
+        self.depth = depth
+        self.depths = depths or {}
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.version = 0
+        self._log: Dict[str, Deque[Tuple[int, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, timestamp: float, value: Any):
+        with self._lock:
+            entries = self._log.get(name)
+            if entries is None:
+                entries = self._log[name] = deque(maxlen=self.depths.get(name, self.depth))
+            elif entries[-1][1] == value:
+                return
+            self.version += 1
+            entries.append((self.version, value))
+
+    def current(self, names: Iterable[str]) -> int:
+        """
+        Version of the newest change among ``names`` (0 if none recorded).
+        """
+        with self._lock:
+            return max((self._log[name][-1][0] for name in names if name in self._log), default=0)
+
+    def tag(self, version: int) -> str:
+        """
+        Version tag handed to clients (version field, ETag).
+        """
+        return f"{self.epoch}-{version}"
+
+    def parse(self, tag: str) -> Optional[int]:
+        """
+        Version number of a tag from this process, or None for tags from
+        another process (e.g. before an agent restart) or malformed ones.
+        """
+        epoch, _, version = tag.rpartition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def changes_since(self, names: Iterable[str], since: Optional[int],
+                      select: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Tuple[int, Dict[str, Any], List[str]]:
+        """
+        Return ``(version, changes, full)`` for ``names`` relative to version
+        ``since``, where ``version`` is ``current(names)``; with ``since``
+        None (a tag from another process) every collector is sent whole. Dict values are
+        reduced to their changed fields and process lists to
+        added/removed/changed rows. Collectors whose state at ``since`` is no
+        longer retained are sent whole and listed in ``full``.
+
+        ``select`` maps a collector to a function applied to both its old and
+        new value before they are compared (e.g. to keep only the top N
+        processes).
+        """
+        select = select or {}
+        changes: Dict[str, Any] = {}
+        full: List[str] = []
+        with self._lock:
+            restarted = since is None or since > self.version
+            entries = {name: list(self._log[name]) for name in names if name in self._log}
+        version = max((versions[-1][0] for versions in entries.values()), default=0)
+
+        if restarted:
+            # The client's version is from another process or otherwise unknown
+            since = -1
+
+        for name, versions in entries.items():
+            latest_version, latest = versions[-1]
+            if latest_version <= since:
+                continue
+            base = None
+            for entry_version, value in versions:
+                if entry_version <= since:
+                    base = value
+            if name in select:
+                latest = select[name](latest)
+                base = None if base is None else select[name](base)
+            if base is None:
+                changes[name] = latest
+                full.append(name)
+            elif isinstance(latest, list):
+                changes[name] = diff_processes(base, latest)
+            else:
+                delta = changed_fields(base, latest)
+                if delta is not None:
+                    changes[name] = delta
+        return version, changes, full
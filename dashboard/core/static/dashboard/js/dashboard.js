@@ -217,7 +217,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     const timeLabel = formatTimestamp(metric.timestamp);
                     
                     chartData.labels.push(timeLabel);
-                    chartData.cpuData.push(Math.min(metric.cpu_usage, 100)); // Cap at 100% for display
+                    // Cap at 100% for display; samples without CPU values leave a gap
+                    chartData.cpuData.push(metric.cpu_usage === null ? null : Math.min(metric.cpu_usage, 100));
                     chartData.memoryData.push(metric.memory_percent);
                     chartData.diskData.push(metric.disk_percent);
                 });
@@ -274,7 +275,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (chartData.labels.length === 0 || timeLabel !== chartData.labels[chartData.labels.length - 1]) {
                     // Update line charts data
                     chartData.labels.push(timeLabel);
-                    chartData.cpuData.push(Math.min(latestMetric.cpu_usage, 100));
+                    chartData.cpuData.push(latestMetric.cpu_usage === null ? null : Math.min(latestMetric.cpu_usage, 100));
                     chartData.memoryData.push(latestMetric.memory_percent);
                     chartData.diskData.push(latestMetric.disk_percent);
                     
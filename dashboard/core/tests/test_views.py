@@ -97,4 +97,32 @@ class TestViews:
         assert response.status_code == 200
         assert 'processes' in response.context
         assert response.context['processes'] == []
-        
\ No newline at end of file
+        
+    @patch('core.views.requests.get')
+    def test_processes_view_requests_top_n(self, mock_get, mock_metrics_response, authenticated_client, settings):
+        """Test processes view asks the agent for a filtered top-N list"""
+        settings.METRICS_API_URL = 'http://agent:8000/metrics'
+        settings.METRICS_PROCESS_LIMIT = 25
+        mock_response = Mock()
+        mock_response.json.return_value = mock_metrics_response
+        mock_get.return_value = mock_response
+
+        url = reverse('dashboard_processes')
+        response = authenticated_client.get(url, {'sort': 'memory', 'user': 'root'})
+
+        assert response.status_code == 200
+        mock_get.assert_called_once_with(
+            'http://agent:8000/metrics/processes',
+            params={'limit': 25, 'sort': 'memory', 'user': 'root'}
+        )
+
+    @patch('core.views.requests.get')
+    def test_index_view_skips_processes(self, mock_get, mock_metrics_response, authenticated_client):
+        """Test index view does not request the process list"""
+        mock_response = Mock()
+        mock_response.json.return_value = mock_metrics_response
+        mock_get.return_value = mock_response
+
+        authenticated_client.get(reverse('dashboard_index'))
+
+        assert mock_get.call_args.kwargs['params'] == {'processes': 'none', 'cgroups': 'none'}
@@ -9,8 +9,8 @@ def index(request):
     Main dashboard view that fetches system metrics from the API
     """
     try:
-        # Fetch metrics from the API
-        response = requests.get(settings.METRICS_API_URL)
+        # Fetch metrics from the API; the overview page shows neither processes nor cgroups
+        response = requests.get(settings.METRICS_API_URL, params={'processes': 'none', 'cgroups': 'none'})
         metrics_data = response.json()
     except requests.RequestException:
         # Handle API request failure
@@ -32,9 +32,15 @@ def processes(request):
     """
     Processes view that can be used for a separate processes page
     """
+    # Let the agent filter and select the top processes instead of shipping all of them
+    params = {'limit': getattr(settings, 'METRICS_PROCESS_LIMIT', 100)}
+    for key in ('sort', 'user', 'name', 'offset'):
+        if request.GET.get(key):
+            params[key] = request.GET[key]
+
     try:
-        # Fetch metrics from the API
-        response = requests.get(settings.METRICS_API_URL)
+        # Fetch processes from the API
+        response = requests.get(f"{settings.METRICS_API_URL.rstrip('/')}/processes", params=params)
         metrics_data = response.json()
     except requests.RequestException:
         metrics_data = {
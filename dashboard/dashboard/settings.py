@@ -39,7 +39,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'core',
     'metrics',
-    'django_apscheduler',
     'rest_framework'
 ]
 
@@ -129,13 +128,35 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Agent polled while no AgentEndpoint is registered (add agents in the admin)
 METRICS_API_URL = "http://127.0.0.1:8000/metrics"
+# Agents polled at once, and the seconds to wait for an agent to accept the
+# connection and then to answer
+METRICS_POLL_WORKERS = 32
+METRICS_CONNECT_TIMEOUT = 3.05
+METRICS_READ_TIMEOUT = 10
+# Seconds between checks for agents that are due; each agent is polled on its
+# own interval (AgentEndpoint.interval) at a phase spread over the interval
+METRICS_SCHEDULER_TICK = 1
+# Longest backoff in seconds after failed polls; after METRICS_CIRCUIT_FAILURES
+# consecutive failures an agent is not polled for METRICS_CIRCUIT_COOLDOWN seconds
+METRICS_MAX_BACKOFF = 900
+METRICS_CIRCUIT_FAILURES = 5
+METRICS_CIRCUIT_COOLDOWN = 600
+# The collector runs in `manage.py runcollector`, with its APScheduler job kept
+# in memory (no job store in the database); of several running, the one
+# holding this lease (seconds, renewed every sixth of it) is active
+METRICS_COLLECTOR_LEASE_TTL = 30
+# Number of top processes (by CPU) requested from the agent for the processes page
+METRICS_PROCESS_LIMIT = 100
+# Agents pushing to /historical/api/ingest/ must send "Authorization: Bearer
+# <token>" (AGENT_PUSH_TOKEN on the agent); the endpoint refuses all requests
+# until this is set
+METRICS_INGEST_TOKEN = None
+# Samples stored per transaction by /historical/api/ingest/
+METRICS_INGEST_BATCH_SIZE = 1000
 
 
-# Django APScheduler settings
-APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"  # Default format
-APSCHEDULER_RUN_NOW_TIMEOUT = 25  # Seconds
-
 # Configure logging
 LOGGING = {
     'version': 1,
@@ -156,7 +177,8 @@ LOGGING = {
         },
         'apscheduler': {
             'handlers': ['console'],
-            'level': 'INFO',
+            # The collector job runs every second; only report problems
+            'level': 'WARNING',
         },
     },
 }
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
+from .models import AgentEndpoint
+
 # Register your models here.
+@admin.register(AgentEndpoint)
+class AgentEndpointAdmin(admin.ModelAdmin):
+    list_display = ['url', 'enabled', 'interval', 'last_polled', 'last_lag', 'consecutive_failures',
+                    'circuit_open_until', 'skipped_runs']
+    list_filter = ['enabled']
+    readonly_fields = ['last_polled', 'last_lag', 'consecutive_failures', 'circuit_open_until', 'skipped_runs']
@@ -2,11 +2,11 @@
 from rest_framework import serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Max, Min
+from django.db.models import Avg, Max, Min, Sum
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import Host, SystemMetric
+from .models import AgentEndpoint, Host, SystemMetric
 
 class HostSerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,6 +25,20 @@ class SystemMetricSerializer(serializers.ModelSerializer):
             'disk_total', 'disk_used', 'disk_percent'
         ]
 
+class AgentEndpointSerializer(serializers.ModelSerializer):
+    circuit_open = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AgentEndpoint
+        fields = [
+            'id', 'url', 'enabled', 'interval',
+            'last_polled', 'last_lag', 'consecutive_failures',
+            'circuit_open', 'circuit_open_until', 'skipped_runs'
+        ]
+    
+    def get_circuit_open(self, endpoint):
+        return endpoint.circuit_open_until is not None and endpoint.circuit_open_until > timezone.now()
+
 class HostViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Host.objects.all()
     serializer_class = HostSerializer
@@ -114,8 +128,11 @@ class SystemMetricViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Calculate averages for each hour
         for hour, hour_metrics in metrics_by_hour.items():
-            avg_cpu = sum(m.cpu_usage for m in hour_metrics) / len(hour_metrics)
-            avg_memory = sum(m.memory_percent for m in hour_metrics) / len(hour_metrics)
+            # Samples without CPU or memory values are left out of those averages
+            cpu_values = [m.cpu_usage for m in hour_metrics if m.cpu_usage is not None]
+            memory_values = [m.memory_percent for m in hour_metrics if m.memory_percent is not None]
+            avg_cpu = sum(cpu_values) / len(cpu_values) if cpu_values else None
+            avg_memory = sum(memory_values) / len(memory_values) if memory_values else None
             avg_disk = sum(m.disk_percent for m in hour_metrics) / len(hour_metrics)
             
             hourly_data.append({
@@ -150,4 +167,32 @@ class SystemMetricViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({
             'time_series': hourly_data,
             'overall_stats': overall_stats
-        })
\ No newline at end of file
+        })
+
+class AgentEndpointViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = AgentEndpoint.objects.all().order_by('url')
+    serializer_class = AgentEndpointSerializer
+    
+    @action(detail=False, methods=['get'])
+    def schedule(self, request):
+        """
+        Collector scheduling health: polling agents, open circuits, skipped
+        runs and schedule lag
+        """
+        enabled = AgentEndpoint.objects.filter(enabled=True)
+        stats = enabled.aggregate(
+            skipped_runs=Sum('skipped_runs'),
+            lag_avg=Avg('last_lag'),
+            lag_max=Max('last_lag')
+        )
+        
+        return Response({
+            'agents': enabled.count(),
+            'failing': enabled.filter(consecutive_failures__gt=0).count(),
+            'open_circuits': enabled.filter(circuit_open_until__gt=timezone.now()).count(),
+            'skipped_runs': stats['skipped_runs'] or 0,
+            'lag': {
+                'avg': stats['lag_avg'] or 0.0,
+                'max': stats['lag_max'] or 0.0
+            }
+        })
@@ -4,7 +4,5 @@ from django.apps import AppConfig
 class MetricsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'metrics'
-    
-    def ready(self):
-        from . import scheduler
-        scheduler.start()
\ No newline at end of file
+    # The collector's scheduler is not started here, where every process
+    # importing Django would run it; it runs in `manage.py runcollector`.
@@ -0,0 +1,119 @@
+# metrics/codec.py
+"""
+Decoder for the agent's compact binary /metrics encoding, used to read
+scraped responses.
+
+This is a copy of the decoder in agent/encoding.py (the agent is deployed
+separately and the two projects share no package); the agent's encoder is
+the reference for the format, so change both together.
+
+Layout (little-endian, format version 2):
+
+    header      3s magic b"SMB", B format version, d unix timestamp
+    strings     timestamp, hostname, ip_address, os_info
+    sections    B flags: 1 = cpu present, 2 = memory present
+    cpu         only if present: H cores, H physical cores, d overall, d user,
+                d system, d idle, H n, n x d per-core usage
+    memory      only if present: Q total, Q available, Q used, Q free,
+                d percent used, Q swap total, Q swap used, d swap percent
+    partitions  H n, n x (strings device, mountpoint, fstype; Q total, Q used,
+                Q free, d percent used)
+    processes   I n, n x (I pid, d cpu %, d memory %; strings name, username,
+                status, create_time; long string cmdline)
+    extras      long string: compact JSON of every other top-level field
+
+Strings are a H byte length plus UTF-8 bytes (I for long strings); the
+maximum length value marks None, and longer values are cut at a character
+boundary. CPU and memory are left out while their collector has no value,
+rather than encoded as zeros (version 1, still decoded, had no section
+flags and always carried both).
+"""
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+CONTENT_TYPE = "application/x-sysmetrics"
+MAGIC = b"SMB"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<3sBd")
+_SECTIONS = struct.Struct("<B")
+_CPU = struct.Struct("<HHdddd")
+_MEMORY = struct.Struct("<QQQQdQQd")
+_PARTITION = struct.Struct("<QQQd")
+_PROCESS = struct.Struct("<Idd")
+_SHORT = struct.Struct("<H")
+_LONG = struct.Struct("<I")
+
+_CPU_PRESENT = 1
+_MEMORY_PRESENT = 2
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout: struct.Struct) -> Tuple:
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def string(self, prefix: struct.Struct = _SHORT) -> Optional[str]:
+        (length,) = self.unpack(prefix)
+        if length == (1 << (8 * prefix.size)) - 1:
+            return None
+        value = self.data[self.offset:self.offset + length].decode("utf-8")
+        self.offset += length
+        return value
+
+
+def decode_metrics(data: bytes) -> Dict[str, Any]:
+    reader = _Reader(data)
+    magic, version, _ = reader.unpack(_HEADER)
+    if magic != MAGIC or version not in (1, FORMAT_VERSION):
+        raise ValueError(f"Unsupported metrics encoding (magic={magic!r}, version={version})")
+
+    doc: Dict[str, Any] = {}
+    for field in ("timestamp", "hostname", "ip_address", "os_info"):
+        doc[field] = reader.string()
+
+    # Version 1 had no section flags and always carried both sections
+    (sections,) = reader.unpack(_SECTIONS) if version >= 2 else (_CPU_PRESENT | _MEMORY_PRESENT,)
+    if sections & _CPU_PRESENT:
+        cores, physical_cores, overall, user, system, idle = reader.unpack(_CPU)
+        (count,) = reader.unpack(_SHORT)
+        per_core = list(reader.unpack(struct.Struct(f"<{count}d")))
+        doc["cpu"] = {
+            "percent_usage_per_core": per_core, "overall_usage": overall, "user": user,
+            "system": system, "idle": idle, "cores": cores, "physical_cores": physical_cores,
+        }
+
+    if sections & _MEMORY_PRESENT:
+        doc["memory"] = dict(zip(
+            ("total", "available", "used", "free", "percent_used", "swap_total", "swap_used", "swap_percent"),
+            reader.unpack(_MEMORY)
+        ))
+
+    (count,) = reader.unpack(_SHORT)
+    partitions = []
+    for _ in range(count):
+        partition = {key: reader.string() for key in ("device", "mountpoint", "fstype")}
+        partition.update(zip(("total", "used", "free", "percent_used"), reader.unpack(_PARTITION)))
+        partitions.append(partition)
+
+    (count,) = reader.unpack(_LONG)
+    processes = []
+    for _ in range(count):
+        pid, cpu_percent, memory_percent = reader.unpack(_PROCESS)
+        process = {"pid": pid, "cpu_percent": cpu_percent, "memory_percent": memory_percent}
+        for key in ("name", "username", "status", "create_time"):
+            process[key] = reader.string()
+        process["cmdline"] = reader.string(_LONG)
+        processes.append(process)
+    doc["processes"] = processes
+
+    extras = json.loads(reader.string(_LONG) or "{}")
+    doc["disk"] = {"partitions": partitions, **extras.pop("disk", {})}
+    doc.update(extras)
+    return doc
@@ -0,0 +1,225 @@
+# metrics/ingest.py
+import logging
+import threading
+from datetime import datetime
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Host, SystemMetric
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sample(data):
+    """
+    Split an agent sample into its hostname, the host's attributes and the
+    SystemMetric fields. CPU and memory fields are left empty (and the host's
+    core count untouched) when the sample has no CPU or memory section.
+    """
+    # Extract important metrics; an empty section means the agent had no value yet
+    cpu_data = data.get('cpu') or None
+    memory_data = data.get('memory') or None
+    disk_data = data.get('disk', {})
+
+    host_attributes = {
+        'ip_address': data.get('ip_address'),
+        'os_info': data.get('os_info')
+    }
+    if cpu_data is not None:
+        host_attributes['cpu_cores'] = cpu_data.get('cores', 0)
+
+    # Calculate total disk space (sum of all partitions, counting each
+    # device once in case an older agent reports bind mounts)
+    total_disk = 0
+    used_disk = 0
+    devices = set()
+    for partition in disk_data.get('partitions', []):
+        device = partition.get('device')
+        if device is not None:
+            if device in devices:
+                continue
+            devices.add(device)
+        total_disk += partition.get('total', 0)
+        used_disk += partition.get('used', 0)
+
+    # Calculate disk usage percentage
+    disk_percent = (used_disk / total_disk * 100) if total_disk > 0 else 0
+
+    # Parse timestamp or use current time and make timezone-aware
+    try:
+        timestamp_str = data.get('timestamp')
+        if timestamp_str:
+            naive_timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+            # Make timezone-aware
+            timestamp = timezone.make_aware(naive_timestamp)
+        else:
+            timestamp = timezone.now()
+    except (ValueError, TypeError):
+        timestamp = timezone.now()
+
+    metric_fields = {
+        'timestamp': timestamp,
+
+        # CPU metrics
+        'cpu_usage': cpu_data.get('overall_usage', 0) if cpu_data is not None else None,
+
+        # Memory metrics
+        'memory_total': memory_data.get('total', 0) if memory_data is not None else None,
+        'memory_used': memory_data.get('used', 0) if memory_data is not None else None,
+        'memory_percent': memory_data.get('percent_used', 0) if memory_data is not None else None,
+
+        # Disk metrics
+        'disk_total': total_disk,
+        'disk_used': used_disk,
+        'disk_percent': disk_percent
+    }
+    return data.get('hostname'), host_attributes, metric_fields
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_sample(data):
+    """
+    Cheap structural check of an agent sample before it is stored. Returns
+    what is wrong with it, or None if it can be stored.
+    """
+    if not isinstance(data, dict):
+        return 'not a JSON object'
+    hostname = data.get('hostname')
+    if not isinstance(hostname, str) or not hostname or len(hostname) > 255:
+        return 'hostname must be a non-empty string of at most 255 characters'
+    for field in ('ip_address', 'os_info'):
+        if not isinstance(data.get(field), str):
+            return f'{field} must be a string'
+    if not isinstance(data.get('timestamp', ''), str):
+        return 'timestamp must be a string'
+    for section, fields in (('cpu', ('cores', 'overall_usage')), ('memory', ('total', 'used', 'percent_used'))):
+        values = data.get(section, {})
+        if not isinstance(values, dict):
+            return f'{section} must be an object'
+        for field in fields:
+            if field in values and not _is_number(values[field]):
+                return f'{section}.{field} must be a number'
+    disk = data.get('disk', {})
+    if not isinstance(disk, dict) or not isinstance(disk.get('partitions', []), list):
+        return 'disk.partitions must be a list'
+    for partition in disk.get('partitions', []):
+        if not isinstance(partition, dict) or not all(_is_number(partition.get(field, 0)) for field in ('total', 'used')):
+            return 'disk.partitions entries need numeric total and used'
+    return None
+
+
+class HostCache:
+    """
+    In-process map of hostname to Host id and attributes, loaded from the
+    database on first use. Hosts only need a write when they are new or
+    their attributes changed.
+    """
+
+    def __init__(self):
+        self._hosts = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, hostname, attributes):
+        """
+        Return the id of the host if it is known with these attributes
+        (attributes left out are not compared), otherwise None.
+        """
+        with self._lock:
+            if not self._loaded:
+                for host in Host.objects.all():
+                    self._hosts[host.hostname] = (host.pk, {
+                        'ip_address': host.ip_address,
+                        'os_info': host.os_info,
+                        'cpu_cores': host.cpu_cores
+                    })
+                self._loaded = True
+            cached = self._hosts.get(hostname)
+        if cached is not None and all(cached[1].get(key) == value for key, value in attributes.items()):
+            return cached[0]
+        return None
+
+    def set(self, hostname, host_id, attributes):
+        with self._lock:
+            cached = self._hosts.get(hostname)
+            known = cached[1] if cached is not None and cached[0] == host_id else {}
+            self._hosts[hostname] = (host_id, {**known, **attributes})
+
+    def clear(self):
+        with self._lock:
+            self._hosts = {}
+            self._loaded = False
+
+
+# Shared by every pipeline in this process
+host_cache = HostCache()
+
+
+class IngestPipeline:
+    """
+    Buffers parsed samples and stores them in bulk: each flush is one
+    transaction that writes only the hosts that are new or changed (at most
+    once each) and inserts all the metrics with a single bulk_create.
+    A batch is flushed automatically once ``batch_size`` samples are buffered.
+    """
+
+    def __init__(self, batch_size=500, hosts=None):
+        self.batch_size = batch_size
+        self.hosts = hosts or host_cache
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def add(self, data):
+        """
+        Parse a sample and buffer it for the next flush.
+        """
+        row = parse_sample(data)
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Store the buffered samples. Returns the number of samples stored.
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            return self._write(rows)
+        except IntegrityError:
+            # A cached host was deleted meanwhile; reload the cache and retry once
+            logger.warning("Host cache out of date, reloading it")
+            self.hosts.clear()
+            return self._write(rows)
+
+    def _write(self, rows):
+        # Each host is written once, with its attributes from its latest sample
+        latest = {hostname: attributes for hostname, attributes, _ in rows}
+        host_ids = {}
+        written = {}
+        with transaction.atomic():
+            for hostname, attributes in latest.items():
+                host_id = self.hosts.get(hostname, attributes)
+                if host_id is None:
+                    host, created = Host.objects.update_or_create(
+                        hostname=hostname, defaults=attributes, create_defaults={'cpu_cores': 0, **attributes}
+                    )
+                    host_id = written[hostname] = host.pk
+                host_ids[hostname] = host_id
+            SystemMetric.objects.bulk_create(
+                [SystemMetric(host_id=host_ids[hostname], **fields) for hostname, _, fields in rows]
+            )
+        # Only cache what was committed
+        for hostname, host_id in written.items():
+            self.hosts.set(hostname, host_id, latest[hostname])
+        return len(rows)
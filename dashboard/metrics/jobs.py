@@ -1,102 +1,99 @@
 # metrics/jobs.py
 import requests
 import logging
-from datetime import datetime
-from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
-from .models import Host, SystemMetric
+from .codec import CONTENT_TYPE as BINARY_CONTENT_TYPE, decode_metrics
+from .ingest import IngestPipeline
 
 logger = logging.getLogger(__name__)
 
+# Prefer the agent's compact binary encoding; older agents answer with JSON.
+# requests negotiates gzip on its own.
+ACCEPT = f"{BINARY_CONTENT_TYPE}, application/json;q=0.9"
+
+# Agents whose keep-alive connections are kept open between runs
+MAX_AGENT_POOLS = 1000
+
 class SystemMetricsJob:
     """
-    Job that fetches system metrics from a REST API and stores them in the database.
+    Fetches system metrics from the agents' REST APIs and stores them in the database.
+    
+    The scheduler (metrics.scheduler.AgentScheduler) decides when each agent
+    is polled: ``submit`` fetches one agent on a bounded thread pool over a
+    pooled keep-alive session, so keep one job around to reuse connections.
+    Fetched samples are queued with ``store`` and written in one bulk
+    transaction by ``flush``.
     """
     
-    def __init__(self, api_url=None):
+    def __init__(self, api_url=None, max_workers=None):
         self.api_url = api_url or settings.METRICS_API_URL
+        self.max_workers = max_workers or getattr(settings, 'METRICS_POLL_WORKERS', 32)
+        # (connect, read) timeouts, so one slow agent cannot hold up the run
+        self.timeout = (
+            getattr(settings, 'METRICS_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'METRICS_READ_TIMEOUT', 10)
+        )
+        self.session = requests.Session()
+        # One pool per agent host; keep enough of them that every agent's
+        # connection survives until the next run
+        adapter = HTTPAdapter(pool_connections=MAX_AGENT_POOLS, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = None
+        # Samples are buffered here until flush()
+        self.pipeline = IngestPipeline()
     
-    def run(self):
+    def fetch(self, url):
         """
-        Fetch metrics and store in database.
+        Fetch and decode one agent's metrics.
         """
-        try:
-            # Get metrics from API
-            response = requests.get(self.api_url, timeout=3000)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Process and store metrics
-            self._process_metrics(data)
-            
-            logger.info(f"Successfully fetched and stored metrics for host {data.get('hostname')}")
-            return True
-            
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch metrics: {str(e)}")
-            return False
-        except Exception as e:
-            logger.error(f"Error processing metrics: {str(e)}")
-            return False
+        # Process and cgroup tables are not stored, so don't transfer them
+        response = self.session.get(
+            url,
+            params={'processes': 'none', 'cgroups': 'none'},
+            headers={'Accept': ACCEPT},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return self._decode(response)
     
-    def _process_metrics(self, data):
+    def submit(self, url):
         """
-        Process the metrics data and store in database.
+        Start fetching one agent's metrics on the thread pool. Returns a future.
         """
-        # Get or create host
-        hostname = data.get('hostname')
-        host, created = Host.objects.update_or_create(
-            hostname=hostname,
-            defaults={
-                'ip_address': data.get('ip_address'),
-                'os_info': data.get('os_info'),
-                'cpu_cores': data.get('cpu', {}).get('cores', 0)
-            }
-        )
-        
-        # Extract important metrics
-        cpu_data = data.get('cpu', {})
-        memory_data = data.get('memory', {})
-        disk_data = data.get('disk', {})
-        
-        # Calculate total disk space (sum of all partitions)
-        total_disk = 0
-        used_disk = 0
-        for partition in disk_data.get('partitions', []):
-            total_disk += partition.get('total', 0)
-            used_disk += partition.get('used', 0)
-        
-        # Calculate disk usage percentage
-        disk_percent = (used_disk / total_disk * 100) if total_disk > 0 else 0
-        
-        # Parse timestamp or use current time and make timezone-aware
-        try:
-            timestamp_str = data.get('timestamp')
-            if timestamp_str:
-                naive_timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                # Make timezone-aware
-                timestamp = timezone.make_aware(naive_timestamp)
-            else:
-                timestamp = timezone.now()
-        except (ValueError, TypeError):
-            timestamp = timezone.now()
-        
-        # Create metrics record
-        SystemMetric.objects.create(
-            host=host,
-            timestamp=timestamp,
-            
-            # CPU metrics
-            cpu_usage=cpu_data.get('overall_usage', 0),  
-            
-            # Memory metrics
-            memory_total=memory_data.get('total', 0),
-            memory_used=memory_data.get('used', 0),
-            memory_percent=memory_data.get('percent_used', 0),
-            
-            # Disk metrics
-            disk_total=total_disk,
-            disk_used=used_disk,
-            disk_percent=disk_percent
-        )
\ No newline at end of file
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='metrics-poll')
+        return self.executor.submit(self.fetch, url)
+    
+    def store(self, data):
+        """
+        Queue a fetched sample for the next ``flush``.
+        """
+        self.pipeline.add(data)
+    
+    def flush(self):
+        """
+        Write the queued samples in one transaction. Returns how many were stored.
+        """
+        return self.pipeline.flush()
+    
+    def close(self):
+        """
+        Stop the worker threads and close the pooled connections.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        self.session.close()
+    
+    def _decode(self, response):
+        """
+        Decode a metrics response according to its Content-Type.
+        """
+        content_type = str(response.headers.get('Content-Type', ''))
+        if content_type.startswith(BINARY_CONTENT_TYPE):
+            return decode_metrics(response.content)
+        return response.json()
@@ -0,0 +1,54 @@
+# metrics/leader.py
+import os
+import socket
+import uuid
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CollectorLease
+
+
+class LeaderLock:
+    """
+    Database lease that at most one process holds at a time.
+    
+    ``acquire()`` takes the lease if it is free or expired, or extends it if
+    this lock already holds it; it has to be called again well within
+    ``ttl`` seconds to keep it. A holder that stops renewing (crashed, hung
+    or cut off from the database) loses the lease once it expires, and the
+    next process to ask takes over. Works across hosts sharing the database,
+    assuming their clocks agree to well within ``ttl``.
+    """
+    
+    def __init__(self, name='collector', ttl=30, owner=None):
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    
+    def acquire(self):
+        """
+        Take or renew the lease. Returns True if this lock now holds it.
+        """
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.ttl)
+        # A single conditional UPDATE, so two contenders cannot both win
+        updated = CollectorLease.objects.filter(name=self.name).filter(
+            Q(owner=self.owner) | Q(expires_at__lt=now)
+        ).update(owner=self.owner, expires_at=expires_at)
+        if updated:
+            return True
+        try:
+            with transaction.atomic():
+                CollectorLease.objects.create(name=self.name, owner=self.owner, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            # Held by someone else
+            return False
+    
+    def release(self):
+        """
+        Give the lease up (if held) so another process can take over at once.
+        """
+        CollectorLease.objects.filter(name=self.name, owner=self.owner).delete()
@@ -0,0 +1,86 @@
+# metrics/management/commands/runcollector.py
+import logging
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from metrics import scheduler
+from metrics.leader import LeaderLock
+from metrics.scheduler import close_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the metrics collector that polls the agents. Any number may be "
+        "started; a database lease makes exactly one of them active, and a "
+        "standby takes over when the active one stops or stops renewing it."
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lease-ttl', type=float, default=getattr(settings, 'METRICS_COLLECTOR_LEASE_TTL', 30),
+            help='Seconds the leader lease lasts without renewal (renewed every sixth of it)'
+        )
+    
+    def handle(self, *args, **options):
+        lock = LeaderLock(ttl=options['lease_ttl'])
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stopping.set())
+        
+        self.stdout.write(f"Collector {lock.owner} waiting for the leader lease")
+        self.lead(lock, stopping)
+        self.stdout.write(f"Collector {lock.owner} stopped")
+    
+    def lead(self, lock, stopping, clock=time.monotonic):
+        """
+        Run the collector while ``lock`` is held, renewing it every sixth of
+        its ttl, until ``stopping`` is set.
+        
+        When the lease cannot be renewed (database errors) the collector
+        steps down one renewal interval before two thirds of the ttl have
+        passed since the last renewal, well before a standby can take the
+        lease over, so two collectors never poll at the same time.
+        """
+        renew_every = lock.ttl / 6
+        step_down_after = lock.ttl * 2 / 3 - renew_every
+        leading = False
+        renewed_at = None
+        try:
+            while not stopping.is_set():
+                try:
+                    acquired = lock.acquire()
+                except DatabaseError as e:
+                    # Keep leading while well within the lease we hold
+                    logger.error(f"Error taking or renewing the collector lease: {str(e)}")
+                    acquired = None
+                finally:
+                    close_db_connection()
+                
+                now = clock()
+                if acquired:
+                    renewed_at = now
+                    if not leading:
+                        logger.info(f"Collector {lock.owner} is now the leader")
+                        scheduler.start()
+                        leading = True
+                elif leading and (acquired is False or now - renewed_at >= step_down_after):
+                    logger.warning(f"Collector {lock.owner} lost the leader lease, standing by")
+                    scheduler.stop()
+                    leading = False
+                
+                stopping.wait(renew_every)
+        finally:
+            if leading:
+                scheduler.stop()
+                try:
+                    lock.release()
+                except DatabaseError as e:
+                    logger.error(f"Error releasing the collector lease: {str(e)}")
+                close_db_connection()
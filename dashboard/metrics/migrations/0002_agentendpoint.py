@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(help_text="The agent's /metrics URL", max_length=500, unique=True)),
+                ('enabled', models.BooleanField(default=True, help_text='Whether the collector polls this agent')),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0002_agentendpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='circuit_open_until',
+            field=models.DateTimeField(blank=True, help_text='Polling is suspended until then after repeated failures', null=True),
+        ),
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='interval',
+            field=models.PositiveIntegerField(default=60, help_text='Seconds between polls'),
+        ),
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='last_lag',
+            field=models.FloatField(default=0, help_text='Seconds the latest poll started after it was due'),
+        ),
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='last_polled',
+            field=models.DateTimeField(blank=True, help_text='Start of the latest poll', null=True),
+        ),
+        migrations.AddField(
+            model_name='agentendpoint',
+            name='skipped_runs',
+            field=models.PositiveIntegerField(default=0, help_text='Polls skipped because the previous one was still running'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0003_agentendpoint_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectorLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(help_text='host:pid of the holder', max_length=255)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0004_collectorlease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='cpu_usage',
+            field=models.FloatField(help_text='Overall CPU usage percentage', null=True),
+        ),
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='memory_percent',
+            field=models.FloatField(help_text='Memory usage percentage', null=True),
+        ),
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='memory_total',
+            field=models.BigIntegerField(help_text='Total memory in bytes', null=True),
+        ),
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='memory_used',
+            field=models.BigIntegerField(help_text='Used memory in bytes', null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 21:01
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0005_systemmetric_optional_sections'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentendpoint',
+            name='interval',
+            field=models.PositiveIntegerField(default=60, help_text='Seconds between polls', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -1,4 +1,5 @@
 # metrics/models.py
+from django.core.validators import MinValueValidator
 from django.db import models
 
 class Host(models.Model):
@@ -14,13 +15,13 @@ class SystemMetric(models.Model):
     host = models.ForeignKey(Host, on_delete=models.CASCADE, related_name='metrics')
     timestamp = models.DateTimeField()
     
-    # CPU metrics
-    cpu_usage = models.FloatField(help_text="Overall CPU usage percentage")
+    # CPU metrics (empty when the sample had none)
+    cpu_usage = models.FloatField(null=True, help_text="Overall CPU usage percentage")
     
-    # Memory metrics
-    memory_total = models.BigIntegerField(help_text="Total memory in bytes")
-    memory_used = models.BigIntegerField(help_text="Used memory in bytes")
-    memory_percent = models.FloatField(help_text="Memory usage percentage")
+    # Memory metrics (empty when the sample had none)
+    memory_total = models.BigIntegerField(null=True, help_text="Total memory in bytes")
+    memory_used = models.BigIntegerField(null=True, help_text="Used memory in bytes")
+    memory_percent = models.FloatField(null=True, help_text="Memory usage percentage")
     
     # Disk metrics
     disk_total = models.BigIntegerField(help_text="Total disk space in bytes")
@@ -35,4 +36,40 @@ class SystemMetric(models.Model):
         ordering = ['-timestamp']
     
     def __str__(self):
-        return f"{self.host.hostname} - {self.timestamp}"
\ No newline at end of file
+        return f"{self.host.hostname} - {self.timestamp}"
+
+class AgentEndpoint(models.Model):
+    """
+    An agent polled by the collector job. Add one row per host to monitor.
+    """
+    url = models.URLField(max_length=500, unique=True, help_text="The agent's /metrics URL")
+    enabled = models.BooleanField(default=True, help_text="Whether the collector polls this agent")
+    interval = models.PositiveIntegerField(
+        default=60, validators=[MinValueValidator(1)], help_text="Seconds between polls"
+    )
+    
+    # Scheduler state, kept up to date by the collector
+    last_polled = models.DateTimeField(null=True, blank=True, help_text="Start of the latest poll")
+    last_lag = models.FloatField(default=0, help_text="Seconds the latest poll started after it was due")
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    circuit_open_until = models.DateTimeField(
+        null=True, blank=True, help_text="Polling is suspended until then after repeated failures"
+    )
+    skipped_runs = models.PositiveIntegerField(
+        default=0, help_text="Polls skipped because the previous one was still running"
+    )
+    
+    def __str__(self):
+        return self.url
+
+
+class CollectorLease(models.Model):
+    """
+    Lease held by the single process running the metrics collector (see metrics/leader.py).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255, help_text="host:pid of the holder")
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} held by {self.owner}"
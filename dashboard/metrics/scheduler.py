@@ -1,17 +1,217 @@
 # metrics/scheduler.py
 import logging
+import random
+import time
+import zlib
+from datetime import timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
-from django_apscheduler.jobstores import DjangoJobStore
 from django.conf import settings
 from django.db import connection
+from django.utils import timezone
 
 from metrics.jobs import SystemMetricsJob
+from metrics.models import AgentEndpoint
 
 logger = logging.getLogger(__name__)
 
 # Global variable to keep track of scheduler
 scheduler = None
 
+# Per-agent schedules, kept across ticks (and the job's keep-alive connections with them)
+agent_scheduler = None
+
+# AgentEndpoint fields the scheduler keeps up to date
+SCHEDULE_FIELDS = ['last_polled', 'last_lag', 'consecutive_failures', 'circuit_open_until', 'skipped_runs']
+
+
+class AgentSchedule:
+    """
+    Polling schedule and health of one agent.
+    
+    Each agent is polled every ``interval`` seconds at its own phase within
+    the interval, derived from its URL, so a fleet's polls are spread evenly
+    instead of all starting at once. After a failure the next poll backs off
+    exponentially (with jitter); after ``circuit_failures`` consecutive
+    failures the circuit opens and the agent is left alone for the cooldown,
+    after which a single probe poll closes it again or reopens it.
+    """
+    
+    def __init__(self, url, interval, now, endpoint=None):
+        self.url = url
+        self.interval = interval
+        self.endpoint = endpoint
+        self.phase = zlib.crc32(url.encode()) % 1000 / 1000 * interval
+        self.next_due = now + (self.phase - now) % interval
+        self.last_lag = endpoint.last_lag if endpoint else 0.0
+        self.failures = endpoint.consecutive_failures if endpoint else 0
+        self.skipped = endpoint.skipped_runs if endpoint else 0
+        self.open_until = None
+        if endpoint is not None and endpoint.circuit_open_until is not None:
+            remaining = (endpoint.circuit_open_until - timezone.now()).total_seconds()
+            if remaining > 0:
+                self.open_until = self.next_due = now + remaining
+    
+    def circuit_open(self, now):
+        return self.open_until is not None and now < self.open_until
+    
+    def _next_slot(self, now):
+        # First slot of the agent's phase grid after now
+        return now + ((self.phase - now) % self.interval or self.interval)
+    
+    def _advance(self, now):
+        # Keep to the phase grid; slots that already passed are not made up
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = self._next_slot(now)
+    
+    def start(self, now):
+        """
+        Record that a poll started now. Returns how late it started.
+        """
+        self.last_lag = max(0.0, now - self.next_due)
+        self._advance(now)
+        return self.last_lag
+    
+    def skip(self, now):
+        """
+        Record that a due poll was skipped because the previous one is still running.
+        """
+        self.skipped += 1
+        self._advance(now)
+    
+    def succeeded(self, now):
+        if self.failures:
+            # Back from backoff (or a probe): return to the phase grid
+            self.next_due = self._next_slot(now)
+        self.failures = 0
+        self.open_until = None
+    
+    def failed(self, now, max_backoff, circuit_failures, circuit_cooldown):
+        self.failures += 1
+        if self.failures >= circuit_failures:
+            self.open_until = self.next_due = now + circuit_cooldown
+        else:
+            backoff = min(max_backoff, self.interval * 2 ** (self.failures - 1))
+            self.next_due = now + backoff * random.uniform(0.75, 1.25)
+
+
+class AgentScheduler:
+    """
+    Polls every registered agent on its own schedule (see AgentSchedule).
+    
+    ``tick()`` runs every METRICS_SCHEDULER_TICK seconds: it stores the polls
+    that finished (in one bulk transaction), starts the ones that are due on
+    the job's thread pool and saves each agent's scheduling state. A slow
+    agent only delays itself: if its previous poll is still running when the
+    next one is due, that poll is skipped and counted instead of overlapping.
+    The agent list is reloaded every ``refresh`` seconds.
+    """
+    
+    def __init__(self, job=None, clock=time.monotonic, refresh=30.0):
+        self.job = job or SystemMetricsJob(api_url=getattr(settings, 'METRICS_API_URL', None))
+        self.clock = clock
+        self.refresh = refresh
+        self.max_backoff = getattr(settings, 'METRICS_MAX_BACKOFF', 900)
+        self.circuit_failures = getattr(settings, 'METRICS_CIRCUIT_FAILURES', 5)
+        self.circuit_cooldown = getattr(settings, 'METRICS_CIRCUIT_COOLDOWN', 600)
+        self.schedules = {}
+        self.in_flight = {}
+        self.loaded_at = None
+    
+    def load(self, now):
+        """
+        Pick up added, removed and re-configured agents.
+        """
+        schedules = {}
+        for endpoint in AgentEndpoint.objects.filter(enabled=True):
+            if endpoint.interval < 1:
+                # Saved around the form validation; don't let it stop every other agent
+                logger.error(f"Not polling {endpoint.url}: its interval must be at least 1 second")
+                continue
+            schedule = self.schedules.get(endpoint.url)
+            if schedule is None or schedule.interval != endpoint.interval:
+                schedule = AgentSchedule(endpoint.url, endpoint.interval, now, endpoint)
+            schedule.endpoint = endpoint
+            schedules[endpoint.url] = schedule
+        if not schedules:
+            # Nothing registered: poll METRICS_API_URL, as before the registry existed
+            url = self.job.api_url
+            schedules[url] = self.schedules.get(url) or AgentSchedule(url, 60, now)
+        self.schedules = schedules
+        self.loaded_at = now
+    
+    def tick(self):
+        now = self.clock()
+        if self.loaded_at is None or now - self.loaded_at >= self.refresh:
+            self.load(now)
+        
+        changed = self._collect(now)
+        for url, schedule in self.schedules.items():
+            if now < schedule.next_due:
+                continue
+            if url in self.in_flight:
+                schedule.skip(now)
+                logger.warning(f"Skipped polling {url}: the previous poll is still running")
+            else:
+                schedule.start(now)
+                if schedule.endpoint is not None:
+                    schedule.endpoint.last_polled = timezone.now()
+                self.in_flight[url] = self.job.submit(url)
+            changed.add(url)
+        self._save(changed, now)
+    
+    def _collect(self, now):
+        """
+        Store the polls that finished and update their agents' health.
+        Returns the URLs whose state changed.
+        """
+        finished = set()
+        for url, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[url]
+            finished.add(url)
+            schedule = self.schedules.get(url)
+            try:
+                self.job.store(future.result())
+                if schedule is not None:
+                    schedule.succeeded(now)
+            except Exception as e:
+                logger.error(f"Failed to fetch metrics from {url}: {str(e)}")
+                if schedule is not None:
+                    schedule.failed(now, self.max_backoff, self.circuit_failures, self.circuit_cooldown)
+                    if schedule.failures == self.circuit_failures:
+                        logger.warning(f"Suspending polls of {url} for {self.circuit_cooldown}s "
+                                       f"after {schedule.failures} consecutive failures")
+        if finished:
+            try:
+                self.job.flush()
+            except Exception as e:
+                logger.error(f"Error storing metrics: {str(e)}")
+        return finished
+    
+    def _save(self, urls, now):
+        endpoints = []
+        for url in urls:
+            schedule = self.schedules.get(url)
+            if schedule is None or schedule.endpoint is None:
+                continue
+            endpoint = schedule.endpoint
+            endpoint.last_lag = schedule.last_lag
+            endpoint.consecutive_failures = schedule.failures
+            endpoint.skipped_runs = schedule.skipped
+            endpoint.circuit_open_until = (
+                timezone.now() + timedelta(seconds=schedule.open_until - now)
+                if schedule.circuit_open(now) else None
+            )
+            endpoints.append(endpoint)
+        if endpoints:
+            AgentEndpoint.objects.bulk_update(endpoints, SCHEDULE_FIELDS)
+    
+    def close(self):
+        self.job.close()
+
+
 def close_db_connection():
     """
     Close the database connection to prevent connection leaks
@@ -20,11 +220,13 @@ def close_db_connection():
 
 def fetch_metrics():
     """
-    Wrapper function to run the job and close DB connection
+    Wrapper function to poll the agents that are due and close DB connection
     """
+    global agent_scheduler
     try:
-        job = SystemMetricsJob(api_url=getattr(settings, 'METRICS_API_URL', None))
-        job.run()
+        if agent_scheduler is None:
+            agent_scheduler = AgentScheduler()
+        agent_scheduler.tick()
     finally:
         # Always close the connection after job runs
         close_db_connection()
@@ -40,22 +242,18 @@ def start():
     
     # Try to gracefully handle database issues
     try:
-        scheduler.add_jobstore(DjangoJobStore(), "default")
-        
-        # Remove existing job if it exists to avoid conflicts
-        try:
-            scheduler.remove_job('fetch_system_metrics')
-        except:
-            pass  # Job doesn't exist yet, which is fine
-        
-        # Schedule job to run every 5 minutes
+        # Each agent keeps its own interval and phase; the job only checks
+        # every second which of them are due. It stays in memory: it is
+        # re-added on every start, and persisting it would mean a database
+        # write per tick.
         scheduler.add_job(
             fetch_metrics,
             'interval',
-            minutes=1,
+            seconds=getattr(settings, 'METRICS_SCHEDULER_TICK', 1),
             id='fetch_system_metrics',
             replace_existing=True,
-            max_instances=1  # Prevent overlapping job executions
+            max_instances=1,  # Prevent overlapping job executions
+            coalesce=True
         )
         
         # Start the scheduler if it's not already running
@@ -63,4 +261,17 @@ def start():
             logger.info("Starting scheduler...")
             scheduler.start()
     except Exception as e:
-        logger.error(f"Error starting scheduler: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error starting scheduler: {str(e)}")
+
+def stop():
+    global scheduler, agent_scheduler
+    
+    if scheduler is not None and scheduler.running:
+        logger.info("Stopping scheduler...")
+        scheduler.shutdown(wait=True)
+    scheduler = None
+    
+    # Drop the schedules too; a later start() reloads them from the database
+    if agent_scheduler is not None:
+        agent_scheduler.close()
+        agent_scheduler = None
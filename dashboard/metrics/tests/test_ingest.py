@@ -0,0 +1,125 @@
+# metrics/tests/test_ingest.py
+import gzip
+import json
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from metrics.ingest import host_cache
+from metrics.models import Host, SystemMetric
+
+
+def sample(hostname, timestamp, cpu_usage, ip_address='10.0.0.1'):
+    return {
+        'hostname': hostname,
+        'ip_address': ip_address,
+        'os_info': 'Linux 6.1',
+        'timestamp': timestamp,
+        'cpu': {'cores': 4, 'overall_usage': cpu_usage},
+        'memory': {'total': 8192, 'used': 2048, 'percent_used': 25.0},
+        'disk': {'partitions': [{'device': '/dev/sda1', 'total': 1000, 'used': 500}]},
+    }
+
+
+def ndjson(samples):
+    return ''.join(json.dumps(s) + '\n' for s in samples).encode()
+
+
+@override_settings(METRICS_INGEST_TOKEN='secret')
+class TestIngest(TestCase):
+    def setUp(self):
+        self.url = reverse('metrics_ingest')
+        self.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer secret'
+        # Host ids cached by earlier tests were rolled back
+        host_cache.clear()
+    
+    def test_gzip_batch(self):
+        """Test that a pushed batch from several hosts is stored"""
+        body = gzip.compress(ndjson([
+            sample('web1', '2025-01-01 10:00:00', 10.0),
+            sample('web2', '2025-01-01 10:00:00', 20.0),
+            sample('web1', '2025-01-01 10:01:00', 30.0, ip_address='10.0.0.9'),
+        ]))
+        response = self.client.post(self.url, body, content_type='application/x-ndjson',
+                                    HTTP_CONTENT_ENCODING='gzip')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'accepted': 3, 'rejected': 0, 'errors': []})
+        web1 = Host.objects.get(hostname='web1')
+        self.assertEqual(web1.ip_address, '10.0.0.9')
+        self.assertEqual(
+            sorted(SystemMetric.objects.filter(host=web1).values_list('cpu_usage', flat=True)), [10.0, 30.0]
+        )
+        self.assertEqual(SystemMetric.objects.get(host__hostname='web2').disk_percent, 50.0)
+    
+    def test_invalid_lines_are_counted(self):
+        """Test that bad lines are rejected one by one and the rest stored"""
+        no_hostname = sample('', '2025-01-01 10:00:00', 10.0)
+        bad_cpu = sample('web2', '2025-01-01 10:00:00', 'high')
+        body = (ndjson([sample('web1', '2025-01-01 10:00:00', 10.0)]) + b'{not json\n\n'
+                + ndjson([no_hostname, bad_cpu, [1, 2]]) + json.dumps(sample('web3', '2025-01-01 10:00:00', 5.0)).encode())
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['accepted'], result['rejected']), (2, 4))
+        self.assertEqual([error['line'] for error in result['errors']], [2, 4, 5, 6])
+        self.assertIn('cpu.overall_usage', result['errors'][2]['error'])
+        self.assertEqual(sorted(Host.objects.values_list('hostname', flat=True)), ['web1', 'web3'])
+    
+    @patch('metrics.views.CHUNK_SIZE', 64)
+    @patch('metrics.views.MAX_LINE_LENGTH', 500)
+    def test_overlong_line_is_skipped(self):
+        """Test that a huge line is rejected without derailing the lines after it"""
+        huge = sample('web1', '2025-01-01 10:00:00', 10.0)
+        huge['padding'] = 'x' * 2000
+        body = ndjson([huge, sample('web2', '2025-01-01 10:00:00', 10.0)])
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        
+        result = response.json()
+        self.assertEqual((result['accepted'], result['rejected']), (1, 1))
+        self.assertEqual(result['errors'][0]['line'], 1)
+        self.assertEqual(Host.objects.get().hostname, 'web2')
+    
+    @override_settings(METRICS_INGEST_BATCH_SIZE=100)
+    def test_large_stream_in_several_batches(self):
+        """Test a body larger than one read, from concatenated gzip members"""
+        samples = [sample(f'host{i % 50}', '2025-01-01 10:00:00', float(i)) for i in range(1000)]
+        body = gzip.compress(ndjson(samples[:600])) + gzip.compress(ndjson(samples[600:]))
+        response = self.client.post(self.url, body, content_type='application/x-ndjson',
+                                    HTTP_CONTENT_ENCODING='gzip')
+        
+        self.assertEqual(response.json()['accepted'], 1000)
+        self.assertEqual(Host.objects.count(), 50)
+        self.assertEqual(SystemMetric.objects.count(), 1000)
+    
+    def test_truncated_gzip(self):
+        """Test that a corrupt body is reported, keeping the samples read before it"""
+        body = gzip.compress(ndjson([sample('web1', '2025-01-01 10:00:00', 10.0)]))
+        body += gzip.compress(ndjson([sample('web2', '2025-01-01 10:00:00', 10.0)]))[:-12]
+        response = self.client.post(self.url, body, content_type='application/x-ndjson',
+                                    HTTP_CONTENT_ENCODING='gzip')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertEqual(SystemMetric.objects.count(), 1)
+    
+    def test_token_required(self):
+        """Test that requests without the ingest token are refused"""
+        body = ndjson([sample('web1', '2025-01-01 10:00:00', 10.0)])
+        del self.client.defaults['HTTP_AUTHORIZATION']
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 401)
+        
+        response = self.client.post(self.url, body, content_type='application/x-ndjson',
+                                    HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(SystemMetric.objects.count(), 0)
+    
+    @override_settings(METRICS_INGEST_TOKEN=None)
+    def test_disabled_without_token(self):
+        """Test that ingest refuses everything until a token is configured"""
+        body = ndjson([sample('web1', '2025-01-01 10:00:00', 10.0)])
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(SystemMetric.objects.count(), 0)
@@ -1,8 +1,14 @@
 # metrics/tests/test_jobs.py
 import pytest
+import struct
+import threading
+import requests
+from concurrent.futures import wait
 from unittest.mock import patch, Mock, MagicMock
 from metrics.jobs import SystemMetricsJob
-from metrics.models import Host, SystemMetric
+from metrics.ingest import host_cache
+from metrics.scheduler import AgentScheduler
+from metrics.models import AgentEndpoint, Host, SystemMetric
 from django.test import TestCase
 from django.utils import timezone
 
@@ -10,8 +16,28 @@ class TestSystemMetricsJob(TestCase):
     
     def setUp(self):
         self.job = SystemMetricsJob(api_url="http://test-api.com/metrics")
+        # Host ids cached by earlier tests were rolled back
+        host_cache.clear()
+        self.addCleanup(self.job.close)
     
-    @patch('metrics.jobs.requests.get')
+    def poll(self, job=None):
+        """
+        Poll every agent once through the scheduler, as the collector does.
+        Returns True if every poll succeeded.
+        """
+        now = [0.0]
+        scheduler = AgentScheduler(job=job or self.job, clock=lambda: now[0])
+        scheduler.load(now[0])
+        # Every agent's first slot has passed
+        now[0] = 1000.0
+        scheduler.tick()
+        futures = list(scheduler.in_flight.values())
+        wait(futures)
+        # Stores the finished polls
+        scheduler.tick()
+        return all(future.exception() is None for future in futures)
+    
+    @patch('metrics.jobs.requests.Session.get')
     def test_run_success(self, mock_get):
         """Test successful execution of the metrics job"""
         # Mock the API response
@@ -44,7 +70,7 @@ class TestSystemMetricsJob(TestCase):
         mock_get.return_value = mock_response
         
         # Execute the job
-        result = self.job.run()
+        result = self.poll()
         
         # Verify job executed successfully
         self.assertTrue(result)
@@ -66,14 +92,14 @@ class TestSystemMetricsJob(TestCase):
         self.assertEqual(metric.disk_used, 32212254720)
         self.assertEqual(metric.disk_percent, 30.0)
     
-    @patch('metrics.jobs.requests.get')
+    @patch('metrics.jobs.requests.Session.get')
     def test_run_request_exception(self, mock_get):
         """Test job handling of a request exception"""
         # Mock the API response to raise an exception
         mock_get.side_effect = Exception("Connection error")
         
         # Execute the job
-        result = self.job.run()
+        result = self.poll()
         
         # Verify job failed
         self.assertFalse(result)
@@ -82,7 +108,7 @@ class TestSystemMetricsJob(TestCase):
         self.assertEqual(Host.objects.count(), 0)
         self.assertEqual(SystemMetric.objects.count(), 0)
     
-    @patch('metrics.jobs.requests.get')
+    @patch('metrics.jobs.requests.Session.get')
     def test_process_metrics_multiple_partitions(self, mock_get):
         """Test processing of metrics with multiple disk partitions"""
         # Mock the API response
@@ -118,7 +144,7 @@ class TestSystemMetricsJob(TestCase):
         mock_get.return_value = mock_response
         
         # Execute the job
-        result = self.job.run()
+        result = self.poll()
         
         # Verify job executed successfully
         self.assertTrue(result)
@@ -140,7 +166,7 @@ class TestSystemMetricsJob(TestCase):
         self.assertEqual(metric.disk_used, used_disk)
         self.assertAlmostEqual(metric.disk_percent, expected_percent)
     
-    @patch('metrics.jobs.requests.get')
+    @patch('metrics.jobs.requests.Session.get')
     def test_process_metrics_update_existing_host(self, mock_get):
         """Test that existing hosts are updated rather than duplicated"""
         # Create a pre-existing host
@@ -179,7 +205,7 @@ class TestSystemMetricsJob(TestCase):
         mock_get.return_value = mock_response
         
         # Execute the job
-        result = self.job.run()
+        result = self.poll()
         
         # Verify job executed successfully
         self.assertTrue(result)
@@ -193,3 +219,113 @@ class TestSystemMetricsJob(TestCase):
         self.assertEqual(host.os_info, 'Ubuntu 20.04')
         self.assertEqual(host.cpu_cores, 4)
 
+    
+    @patch('metrics.jobs.requests.Session.get')
+    def test_run_binary_response(self, mock_get):
+        """Test that the agent's compact binary encoding is decoded"""
+        from metrics.codec import CONTENT_TYPE, FORMAT_VERSION
+        
+        def string(value):
+            data = value.encode('utf-8')
+            return struct.pack('<H', len(data)) + data
+        
+        def string_long(data):
+            return struct.pack('<I', len(data)) + data
+        
+        # Layout of agent/encoding.py: header, strings, section flags (cpu only),
+        # cpu, one partition, no processes, JSON extras
+        timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
+        mock_response = Mock()
+        mock_response.headers = {'Content-Type': CONTENT_TYPE}
+        mock_response.content = b''.join([
+            struct.pack('<3sBd', b'SMB', FORMAT_VERSION, 0.0),
+            string(timestamp), string('binary-host'), string('192.168.1.150'), string('Debian 12'),
+            struct.pack('<B', 1),
+            struct.pack('<HHdddd', 2, 1, 12.5, 8.0, 4.5, 87.5), struct.pack('<H2d', 2, 10.0, 15.0),
+            struct.pack('<H', 1), string('/dev/sda1'), string('/'), string('ext4'),
+            struct.pack('<QQQd', 107374182400, 10737418240, 96636764160, 10.0),
+            struct.pack('<I', 0),
+            string_long(b'{"disk":{"io_stats":{"read_bytes":1}}}'),
+        ])
+        mock_get.return_value = mock_response
+        
+        result = self.poll()
+        
+        self.assertTrue(result)
+        mock_response.json.assert_not_called()
+        self.assertIn(CONTENT_TYPE, mock_get.call_args.kwargs['headers']['Accept'])
+        
+        host = Host.objects.get(hostname='binary-host')
+        self.assertEqual(host.cpu_cores, 2)
+        metric = SystemMetric.objects.get(host=host)
+        self.assertEqual(metric.cpu_usage, 12.5)
+        # The agent had no memory value, so none is stored
+        self.assertIsNone(metric.memory_used)
+        self.assertEqual(metric.disk_total, 107374182400)
+        self.assertEqual(metric.disk_percent, 10.0)
+    
+    @patch('metrics.jobs.requests.Session.get')
+    def test_process_metrics_counts_each_device_once(self, mock_get):
+        """Test that the same device mounted twice is not double-counted"""
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            'hostname': 'bind-mount-server',
+            'ip_address': '192.168.1.210',
+            'os_info': 'Ubuntu 22.04',
+            'cpu': {'cores': 2, 'overall_usage': 1.0},
+            'memory': {'total': 1024, 'used': 512, 'percent_used': 50.0},
+            'disk': {
+                'partitions': [
+                    {'device': '/dev/sda1', 'mountpoint': '/', 'total': 1000, 'used': 400},
+                    {'device': '/dev/sda1', 'mountpoint': '/srv/data', 'total': 1000, 'used': 400},
+                    {'device': '/dev/sdb1', 'mountpoint': '/home', 'total': 3000, 'used': 600}
+                ]
+            }
+        }
+        mock_get.return_value = mock_response
+        
+        self.assertTrue(self.poll())
+        
+        metric = SystemMetric.objects.get(host__hostname='bind-mount-server')
+        self.assertEqual(metric.disk_total, 4000)
+        self.assertEqual(metric.disk_used, 1000)
+        self.assertEqual(metric.disk_percent, 25.0)
+    
+    @patch('metrics.jobs.requests.Session.get')
+    def test_run_polls_registered_agents_concurrently(self, mock_get):
+        """Test that every enabled agent is polled at once and a failing one doesn't stop the others"""
+        AgentEndpoint.objects.create(url='http://web1:8000/metrics')
+        AgentEndpoint.objects.create(url='http://web2:8000/metrics')
+        AgentEndpoint.objects.create(url='http://down:8000/metrics')
+        AgentEndpoint.objects.create(url='http://retired:8000/metrics', enabled=False)
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def get(url, **kwargs):
+            # Only returns once all three requests are in flight together
+            barrier.wait()
+            if url.startswith('http://down'):
+                raise requests.ConnectionError('refused')
+            response = Mock()
+            response.json.return_value = {
+                'hostname': url.split('/')[2].split(':')[0],
+                'ip_address': '10.0.0.1',
+                'os_info': 'Ubuntu 22.04',
+                'cpu': {'cores': 2, 'overall_usage': 5.0},
+                'memory': {'total': 1024, 'used': 512, 'percent_used': 50.0},
+                'disk': {'partitions': []}
+            }
+            return response
+        
+        mock_get.side_effect = get
+        job = SystemMetricsJob(api_url='http://unused/metrics', max_workers=4)
+        self.addCleanup(job.close)
+        
+        self.assertFalse(self.poll(job))
+        
+        self.assertEqual(sorted(Host.objects.values_list('hostname', flat=True)), ['web1', 'web2'])
+        self.assertEqual(SystemMetric.objects.count(), 2)
+        polled = {c.args[0] for c in mock_get.call_args_list}
+        self.assertNotIn('http://retired:8000/metrics', polled)
+        self.assertNotIn('http://unused/metrics', polled)
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], job.timeout)
+        self.assertEqual(mock_get.call_args.kwargs['params'], {'processes': 'none', 'cgroups': 'none'})
@@ -0,0 +1,134 @@
+# metrics/tests/test_leader.py
+from datetime import timedelta
+from unittest.mock import patch
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+
+from metrics import scheduler
+from metrics.leader import LeaderLock
+from metrics.management.commands.runcollector import Command
+from metrics.models import CollectorLease
+
+
+class TestLeaderLock(TestCase):
+    def setUp(self):
+        self.first = LeaderLock(ttl=30, owner='first')
+        self.second = LeaderLock(ttl=30, owner='second')
+    
+    def test_single_holder(self):
+        """Test that only one collector holds the lease and the holder can renew it"""
+        self.assertTrue(self.first.acquire())
+        self.assertFalse(self.second.acquire())
+        self.assertTrue(self.first.acquire())
+        self.assertEqual(CollectorLease.objects.get().owner, 'first')
+    
+    def test_expired_lease_is_taken_over(self):
+        """Test that a standby takes over once the holder stops renewing"""
+        self.first.acquire()
+        CollectorLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        
+        self.assertTrue(self.second.acquire())
+        # The old holder finds out on its next renewal
+        self.assertFalse(self.first.acquire())
+    
+    def test_release(self):
+        """Test that releasing hands the lease over without waiting for it to expire"""
+        self.first.acquire()
+        self.second.release()
+        self.assertFalse(self.second.acquire())
+        
+        self.first.release()
+        self.assertTrue(self.second.acquire())
+    
+    def test_scheduler_not_started_by_django(self):
+        """Test that loading Django (as web workers and tests do) starts no collector"""
+        self.assertIsNone(scheduler.scheduler)
+
+
+class ScriptedLock:
+    """Stands in for LeaderLock; each acquire() returns (or raises) the next scripted result"""
+    owner = 'scripted'
+    
+    def __init__(self, ttl, results):
+        self.ttl = ttl
+        self.results = list(results)
+        self.released = False
+    
+    def acquire(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def release(self):
+        self.released = True
+
+
+class Stopping:
+    """Stands in for the stop event; waiting advances the clock, and it is set once the script is used up"""
+    
+    def __init__(self, lock):
+        self.lock = lock
+        self.now = 0.0
+    
+    def is_set(self):
+        return not self.lock.results
+    
+    def wait(self, timeout):
+        self.now += timeout
+
+
+@patch('metrics.management.commands.runcollector.close_db_connection')
+@patch('metrics.management.commands.runcollector.scheduler')
+class TestRunCollector(TestCase):
+    def lead(self, *results):
+        """Run the command loop over the scripted acquire() results, one renewal every 5s"""
+        lock = ScriptedLock(30, results)
+        stopping = Stopping(lock)
+        Command().lead(lock, stopping, clock=lambda: stopping.now)
+        return lock
+    
+    def test_acquire_and_renew(self, collector, _):
+        """Test that the collector starts once on taking the lease, keeps running while renewing, and releases on exit"""
+        lock = self.lead(True, True, True)
+        
+        collector.start.assert_called_once()
+        collector.stop.assert_called_once()
+        self.assertTrue(lock.released)
+    
+    def test_standby(self, collector, _):
+        """Test that a collector that never gets the lease never polls"""
+        lock = self.lead(False, False)
+        
+        collector.start.assert_not_called()
+        self.assertFalse(lock.released)
+    
+    def test_lost_lease(self, collector, _):
+        """Test that the leader stops as soon as another collector holds the lease"""
+        lock = self.lead(True, False, False)
+        
+        collector.start.assert_called_once()
+        collector.stop.assert_called_once()
+        # Not ours any more, so nothing to release
+        self.assertFalse(lock.released)
+    
+    def test_database_error_steps_down_before_expiry(self, collector, _):
+        """Test that the leader rides out brief database errors but stops well before its lease can expire"""
+        error = DatabaseError('database is locked')
+        # Renewed at 0s; errors at 5s and 10s are tolerated, so it still leads (and releases) on exit
+        lock = self.lead(True, error, error)
+        collector.stop.assert_called_once()
+        self.assertTrue(lock.released)
+        collector.reset_mock()
+        
+        # At 15s, half the lease before a standby could take over at 30s, it steps down
+        lock = self.lead(True, error, error, error)
+        collector.start.assert_called_once()
+        collector.stop.assert_called_once()
+        self.assertFalse(lock.released)
+        collector.reset_mock()
+        
+        # And leads again once the lease can be renewed
+        self.lead(True, error, error, error, True)
+        self.assertEqual(collector.start.call_count, 2)
@@ -0,0 +1,102 @@
+# metrics/tests/test_pipeline.py
+from django.test import TestCase, TransactionTestCase
+
+from metrics.ingest import HostCache, IngestPipeline
+from metrics.models import Host, SystemMetric
+
+
+def sample(hostname, cpu_usage=10.0, ip_address='10.0.0.1'):
+    return {
+        'hostname': hostname,
+        'ip_address': ip_address,
+        'os_info': 'Ubuntu 22.04',
+        'timestamp': '2025-01-01 10:00:00',
+        'cpu': {'cores': 4, 'overall_usage': cpu_usage},
+        'memory': {'total': 1024, 'used': 256, 'percent_used': 25.0},
+        'disk': {'partitions': [{'device': '/dev/sda1', 'total': 1000, 'used': 100}]}
+    }
+
+
+class TestIngestPipeline(TestCase):
+    def setUp(self):
+        self.pipeline = IngestPipeline(batch_size=100, hosts=HostCache())
+    
+    def test_flush_writes_batch(self):
+        """Test that buffered samples are only stored on flush"""
+        self.pipeline.add(sample('web1', 10.0))
+        self.pipeline.add(sample('web2', 20.0))
+        self.pipeline.add(sample('web1', 30.0))
+        self.assertEqual(SystemMetric.objects.count(), 0)
+        
+        self.assertEqual(self.pipeline.flush(), 3)
+        self.assertEqual(Host.objects.count(), 2)
+        self.assertEqual(
+            sorted(SystemMetric.objects.filter(host__hostname='web1').values_list('cpu_usage', flat=True)),
+            [10.0, 30.0]
+        )
+        self.assertEqual(SystemMetric.objects.get(host__hostname='web2').disk_percent, 10.0)
+        self.assertEqual(self.pipeline.flush(), 0)
+    
+    def test_unchanged_hosts_are_not_written(self):
+        """Test that known hosts cost no queries and a full batch flushes itself"""
+        self.pipeline.add(sample('web1'))
+        self.pipeline.flush()
+        
+        # Savepoint, bulk insert, release
+        with self.assertNumQueries(3):
+            self.pipeline.add(sample('web1', 50.0))
+            self.pipeline.flush()
+        
+        self.pipeline.add(sample('web1', ip_address='10.0.0.2'))
+        self.pipeline.flush()
+        self.assertEqual(Host.objects.get(hostname='web1').ip_address, '10.0.0.2')
+        
+        self.pipeline.batch_size = 2
+        self.pipeline.add(sample('web1'))
+        self.pipeline.add(sample('web1'))
+        self.assertEqual(len(self.pipeline), 0)
+        self.assertEqual(SystemMetric.objects.count(), 5)
+    
+    def test_absent_sections_are_not_stored_as_zeros(self):
+        """Test that a sample without CPU or memory leaves those fields empty and keeps the host's core count"""
+        self.pipeline.add(sample('web1'))
+        self.pipeline.flush()
+        
+        partial = sample('web1')
+        partial['cpu'] = {}
+        del partial['memory']
+        self.pipeline.add(partial)
+        self.pipeline.flush()
+        
+        metric = SystemMetric.objects.filter(host__hostname='web1').latest('id')
+        self.assertIsNone(metric.cpu_usage)
+        self.assertIsNone(metric.memory_used)
+        self.assertEqual(metric.disk_percent, 10.0)
+        self.assertEqual(Host.objects.get(hostname='web1').cpu_cores, 4)
+        
+        # A new host reporting no CPU yet is stored with no known cores
+        partial['hostname'] = 'web2'
+        self.pipeline.add(partial)
+        self.pipeline.flush()
+        self.assertEqual(Host.objects.get(hostname='web2').cpu_cores, 0)
+    
+    def test_cache_loads_existing_hosts(self):
+        """Test that hosts already in the database are not rewritten"""
+        host = Host.objects.create(hostname='web1', ip_address='10.0.0.1', os_info='Ubuntu 22.04', cpu_cores=4)
+        self.pipeline.add(sample('web1'))
+        self.pipeline.flush()
+        
+        self.assertEqual(SystemMetric.objects.get().host_id, host.pk)
+
+
+class TestIngestPipelineStaleCache(TransactionTestCase):
+    def test_deleted_host_is_recreated(self):
+        """Test that a host deleted behind the cache's back is recreated"""
+        pipeline = IngestPipeline(hosts=HostCache())
+        pipeline.add(sample('web1'))
+        pipeline.flush()
+        Host.objects.all().delete()
+        
+        pipeline.add(sample('web1'))
+        self.assertEqual(pipeline.flush(), 1)
+        self.assertEqual(SystemMetric.objects.get().host.hostname, 'web1')
@@ -0,0 +1,169 @@
+# metrics/tests/test_scheduler.py
+from concurrent.futures import Future
+from datetime import timedelta
+
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from metrics.models import AgentEndpoint
+from metrics.scheduler import AgentSchedule, AgentScheduler
+
+
+class FakeJob:
+    """Stands in for SystemMetricsJob; polls finish when the test resolves them"""
+    api_url = 'http://default:8000/metrics'
+    
+    def __init__(self):
+        self.futures = {}
+        self.processed = []
+        self.flushes = 0
+    
+    def submit(self, url):
+        self.futures[url] = Future()
+        return self.futures[url]
+    
+    def store(self, data):
+        self.processed.append(data)
+    
+    def flush(self):
+        self.flushes += 1
+        return len(self.processed)
+    
+    def close(self):
+        pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@override_settings(METRICS_MAX_BACKOFF=900, METRICS_CIRCUIT_FAILURES=3, METRICS_CIRCUIT_COOLDOWN=600)
+class TestAgentScheduler(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.job = FakeJob()
+        self.scheduler = AgentScheduler(job=self.job, clock=self.clock)
+        self.endpoint = AgentEndpoint.objects.create(url='http://web1:8000/metrics', interval=60)
+        self.url = self.endpoint.url
+    
+    def run_until_polled(self):
+        """Tick once a second until the agent's next poll starts"""
+        for _ in range(1000):
+            self.scheduler.tick()
+            if self.url in self.scheduler.in_flight:
+                return
+            self.clock.now += 1
+        self.fail('agent was never polled')
+    
+    def test_phases_spread_polls(self):
+        """Test that a fleet's polls are spread over the interval instead of starting together"""
+        schedules = [AgentSchedule(f'http://host{i}:8000/metrics', 60, 0.0) for i in range(200)]
+        per_second = {}
+        for schedule in schedules:
+            per_second[int(schedule.next_due)] = per_second.get(int(schedule.next_due), 0) + 1
+        self.assertGreater(len(per_second), 50)
+        self.assertLessEqual(max(per_second.values()), 10)
+        # Phases are stable, so restarts keep the spread
+        self.assertEqual(AgentSchedule('http://host1:8000/metrics', 60, 0.0).phase, schedules[1].phase)
+    
+    def test_polls_on_interval_and_reports_lag(self):
+        """Test the fixed cadence, and that a late start is recorded as lag"""
+        self.run_until_polled()
+        first = self.clock.now
+        self.job.futures[self.url].set_result({'hostname': 'web1'})
+        self.clock.now += 1
+        self.scheduler.tick()
+        self.assertEqual(self.job.processed, [{'hostname': 'web1'}])
+        self.assertEqual(self.job.flushes, 1)
+        
+        # The tick arrives 5 seconds after the next slot
+        self.clock.now = first + 65
+        self.scheduler.tick()
+        self.assertIn(self.url, self.scheduler.in_flight)
+        self.endpoint.refresh_from_db()
+        # Plus up to a second from the first poll's tick
+        self.assertTrue(5.0 <= self.endpoint.last_lag < 6.0)
+        self.assertIsNotNone(self.endpoint.last_polled)
+    
+    def test_overrunning_poll_is_skipped(self):
+        """Test that a poll still running when the next is due skips that run"""
+        self.run_until_polled()
+        self.clock.now += 60
+        self.scheduler.tick()
+        
+        self.assertEqual(self.scheduler.schedules[self.url].skipped, 1)
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.skipped_runs, 1)
+    
+    def test_backoff_and_circuit_breaker(self):
+        """Test exponential backoff, the open circuit, and the probe that closes it"""
+        delays = []
+        for _ in range(2):
+            self.run_until_polled()
+            started = self.clock.now
+            self.job.futures[self.url].set_exception(requests.ConnectionError('refused'))
+            self.scheduler.tick()
+            delays.append(self.scheduler.schedules[self.url].next_due - started)
+        self.assertTrue(45 <= delays[0] <= 75)
+        self.assertTrue(90 <= delays[1] <= 150)
+        
+        # The third failure opens the circuit
+        self.run_until_polled()
+        self.job.futures[self.url].set_exception(requests.ConnectionError('refused'))
+        self.scheduler.tick()
+        opened = self.clock.now
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.consecutive_failures, 3)
+        self.assertIsNotNone(self.endpoint.circuit_open_until)
+        self.assertTrue(self.scheduler.schedules[self.url].circuit_open(self.clock.now))
+        
+        # Nothing is polled during the cooldown; then one probe closes it
+        self.run_until_polled()
+        self.assertGreaterEqual(self.clock.now, opened + 600)
+        self.job.futures[self.url].set_result({'hostname': 'web1'})
+        self.scheduler.tick()
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.consecutive_failures, 0)
+        self.assertIsNone(self.endpoint.circuit_open_until)
+        # And polls return to the agent's phase grid
+        schedule = self.scheduler.schedules[self.url]
+        offset = (schedule.next_due - schedule.phase) % 60
+        self.assertAlmostEqual(min(offset, 60 - offset), 0, delta=1e-6)
+    
+    def test_circuit_survives_restart(self):
+        """Test that an open circuit is restored from the database"""
+        self.endpoint.consecutive_failures = 3
+        self.endpoint.circuit_open_until = timezone.now() + timedelta(seconds=300)
+        self.endpoint.save()
+        
+        self.scheduler.tick()
+        self.assertNotIn(self.url, self.scheduler.in_flight)
+        self.assertTrue(self.scheduler.schedules[self.url].circuit_open(self.clock.now))
+    
+    def test_zero_interval_is_skipped(self):
+        """Test that an agent saved with a zero interval is left out instead of stopping every poll"""
+        AgentEndpoint.objects.create(url='http://web2:8000/metrics', interval=0)
+        
+        with self.assertLogs('metrics.scheduler', 'ERROR'):
+            self.run_until_polled()
+        self.assertNotIn('http://web2:8000/metrics', self.scheduler.schedules)
+    
+    def test_schedule_api(self):
+        """Test the scheduling summary endpoint"""
+        self.run_until_polled()
+        self.clock.now += 60
+        self.scheduler.tick()
+        AgentEndpoint.objects.create(url='http://web2:8000/metrics', consecutive_failures=2)
+        
+        response = APIClient().get('/historical/api/agents/schedule/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['agents'], 2)
+        self.assertEqual(response.data['failing'], 1)
+        self.assertEqual(response.data['skipped_runs'], 1)
+        self.assertEqual(response.data['open_circuits'], 0)
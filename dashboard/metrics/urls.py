@@ -1,13 +1,16 @@
 # metrics/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import HostViewSet, SystemMetricViewSet
+from .api import AgentEndpointViewSet, HostViewSet, SystemMetricViewSet
+from .views import ingest
 
 router = DefaultRouter()
 router.register(r'hosts', HostViewSet)
 router.register(r'metrics', SystemMetricViewSet)
+router.register(r'agents', AgentEndpointViewSet)
 
 urlpatterns = [
+    path('api/ingest/', ingest, name='metrics_ingest'),
     path('api/', include(router.urls)),
 ]
 
@@ -1,3 +1,137 @@
-from django.shortcuts import render
+# metrics/views.py
+import hmac
+import json
+import logging
+import zlib
 
-# Create your views here.
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .ingest import IngestPipeline, validate_sample
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from (and decompressed out of) the request body at a time
+CHUNK_SIZE = 64 * 1024
+# Longer lines are rejected without being buffered or parsed
+MAX_LINE_LENGTH = 1024 * 1024
+# Rejected lines described individually in the response
+MAX_REPORTED_ERRORS = 20
+
+
+def _read_chunks(stream, gzipped):
+    """
+    Yield the request body in chunks, gunzipping it on the fly (including
+    several concatenated gzip members) without ever holding all of it.
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if gzipped else None
+    member_started = False
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            member_started = True
+            # Bounded output, so a small body cannot expand into a huge buffer
+            yield decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                member_started = False
+    if decompressor is not None:
+        if member_started:
+            raise zlib.error('truncated gzip stream')
+        yield decompressor.flush()
+
+
+def _read_lines(chunks):
+    """
+    Split chunks into lines. Lines longer than MAX_LINE_LENGTH are yielded
+    as None.
+    """
+    buffer = b''
+    too_long = False
+    for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield None if too_long else line
+            too_long = False
+        if len(buffer) > MAX_LINE_LENGTH:
+            buffer = b''
+            too_long = True
+    if buffer or too_long:
+        yield None if too_long else buffer
+
+
+@csrf_exempt
+@require_POST
+def ingest(request):
+    """
+    Accept samples pushed by agents (or replayed) as NDJSON: one /metrics
+    document per line, optionally gzip-compressed, from any number of hosts.
+
+    The body is parsed as a stream and valid samples are stored in bulk
+    transactions of METRICS_INGEST_BATCH_SIZE samples. Invalid lines are
+    skipped; the response counts accepted and rejected lines and lists the
+    first rejections by line number.
+
+    Requests must carry "Authorization: Bearer <METRICS_INGEST_TOKEN>"; while
+    no token is configured the endpoint refuses every request.
+    """
+    token = getattr(settings, 'METRICS_INGEST_TOKEN', None)
+    if not token:
+        return JsonResponse({'error': 'Ingest is disabled: METRICS_INGEST_TOKEN is not set'}, status=403)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return JsonResponse({'error': 'Invalid ingest token'}, status=401)
+    
+    gzipped = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+    pipeline = IngestPipeline(batch_size=getattr(settings, 'METRICS_INGEST_BATCH_SIZE', 1000))
+    accepted = 0
+    rejected = 0
+    errors = []
+    
+    def reject(number, message):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': number, 'error': message})
+    
+    try:
+        for number, line in enumerate(_read_lines(_read_chunks(request, gzipped)), 1):
+            if line is None:
+                reject(number, f'Line longer than {MAX_LINE_LENGTH} bytes')
+                continue
+            if not line.strip():
+                continue
+            try:
+                sample = json.loads(line)
+            except ValueError as e:
+                reject(number, f'Invalid JSON: {str(e)}')
+                continue
+            error = validate_sample(sample)
+            if error:
+                reject(number, error)
+                continue
+            pipeline.add(sample)
+            accepted += 1
+    except zlib.error as e:
+        # Whatever was read before the corruption is still stored
+        pipeline.flush()
+        return JsonResponse({
+            'error': f'Body is not valid gzip: {str(e)}',
+            'accepted': accepted,
+            'rejected': rejected,
+            'errors': errors
+        }, status=400)
+    
+    pipeline.flush()
+    logger.info(f"Ingested {accepted} samples ({rejected} lines rejected)")
+    return JsonResponse({'accepted': accepted, 'rejected': rejected, 'errors': errors})
@@ -18,18 +18,22 @@ def run_process(name, command):
     return process, thread
 
 if __name__ == "__main__":
-    # Start both agent and web services
+    # Start the agent, the web server and the collector that polls the agent
     print("Starting services...")
     dashboard_cmd = "python dashboard/manage.py runserver 0.0.0.0:7000"
-    agent_cmd = "python agent/main.py"
+    collector_cmd = "python dashboard/manage.py runcollector"
+    agent_cmd = "python -m agent.main"
     agent_proc, agent_thread = run_process("Agent", agent_cmd)
     dashboard_proc, dashboard_thread = run_process("Dashboard", dashboard_cmd)
+    collector_proc, collector_thread = run_process("Collector", collector_cmd)
     
 
     try:
         dashboard_thread.join()
+        collector_thread.join()
         agent_thread.join()
     except KeyboardInterrupt:
         print("Shutting down services...")
         dashboard_proc.terminate()
+        collector_proc.terminate()
         agent_proc.terminate()